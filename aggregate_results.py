@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from mhc import analysis
+from mhc.hospital_layout import get_bed_capacity
+
+
+def aggregate_results(results_folder="Results", output_folder=None, workers=None, bed_capacity=None, use_cache=True,
+                      recompute=False):
+    """ Calculate the metrics of every session in the results folder, and aggregate them per condition (TDP).
+
+    The metrics per session are kept in `session_metrics.csv` in the output folder. Sessions that are already in there
+    (and whose logs didn't change since) are skipped, so on a re-run only new sessions are processed. The new sessions
+    are processed in parallel, and every session is added to `session_metrics.csv` as soon as it is done, so an
+    interrupted run can be continued. The metrics per condition are written to `condition_metrics.csv`
+
+    Parameters
+    ----------
+    results_folder
+        The folder with the sessions
+    output_folder
+        The folder for the metrics, by default `<results_folder>/summary`
+    workers
+        The number of processes, by default the number of CPUs
+    bed_capacity
+        The number of beds per room, by default the beds of the hospital in the cases
+    use_cache
+        Whether to read and write the cached tables of every session (see `mhc.analysis.load_session`)
+    recompute
+        Process all sessions again, instead of only the new ones
+    """
+    output_folder = os.path.join(results_folder, "summary") if output_folder is None else output_folder
+    os.makedirs(output_folder, exist_ok=True)
+    session_metrics_path = os.path.join(output_folder, "session_metrics.csv")
+
+    # the sessions that were processed before
+    session_metrics = pd.DataFrame()
+    if os.path.isfile(session_metrics_path) and not recompute:
+        session_metrics = pd.read_csv(session_metrics_path, sep=";", dtype={"test_subject_id": str})
+
+    # only process sessions that are new or whose logs changed
+    processed = {} if len(session_metrics) == 0 else \
+        dict(zip(session_metrics['session'], session_metrics['source_fingerprint']))
+    sessions = analysis.find_sessions(results_folder)
+    new_sessions = [session_folder for session_folder in sessions
+                    if processed.get(os.path.basename(session_folder), None)
+                    != analysis.get_source_fingerprint(session_folder)]
+    print(f"Found {len(sessions)} sessions, of which {len(new_sessions)} are new or changed")
+
+    if len(new_sessions) > 0:
+        # drop the old metrics of changed sessions
+        if len(session_metrics) > 0:
+            new_names = set(os.path.basename(session_folder) for session_folder in new_sessions)
+            session_metrics = session_metrics[~session_metrics['session'].isin(new_names)]
+        session_metrics.to_csv(session_metrics_path, sep=";", index=False)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analysis.summarize_session, session_folder, bed_capacity, use_cache):
+                       session_folder for session_folder in new_sessions}
+            for future in as_completed(futures):
+                try:
+                    metrics = pd.DataFrame([future.result()])
+                except Exception as e:
+                    print(f"Could not process session {futures[future]}: {e}")
+                    continue
+                session_metrics = pd.concat([session_metrics, metrics], ignore_index=True)
+
+                # write after every session, so the progress isn't lost if the run is interrupted
+                session_metrics.to_csv(session_metrics_path, sep=";", index=False)
+                print(f"Processed session {metrics['session'].iloc[0]}")
+
+    if len(session_metrics) == 0:
+        print("No sessions to aggregate")
+        return session_metrics, None
+
+    session_metrics = session_metrics.sort_values("session").reset_index(drop=True)
+    session_metrics.to_csv(session_metrics_path, sep=";", index=False)
+
+    condition_metrics = analysis.summarize_conditions(session_metrics)
+    condition_metrics.to_csv(os.path.join(output_folder, "condition_metrics.csv"), sep=";", index=False)
+    print(f"Written the metrics of {len(session_metrics)} sessions and {len(condition_metrics)} conditions to "
+          f"{output_folder}")
+    return session_metrics, condition_metrics
+
+
+def parse_bed_capacity(beds, config_file=None):
+    """ Parse the bed capacity from `room=n_beds` arguments, e.g. `IC=3`, on top of the beds of the hospital in the
+    config file (if given) """
+    bed_capacity = dict(analysis.default_bed_capacity)
+    if config_file is not None:
+        with open(config_file) as config_json:
+            bed_capacity = get_bed_capacity(json.load(config_json))
+    for bed_argument in beds:
+        room, n_beds = bed_argument.rsplit("=", 1)
+        bed_capacity[room] = int(n_beds)
+    return bed_capacity
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calculate the metrics of all sessions in the results folder "
+                                                 "(mortality, time to triage, human-agent agreement, bed utilisation), "
+                                                 "and aggregate them per condition")
+    parser.add_argument("--results", default="Results", help="The folder with the sessions (default: Results)")
+    parser.add_argument("--output", default=None, help="The folder for the metrics (default: <results>/summary)")
+    parser.add_argument("--workers", type=int, default=None, help="The number of processes (default: number of CPUs)")
+    parser.add_argument("--beds", nargs="*", default=[], metavar="ROOM=N",
+                        help="The number of beds per room, e.g. IC=3 (default: the beds of the hospital in the cases). "
+                             "Use with --recompute to apply it to sessions that were processed before")
+    parser.add_argument("--config", default=None,
+                        help="A case config, to use the beds of its hospital, e.g. for a generated hospital layout")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the cached tables of the sessions")
+    parser.add_argument("--recompute", action="store_true", help="Process all sessions again, not only the new ones")
+    args = parser.parse_args()
+
+    aggregate_results(results_folder=args.results, output_folder=args.output, workers=args.workers,
+                      bed_capacity=parse_bed_capacity(args.beds, args.config), use_cache=not args.no_cache,
+                      recompute=args.recompute)
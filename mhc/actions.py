@@ -1,5 +1,43 @@
 from matrx.actions import Action, ActionResult
 
+from mhc.bed_registry import get_bed_registry
+from mhc.events import EventKind, get_event_bus
+from mhc.patient_pool import get_patient_pool
+
+
+def set_patient_properties(grid_world, properties_per_patient, policy=None):
+    """ Change the properties of many patients at once, e.g. the triage decisions of the triage agent for all patients.
+
+    Patients that are no longer in the world are skipped, and properties that already have the new value are left
+    alone, so only what actually changed is written. Custom properties are written directly, instead of via
+    `change_property` which builds the full properties dict of the patient for every property.
+
+    Parameters
+    ----------
+    grid_world
+        The MATRX gridworld
+    properties_per_patient
+        The new properties per patient, as {patient_id: {property: value}}
+    policy
+        Optional function `policy(patient, properties)` that returns which of the new properties may be set for the
+        patient (its AgentBody), such as the triage policies in `triage_policies`
+    """
+    for patient_ID, properties in properties_per_patient.items():
+        patient = grid_world.registered_agents.get(patient_ID, None)
+        if patient is None:
+            continue
+        if policy is not None:
+            properties = policy(patient, properties)
+
+        for prop_key, prop_val in properties.items():
+            if prop_key in patient.custom_properties:
+                if patient.custom_properties[prop_key] == prop_val:
+                    continue
+                patient.custom_properties[prop_key] = prop_val
+            else:
+                # mandatory properties, such as `is_traversable`
+                patient.change_property(prop_key, prop_val)
+
 
 class AssignBed(Action):
     """ Assign a patient to a hospital bed """
@@ -16,10 +54,9 @@ class AssignBed(Action):
             return AssignBedResult(AssignBedResult.OBJECT_NOT_FOUND.replace('object_id'.upper(),
                                                                             str(kwargs['object_id'])), False)
 
-        # check if the bed is occupied
-        bed = grid_world.environment_objects[kwargs['object_id']]
-        if bed.properties['assigned_patient'] is not None:
-            return AssignBedResult(AssignBedResult.BED_OCCUPIED, True)
+        # check if the bed is occupied. Free beds and beds reserved by the patient can be assigned
+        if get_bed_registry(grid_world=grid_world).is_occupied(kwargs['object_id']):
+            return AssignBedResult(AssignBedResult.BED_OCCUPIED, False)
 
 
         # success
@@ -27,7 +64,7 @@ class AssignBed(Action):
 
 
     def mutate(self, grid_world, agent_id, **kwargs):
-        bed = grid_world.environment_objects[kwargs['object_id']]
+        bed_registry = get_bed_registry(grid_world=grid_world)
 
         # unassign the old bed
         agent_bed = grid_world.registered_agents[agent_id].properties['current_bed_id']
@@ -35,11 +72,13 @@ class AssignBed(Action):
             # grid_world.environment_objects[agent_bed].is_traversable = False
             grid_world.environment_objects[agent_bed].change_property('assigned_patient', 'free')
             grid_world.environment_objects[agent_bed].change_property('is_traversable', False)
+            bed_registry.release(agent_bed)
 
         # assign patient to the new bed
         bed = grid_world.environment_objects[kwargs['object_id']]
         bed.change_property('assigned_patient', agent_id)
         bed.change_property('is_traversable', True)
+        bed_registry.occupy(kwargs['object_id'])
         grid_world.registered_agents[agent_id].change_property('current_bed_id', kwargs['object_id'])
 
         return AssignBedResult(AssignBedResult.ACTION_SUCCEEDED, True)
@@ -72,7 +111,7 @@ class RemovePatient(Action):
 
         # check if the agent exists
         if kwargs['object_id'] not in grid_world.registered_agents.keys():
-            return RemovePatientResult(AssignBedResult.AGENT_NOT_FOUND.replace('object_id'.upper(),
+            return RemovePatientResult(RemovePatientResult.AGENT_NOT_FOUND.replace('object_id'.upper(),
                                                                             str(kwargs['object_id'])), False)
         
         # success
@@ -83,21 +122,69 @@ class RemovePatient(Action):
     def mutate(self, grid_world, agent_id, **kwargs):
         object_id = kwargs['object_id']
 
-        # unassign the old bed
-        agent_bed = grid_world.registered_agents[object_id].properties['current_bed_id']
-        if agent_bed is not None:
-            grid_world.environment_objects[agent_bed].change_property('assigned_patient', 'free')
-
-        # remove the agent, success is whether GridWorld succeeded
-        success = grid_world.remove_from_grid(object_id)
-
         # check if we succeeded in removing the agent
-        if success:
+        if remove_patient(grid_world, object_id):
             return RemovePatientResult(RemovePatientResult.ACTION_SUCCEEDED.replace('object_id'.upper(), str(object_id)), True)
         else:
             return RemovePatientResult(RemovePatientResult.REMOVAL_FAILED.replace('object_id'.upper(), str(object_id)), False)
 
 
+class RemovePatients(Action):
+    """ An action that removes multiple patients from the grid in one tick, and frees their beds """
+
+    def __init__(self, duration_in_ticks=0):
+        super().__init__(duration_in_ticks)
+
+    def is_possible(self, grid_world, agent_id, **kwargs):
+        if 'object_ids' not in kwargs:
+            return RemovePatientResult(RemovePatientResult.NO_OBJECT_ID, False)
+
+        # success, patients that no longer exist are skipped
+        return RemovePatientResult(RemovePatientResult.ACTION_SUCCEEDED.replace('object_id'.upper(),
+                                                                                str(kwargs['object_ids'])), True)
+
+    def mutate(self, grid_world, agent_id, **kwargs):
+        failed = []
+        for object_id in kwargs['object_ids']:
+            if object_id in grid_world.registered_agents and not remove_patient(grid_world, object_id):
+                failed.append(object_id)
+
+        # check if we succeeded in removing all agents
+        if len(failed) > 0:
+            return RemovePatientResult(RemovePatientResult.REMOVAL_FAILED.replace('object_id'.upper(), str(failed)),
+                                       False)
+        return RemovePatientResult(RemovePatientResult.ACTION_SUCCEEDED.replace('object_id'.upper(),
+                                                                                str(kwargs['object_ids'])), True)
+
+
+def remove_patient(grid_world, object_id):
+    """ Remove a patient from the gridworld, free its bed and any bed reserved for it that it didn't get to, and return
+    it to the patient pool so it can be recycled for a new arrival. Returns whether GridWorld succeeded in removing it
+
+    Parameters
+    ----------
+    grid_world
+        The MATRX gridworld
+    object_id
+        The ID of the patient
+    """
+    # unassign the old bed, and give back any bed reserved for the patient
+    bed_registry = get_bed_registry(grid_world=grid_world)
+    agent_bed = grid_world.registered_agents[object_id].properties['current_bed_id']
+    if agent_bed is not None:
+        grid_world.environment_objects[agent_bed].change_property('assigned_patient', 'free')
+        bed_registry.release(agent_bed)
+    bed_registry.release_reservations(object_id)
+
+    if not grid_world.remove_from_grid(object_id):
+        return False
+
+    get_patient_pool(grid_world=grid_world).release(grid_world, object_id)
+    get_event_bus(grid_world=grid_world).publish(EventKind.PATIENT_REMOVED, patient_id=object_id,
+                                                 tick=grid_world.current_nr_ticks)
+    return True
+
+
 class RemovePatientResult(ActionResult):
     """ Result when assignment failed """
     # failed
@@ -134,6 +221,7 @@ class UnassignBed(Action):
             # grid_world.environment_objects[agent_bed].is_traversable = False
             grid_world.environment_objects[agent_bed].change_property('assigned_patient', 'free')
             grid_world.environment_objects[agent_bed].change_property('is_traversable', False)
+            get_bed_registry(grid_world=grid_world).release(agent_bed)
 
 
         grid_world.registered_agents[agent_id].change_property('current_bed_id', None)
@@ -156,108 +244,69 @@ class UnassignBedResult(ActionResult):
 
 
 
-class SetAgentPlannedTriageDecisions(Action):
-    """ Set the (provisional) triage decisions of the agent for patients"""
-
-    def __init__(self, duration_in_ticks=0):
-        super().__init__(duration_in_ticks)
-
-    def is_possible(self, grid_world, agent_id, **kwargs):
-
-        if not 'triage_decisions' in kwargs:
-            return SetAgentPlannedTriageDecisionsResult("Missing keyword argument 'triage_decisions'", False)
-        elif not 'triage_decision_influences' in kwargs:
-            return SetAgentPlannedTriageDecisionsResult("Missing keyword argument 'triage_decision_influences'", False)
-        elif not 'patients_info' in kwargs:
-            return AgentTriageTDP2Result("Missing keyword argument 'patients_info'", False)
-
-        # success
-        return SetAgentPlannedTriageDecisionsResult(SetAgentPlannedTriageDecisionsResult.ACTION_SUCCEEDED, True)
-
-
-    def mutate(self, grid_world, agent_id, **kwargs):
-
-        # set the provisional triage decisions
-        for patient_ID, triage_decision in kwargs['triage_decisions'].items():
-            if patient_ID in grid_world.registered_agents:
-                grid_world.registered_agents[patient_ID].change_property("agent_planned_triage_decision", triage_decision)
-
-        # set the triage_decision_influences that explain why the triage decision was made
-        for patient_ID, triage_decision_influences in kwargs['triage_decision_influences'].items():
-            if patient_ID in grid_world.registered_agents:
-                grid_world.registered_agents[patient_ID].change_property("agent_triage_decision_influences", triage_decision_influences)
-
-        # update the info of the patient as passed by the agent
-        for patient_ID, patient_props in kwargs['patients_info'].items():
-            for prop_key, prop_val in patient_props.items():
-                if patient_ID in grid_world.registered_agents:
-                    grid_world.registered_agents[patient_ID].change_property(prop_key, prop_val)
+def keep_human_assignments(patient, properties):
+    """ Triage policy of dynamic task allocation: the agent is not allowed to take patients from the human """
+    if "assigned_to" in properties and patient.custom_properties.get('assigned_to', None) == 'person':
+        properties = {prop_key: prop_val for prop_key, prop_val in properties.items() if prop_key != "assigned_to"}
+    return properties
 
-        return SetAgentPlannedTriageDecisionsResult(SetAgentPlannedTriageDecisionsResult.ACTION_SUCCEEDED, True)
 
+# the triage policy per TDP, which filters the properties the triage agent sets for a patient (see
+# `set_patient_properties`). Without a policy the agent can set all properties
+triage_policies = {"tdp_supervised_autonomy": None,
+                   "tdp_dynamic_task_allocation": keep_human_assignments}
 
-class SetAgentPlannedTriageDecisionsResult(ActionResult):
-    """ Result when assignment succeeded / failed """
-    # failed
 
-    # success
-    ACTION_SUCCEEDED = "Agent was successfully assigned to the hospital bed."
-
-    def __init__(self, result, succeeded):
-        super().__init__(result, succeeded)
-
-
-
-class AgentTriageTDP2(Action):
-    """ Set the (provisional) triage decisions of the agent for patients"""
+class SetAgentTriageDecisions(Action):
+    """ Set the (provisional) triage decisions of the agent for patients, the influences that explain them and any other
+    info of the patients passed by the agent. What the agent is allowed to change differs per TDP, see
+    `triage_policies` """
 
     def __init__(self, duration_in_ticks=0):
         super().__init__(duration_in_ticks)
 
     def is_possible(self, grid_world, agent_id, **kwargs):
 
-        if not 'triage_decisions' in kwargs:
-            return AgentTriageTDP2Result("Missing keyword argument 'triage_decisions'", False)
-        elif not 'triage_decision_influences' in kwargs:
-            return AgentTriageTDP2Result("Missing keyword argument 'triage_decision_influences'", False)
-        elif not 'patients_info' in kwargs:
-            return AgentTriageTDP2Result("Missing keyword argument 'patients_info'", False)
+        for key in ['triage_decisions', 'triage_decision_influences', 'patients_info']:
+            if key not in kwargs:
+                return SetAgentTriageDecisionsResult(f"Missing keyword argument '{key}'", False)
 
-        # success
-        return AgentTriageTDP2Result(AgentTriageTDP2Result.ACTION_SUCCEEDED, True)
+        if kwargs.get('triage_policy', None) is not None and kwargs['triage_policy'] not in triage_policies:
+            return SetAgentTriageDecisionsResult(SetAgentTriageDecisionsResult.UNKNOWN_POLICY.replace(
+                'policy'.upper(), str(kwargs['triage_policy'])), False)
 
+        # success
+        return SetAgentTriageDecisionsResult(SetAgentTriageDecisionsResult.ACTION_SUCCEEDED, True)
 
     def mutate(self, grid_world, agent_id, **kwargs):
+        triage_decisions = kwargs['triage_decisions']
+        triage_decision_influences = kwargs['triage_decision_influences']
+        patients_info = kwargs['patients_info']
 
-        # set the provisional triage decisions
-        for patient_ID, triage_decision in kwargs['triage_decisions'].items():
-            if patient_ID in grid_world.registered_agents:
-                grid_world.registered_agents[patient_ID].change_property("agent_planned_triage_decision", triage_decision)
-
-        # set the triage_decision_influences that explain why the triage decision was made
-        for patient_ID, triage_decision_influences in kwargs['triage_decision_influences'].items():
-            if patient_ID in grid_world.registered_agents:
-                grid_world.registered_agents[patient_ID].change_property("agent_triage_decision_influences", triage_decision_influences)
+        # the triage decision, the influences that explain why the triage decision was made and the info of every
+        # patient, in a single pass
+        properties_per_patient = {}
+        for patient_ID in dict.fromkeys(list(triage_decisions) + list(triage_decision_influences) + list(patients_info)):
+            properties = dict(patients_info.get(patient_ID, {}))
+            if patient_ID in triage_decisions:
+                properties["agent_planned_triage_decision"] = triage_decisions[patient_ID]
+            if patient_ID in triage_decision_influences:
+                properties["agent_triage_decision_influences"] = triage_decision_influences[patient_ID]
+            properties_per_patient[patient_ID] = properties
 
-        # update the info of the patient as passed by the agent
-        for patient_ID, patient_props in kwargs['patients_info'].items():
-            for prop_key, prop_val in patient_props.items():
-                if patient_ID in grid_world.registered_agents:
-                    # the agent is not allowed to take patients from the human
-                    if prop_key == "assigned_to" and grid_world.registered_agents[patient_ID].properties['assigned_to'] == 'person':
-                        continue
+        set_patient_properties(grid_world, properties_per_patient,
+                               policy=triage_policies.get(kwargs.get('triage_policy', None), None))
 
-                    grid_world.registered_agents[patient_ID].change_property(prop_key, prop_val)
+        return SetAgentTriageDecisionsResult(SetAgentTriageDecisionsResult.ACTION_SUCCEEDED, True)
 
-        return AgentTriageTDP2Result(AgentTriageTDP2Result.ACTION_SUCCEEDED, True)
 
-
-class AgentTriageTDP2Result(ActionResult):
-    """ Result when assignment succeeded / failed """
+class SetAgentTriageDecisionsResult(ActionResult):
+    """ Result when setting the triage decisions succeeded / failed """
     # failed
+    UNKNOWN_POLICY = "There is no triage policy POLICY."
 
     # success
-    ACTION_SUCCEEDED = "Agent was successfully assigned to the hospital bed."
+    ACTION_SUCCEEDED = "The triage decisions of the agent were set."
 
     def __init__(self, result, succeeded):
         super().__init__(result, succeeded)
@@ -0,0 +1,568 @@
+import ast
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from mhc.hospital_layout import mhc_hospital_layout
+from mhc.loggers import apply_log_delta
+
+# the columns of the questionnaire answers, which are written without header by the visualization server
+questionnaire_columns = ["agent_id", "q1", "q2", "q3", "q4", "q4a", "q4b"]
+
+# the tables loaded for every session, with the columns they always have
+table_columns = {
+    "patient_status": ["session", "world_nr", "tick_nr", "agent_id", "symptoms", "health", "medical_care"],
+    "new_patients": ["session", "world_nr", "tick_nr", "agent_id"],
+    "triage_decisions": ["session", "world_nr", "tick_nr", "agent_id", "triage_decision", "health", "symptoms",
+                         "decided_by", "triaged_by", "correct_tick"],
+    "triage_agent": ["session", "world_nr", "tick_nr", "triage_agent", "agent_id", "triage_score",
+                     "agent_triage_decision"],
+    "triage_influences": ["session", "world_nr", "tick_nr", "triage_agent", "agent_id", "rule", "influence",
+                          "reason"],
+    "questionnaire": ["session"] + questionnaire_columns,
+    "timelines": ["session", "world_nr", "agent_id", "patient_name", "arrival_tick", "triage_tick", "time_to_triage",
+                  "triage_decision", "decided_by", "triaged_by", "agent_triage_decision", "outcome", "outcome_tick",
+                  "last_tick", "final_health", "min_health", "health_ticks", "health_curve"],
+}
+
+# the version of the tables, cached tables of another version are loaded again
+analysis_version = 1
+cache_folder_name = "analysis_cache"
+
+# the number of beds per room in the MHC hospital of the cases, to calculate the bed utilisation. For a generated
+# hospital, use `mhc.hospital_layout.get_bed_capacity` with the config of the case
+default_bed_capacity = {room: len(beds) for room, beds in mhc_hospital_layout({}, [24, 28])['beds'].items()}
+
+# a numpy number as written by its repr with numpy 2, e.g. `np.float64(47.16)`
+numpy_number_pattern = re.compile(r"\bnp\.(?:float|int|uint|bool)\w*\(([^()]*)\)")
+
+session_name_pattern = re.compile(r"^(?:test_subject_(?P<test_subject_id>.+?)_)?(?P<tdp>.+)_"
+                                  r"(?P<timestamp>\d{2}-\d{2}-\d{4}_\d{2}-\d{2})$")
+
+
+def find_sessions(results_folder="Results"):
+    """ Returns the folders of all sessions in the results folder, being the folders with logs of a world or
+    questionnaire answers
+
+    Parameters
+    ----------
+    results_folder
+        The folder in which the cases save their logs
+    """
+    sessions = []
+    for name in sorted(os.listdir(results_folder)):
+        folder = os.path.join(results_folder, name)
+        if not os.path.isdir(folder):
+            continue
+        contents = os.listdir(folder)
+        if "QuestionnaireAnswers.csv" in contents or any(entry.startswith("world_") for entry in contents):
+            sessions.append(folder)
+    return sessions
+
+
+def parse_session_name(session_folder):
+    """ Returns the test subject ID, TDP and timestamp of a session from its folder name
+    (`test_subject_{id}_{tdp}_{timestamp}` or `{tdp}_{timestamp}`). Unknown parts are None """
+    name = os.path.basename(os.path.normpath(session_folder))
+    match = session_name_pattern.match(name)
+    if match is None:
+        return {"session": name, "test_subject_id": None, "tdp": None, "timestamp": None}
+    return dict(match.groupdict(), session=name)
+
+
+def find_log_files(session_folder, prefix):
+    """ Returns the log files with the prefix in a session, per log. The parts of a Parquet log (see
+    `mhc.loggers.ParquetLogFile`) are grouped in one log, in the order in which they were written
+
+    Parameters
+    ----------
+    session_folder
+        The folder of the session, e.g. Results/test_subject_1_baseline_01-01-2021_10-00
+    prefix
+        The file name prefix of the logger, e.g. "patient_status"
+    """
+    file_pattern = re.compile(r"^(?P<log>" + re.escape(prefix) + r"_\d{4}-\d{2}-\d{2}_\d{6})(?:_(?P<part>\d+))?"
+                              r"\.(?:csv|jsonl|parquet)(?:\.gz|\.zst)?$")
+    logs = {}
+    for world_folder in sorted(os.listdir(session_folder)):
+        world_path = os.path.join(session_folder, world_folder)
+        if not world_folder.startswith("world_") or not os.path.isdir(world_path):
+            continue
+        for file_name in os.listdir(world_path):
+            match = file_pattern.match(file_name)
+            if match is not None:
+                part = int(match.group("part")) if match.group("part") is not None else 0
+                logs.setdefault(os.path.join(world_path, match.group("log")), []).append(
+                    (part, os.path.join(world_path, file_name)))
+
+    return [[path for _, path in sorted(parts)] for _, parts in sorted(logs.items())]
+
+
+def read_log_file(file_path, delimiter=";"):
+    """ Read a log file in the csv, JSON Lines or Parquet format, optionally gzip or zstd compressed. Values that were
+    logged as dicts or lists in a csv file are parsed again """
+    if file_path.endswith(".parquet"):
+        return pd.read_parquet(file_path)
+    elif ".jsonl" in file_path:
+        return pd.read_json(file_path, lines=True, compression="infer", convert_dates=False)
+
+    log = pd.read_csv(file_path, sep=delimiter, compression="infer")
+    for column in log.columns:
+        if not pd.api.types.is_numeric_dtype(log[column]):
+            log[column] = log[column].map(parse_logged_value)
+    return log
+
+
+def parse_logged_value(value):
+    """ Parse a dict or list that was logged in a csv file as its string representation. Numpy numbers in older logs
+    (e.g. `np.float64(47.16)`) are parsed as plain numbers """
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        try:
+            return ast.literal_eval(numpy_number_pattern.sub(r"\1", value))
+        except (ValueError, SyntaxError):
+            return value
+    return value
+
+
+def read_log(file_paths):
+    """ Read all files of a log into one DataFrame """
+    logs = [read_log_file(file_path) for file_path in file_paths]
+    logs = [log for log in logs if len(log) > 0]
+    if len(logs) == 0:
+        return pd.DataFrame()
+    return pd.concat(logs, ignore_index=True)
+
+
+def is_missing(value):
+    """ Check if a logged value is missing, such as a field that was not in a delta """
+    return value is None or (isinstance(value, float) and value != value) or value == ""
+
+
+def read_reasons(log_file_path, delimiter=";"):
+    """ Returns the reason per reason ID of a compact triage agent log, from the reason table next to the log file """
+    reasons_path = re.sub(r"(_\d{4}-\d{2}-\d{2}_\d{6})(?:_\d+)?\.(?:csv|jsonl|parquet)(?:\.gz|\.zst)?$", r"\1",
+                          log_file_path) + "_reasons.csv"
+    if not os.path.isfile(reasons_path):
+        return {}
+    reasons = pd.read_csv(reasons_path, sep=delimiter)
+    return dict(zip(reasons['reason_id'], reasons['reason']))
+
+
+def load_patient_status(session_folder):
+    """ Load the patient status logs of a session in the long format: one row per patient per logged tick. Logs in the
+    csv (wide) format are unpacked, and delta logs are reconstructed to the full status of all patients in every logged
+    tick """
+    rows = []
+    for file_paths in find_log_files(session_folder, "patient_status"):
+        log = read_log(file_paths)
+        if len(log) == 0:
+            continue
+        log = log.sort_values("tick_nr", kind="stable")
+        delta_logged = "keyframe" in log.columns
+
+        # csv format, all patient statusses of a tick in one dict
+        if "status_per_patient" in log.columns:
+            unparsed = log['status_per_patient'][log['status_per_patient'].map(lambda value: isinstance(value, str))]
+            if len(unparsed) > 0:
+                raise Exception(f"Could not parse the patient status of {len(unparsed)} of the {len(log)} rows in "
+                                f"{file_paths[0]}, e.g. {unparsed.iloc[0][:200]}")
+
+            state = {}
+            for row in log.to_dict("records"):
+                statusses = row['status_per_patient'] if isinstance(row['status_per_patient'], dict) else {}
+                if delta_logged:
+                    state = apply_log_delta(state, {'status_per_patient': statusses}, bool(row['keyframe']))
+                    statusses = state.get('status_per_patient', {})
+                for agent_id, patient_info in statusses.items():
+                    rows.append(dict(patient_info, agent_id=agent_id, world_nr=row['world_nr'],
+                                     tick_nr=row['tick_nr']))
+
+        # long format, one patient status per row
+        elif delta_logged:
+            statusses = {}
+            for (world_nr, tick_nr), tick_rows in log.groupby(["world_nr", "tick_nr"], sort=False):
+                tick_rows = tick_rows.to_dict("records")
+                if any(row['keyframe'] for row in tick_rows):
+                    statusses = {}
+                for row in tick_rows:
+                    if row['removed']:
+                        statusses.pop(row['agent_id'], None)
+                    else:
+                        statusses[row['agent_id']] = {"symptoms": row['symptoms'], "health": row['health'],
+                                                      "medical_care": row['medical_care']}
+                for agent_id, patient_info in statusses.items():
+                    rows.append(dict(patient_info, agent_id=agent_id, world_nr=world_nr, tick_nr=tick_nr))
+        else:
+            rows.extend(log.to_dict("records"))
+
+    return to_table(rows, "patient_status")
+
+
+def load_log(session_folder, prefix, table):
+    """ Load a log with one row per logged event (such as the new patients or triage decisions) of a session """
+    logs = [read_log(file_paths) for file_paths in find_log_files(session_folder, prefix)]
+    logs = [log for log in logs if len(log) > 0]
+    if len(logs) == 0:
+        return to_table([], table)
+    return to_table(pd.concat(logs, ignore_index=True), table)
+
+
+def load_triage_agent(session_folder):
+    """ Load the triage agent logs of a session, as the triage score and decision per patient (`triage_agent`) and the
+    influence and reason of every triage rule per patient (`triage_influences`). Delta logs are reconstructed first,
+    and the reason IDs of compact logs are replaced by the reasons.
+
+    The triage agent logs every tick, so to keep the tables small a row is only added when the score, decision or
+    influence of a patient changed since its previous row. The value at any tick is the value of the last row before
+    it """
+    score_rows = []
+    influence_rows = []
+    for file_paths in find_log_files(session_folder, "triage_agent"):
+        log = read_log(file_paths)
+        if len(log) == 0:
+            continue
+        reasons = read_reasons(file_paths[0])
+        delta_logged = "keyframe" in log.columns
+        agent_columns = [column for column in log.columns if " - " in column]
+        triage_agents = sorted(set(column.split(" - ")[0] for column in agent_columns))
+
+        state = {}
+        previous_scores = {}
+        previous_influences = {}
+        for row in log.sort_values("tick_nr", kind="stable").to_dict("records"):
+            # the full record of this tick
+            record = {column: row[column] for column in agent_columns if not is_missing(row[column])}
+            if delta_logged:
+                state = apply_log_delta(state, record, bool(row['keyframe']))
+                record = state
+
+            for triage_agent in triage_agents:
+                scores = record.get(f"{triage_agent} - triage_scores", None) or {}
+                decisions = record.get(f"{triage_agent} - triage_decisions", None) or {}
+                influences = record.get(f"{triage_agent} - triage_score_influences", None) or {}
+                reason_ids = record.get(f"{triage_agent} - triage_score_reasons", None)
+
+                for agent_id in sorted(set(scores) | set(decisions)):
+                    score = (scores.get(agent_id, None), decisions.get(agent_id, None))
+                    if previous_scores.get((triage_agent, agent_id), None) != score:
+                        previous_scores[(triage_agent, agent_id)] = score
+                        score_rows.append({"world_nr": row['world_nr'], "tick_nr": row['tick_nr'],
+                                           "triage_agent": triage_agent, "agent_id": agent_id,
+                                           "triage_score": score[0], "agent_triage_decision": score[1]})
+
+                for agent_id, patient_influences in influences.items():
+                    for rule, influence in patient_influences.items():
+                        # compact logs have the influence, and the reason ID in a separate column
+                        if reason_ids is not None:
+                            reason = reasons.get(reason_ids.get(agent_id, {}).get(rule, None), None)
+                        else:
+                            influence, reason = influence['influence'], influence['reason']
+
+                        if previous_influences.get((triage_agent, agent_id, rule), None) != (influence, reason):
+                            previous_influences[(triage_agent, agent_id, rule)] = (influence, reason)
+                            influence_rows.append({"world_nr": row['world_nr'], "tick_nr": row['tick_nr'],
+                                                   "triage_agent": triage_agent, "agent_id": agent_id, "rule": rule,
+                                                   "influence": influence, "reason": reason})
+
+    return to_table(score_rows, "triage_agent"), to_table(influence_rows, "triage_influences")
+
+
+def load_questionnaire(session_folder):
+    """ Load the questionnaire answers of a session, if there are any """
+    file_path = os.path.join(session_folder, "QuestionnaireAnswers.csv")
+    if not os.path.isfile(file_path):
+        return to_table([], "questionnaire")
+    return to_table(pd.read_csv(file_path, sep=";", header=None, names=questionnaire_columns), "questionnaire")
+
+
+def build_timelines(tables):
+    """ Build the timeline of every patient in a session from its tables: arrival, health curve, triage decision, who
+    decided, what the triage agent advised and the outcome.
+
+    The outcome is "deceased" or "healed" when the health of the patient reached 0 or 100, "sent_home" when the patient
+    was sent home, and "in_hospital" otherwise. The outcome tick is the first logged tick at which the outcome was
+    reached, so it is as precise as the log strategy of the patient status log (every 10 ticks by default). The advice
+    of the triage agent is its last decision for the patient at the tick of the triage decision
+    """
+    status = tables['patient_status']
+    new_patients = tables['new_patients'].drop_duplicates(["world_nr", "agent_id"]).set_index(["world_nr", "agent_id"])
+    decisions = tables['triage_decisions'].drop_duplicates(["world_nr", "agent_id"]).set_index(["world_nr", "agent_id"])
+    agent_decisions = {key: group for key, group in tables['triage_agent'].groupby(["world_nr", "agent_id"])}
+
+    patients = set(zip(status['world_nr'], status['agent_id'])) | set(new_patients.index) | set(decisions.index)
+    status_per_patient = {key: group.sort_values("tick_nr") for key, group in status.groupby(["world_nr", "agent_id"])}
+
+    rows = []
+    for world_nr, agent_id in sorted(patients, key=str):
+        row = {"world_nr": world_nr, "agent_id": agent_id}
+        patient_status = status_per_patient.get((world_nr, agent_id), None)
+
+        # arrival
+        if (world_nr, agent_id) in new_patients.index:
+            new_patient = new_patients.loc[(world_nr, agent_id)]
+            row['patient_name'] = new_patient.get("patient_name", None)
+            row['arrival_tick'] = new_patient.get("ticks", new_patient['tick_nr'])
+        elif patient_status is not None:
+            row['arrival_tick'] = patient_status['tick_nr'].iloc[0]
+
+        # triage decision, and what the triage agent advised at that moment
+        if (world_nr, agent_id) in decisions.index:
+            decision = decisions.loc[(world_nr, agent_id)]
+            row['triage_tick'] = decision.get("correct_tick", decision['tick_nr'])
+            row['triage_decision'] = decision['triage_decision']
+            row['decided_by'] = decision.get("decided_by", None)
+            row['triaged_by'] = decision.get("triaged_by", None)
+            if row.get("arrival_tick", None) is not None:
+                row['time_to_triage'] = row['triage_tick'] - row['arrival_tick']
+
+            advice = agent_decisions.get((world_nr, agent_id), None)
+            if advice is not None:
+                advice = advice[advice['tick_nr'] <= row['triage_tick']].dropna(subset=["agent_triage_decision"])
+                if len(advice) > 0:
+                    row['agent_triage_decision'] = advice['agent_triage_decision'].iloc[-1]
+
+        # health curve and outcome
+        if patient_status is not None:
+            health = patient_status['health'].astype(float)
+            row['health_ticks'] = patient_status['tick_nr'].astype(int).tolist()
+            row['health_curve'] = health.tolist()
+            row['last_tick'] = patient_status['tick_nr'].iloc[-1]
+            row['final_health'] = health.iloc[-1]
+            row['min_health'] = health.min()
+
+            if (health <= 0).any():
+                row['outcome'] = "deceased"
+                row['outcome_tick'] = patient_status['tick_nr'][health <= 0].iloc[0]
+            elif (health >= 100).any():
+                row['outcome'] = "healed"
+                row['outcome_tick'] = patient_status['tick_nr'][health >= 100].iloc[0]
+            elif (patient_status['medical_care'] == "huis").any():
+                row['outcome'] = "sent_home"
+                row['outcome_tick'] = patient_status['tick_nr'][patient_status['medical_care'] == "huis"].iloc[0]
+            else:
+                row['outcome'] = "in_hospital"
+
+        rows.append(row)
+
+    return to_table(rows, "timelines")
+
+
+def to_table(rows, table):
+    """ Returns the rows (a list of dicts or a DataFrame) as a DataFrame with at least the columns of the table """
+    data = pd.DataFrame(rows)
+    for column in table_columns[table]:
+        if column not in data.columns:
+            data[column] = None
+    other_columns = [column for column in data.columns if column not in table_columns[table]]
+    return data[table_columns[table] + other_columns]
+
+
+def get_source_files(session_folder):
+    """ Returns the log files of a session with their size and modification time, to check if the cache is up to
+    date """
+    file_paths = [os.path.join(session_folder, "QuestionnaireAnswers.csv")]
+    for world_folder in sorted(os.listdir(session_folder)):
+        world_path = os.path.join(session_folder, world_folder)
+        if world_folder.startswith("world_") and os.path.isdir(world_path):
+            file_paths += [os.path.join(world_path, file_name) for file_name in sorted(os.listdir(world_path))]
+
+    source_files = {"analysis_version": analysis_version}
+    for file_path in file_paths:
+        if os.path.isfile(file_path):
+            file_stat = os.stat(file_path)
+            source_files[os.path.relpath(file_path, session_folder)] = [file_stat.st_size, file_stat.st_mtime_ns]
+    return source_files
+
+
+def get_source_fingerprint(session_folder):
+    """ Returns a hash of the sizes and modification times of the log files of a session, which changes when any of its
+    logs changes """
+    return hashlib.md5(json.dumps(get_source_files(session_folder), sort_keys=True).encode()).hexdigest()
+
+
+def read_cache(session_folder, source_files):
+    """ Returns the cached tables of a session, or None if there is no cache or it is out of date """
+    cache_folder = os.path.join(session_folder, cache_folder_name)
+    try:
+        with open(os.path.join(cache_folder, "source_files.json")) as source_files_file:
+            if json.load(source_files_file) != source_files:
+                return None
+        return {table: pd.read_parquet(os.path.join(cache_folder, f"{table}.parquet")) for table in table_columns}
+    except (OSError, ValueError, ImportError):
+        return None
+
+
+def write_cache(session_folder, tables, source_files):
+    """ Cache the tables of a session as Parquet files, next to the logs. Requires pyarrow (or fastparquet) """
+    cache_folder = os.path.join(session_folder, cache_folder_name)
+    os.makedirs(cache_folder, exist_ok=True)
+    try:
+        for table, data in tables.items():
+            data.to_parquet(os.path.join(cache_folder, f"{table}.parquet"), index=False)
+    except ImportError:
+        print("Not caching the analysis tables, this requires pyarrow. Install it with `pip install pyarrow`")
+        return
+
+    # written last, so an interrupted write is never mistaken for a valid cache
+    with open(os.path.join(cache_folder, "source_files.json"), mode="w") as source_files_file:
+        json.dump(source_files, source_files_file)
+
+
+def load_session(session_folder, use_cache=True):
+    """ Load all logs of a session as tidy DataFrames, and reconstruct the timeline of every patient. Returns a dict
+    with the tables `patient_status`, `new_patients`, `triage_decisions`, `triage_agent`, `triage_influences`,
+    `questionnaire` and `timelines`, each with a `session` column with the name of the session folder.
+
+    The tables are cached as Parquet in the `analysis_cache` folder of the session, and loaded from there as long as
+    the logs of the session don't change
+
+    Parameters
+    ----------
+    session_folder
+        The folder of the session, e.g. Results/test_subject_1_baseline_01-01-2021_10-00
+    use_cache
+        Whether to read and write the cached tables
+    """
+    source_files = get_source_files(session_folder)
+    if use_cache:
+        tables = read_cache(session_folder, source_files)
+        if tables is not None:
+            return tables
+
+    tables = {"patient_status": load_patient_status(session_folder),
+              "new_patients": load_log(session_folder, "new_patients", "new_patients"),
+              "triage_decisions": load_log(session_folder, "triage_decisions", "triage_decisions"),
+              "questionnaire": load_questionnaire(session_folder)}
+    tables['triage_agent'], tables['triage_influences'] = load_triage_agent(session_folder)
+    tables['timelines'] = build_timelines(tables)
+
+    session = parse_session_name(session_folder)['session']
+    for data in tables.values():
+        data['session'] = session
+
+    if use_cache:
+        write_cache(session_folder, tables, source_files)
+    return tables
+
+
+def load_sessions(session_folders=None, results_folder="Results", workers=None, use_cache=True):
+    """ Load the logs of many sessions in parallel (see `load_session`), one session per process. Returns the same
+    tables as `load_session` with the rows of all sessions, plus a `sessions` table with the test subject ID, TDP
+    and timestamp of every session
+
+    Parameters
+    ----------
+    session_folders
+        The folders of the sessions to load, or None to load all sessions in the results folder
+    results_folder
+        The folder with the sessions, used if no session folders are passed
+    workers
+        The number of processes, by default the number of CPUs
+    use_cache
+        Whether to read and write the cached tables of every session
+    """
+    if session_folders is None:
+        session_folders = find_sessions(results_folder)
+
+    if len(session_folders) <= 1 or workers == 1:
+        session_tables = [load_session(session_folder, use_cache) for session_folder in session_folders]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            session_tables = list(executor.map(load_session, session_folders, [use_cache] * len(session_folders)))
+
+    tables = {}
+    for table in table_columns:
+        data = [session[table] for session in session_tables if len(session[table]) > 0]
+        tables[table] = pd.concat(data, ignore_index=True) if len(data) > 0 else to_table([], table)
+    tables['sessions'] = pd.DataFrame([dict(parse_session_name(session_folder), path=session_folder)
+                                       for session_folder in session_folders],
+                                      columns=["session", "test_subject_id", "tdp", "timestamp", "path"])
+    return tables
+
+
+def summarize_session(session_folder, bed_capacity=None, use_cache=True):
+    """ Calculate the metrics of a session: the mortality, the time to triage (in ticks), how often the human made the
+    same triage decision as the triage agent advised at that moment, and the mean utilisation of the beds per room.
+    Returns a dict with one value per metric. Metrics that can't be calculated are None, e.g. the mortality of a
+    session without patient status log
+
+    Parameters
+    ----------
+    session_folder
+        The folder of the session, e.g. Results/test_subject_1_baseline_01-01-2021_10-00
+    bed_capacity
+        The number of beds per room, by default the beds of the hospital in the cases
+    use_cache
+        Whether to read and write the cached tables of the session
+    """
+    bed_capacity = default_bed_capacity if bed_capacity is None else bed_capacity
+    tables = load_session(session_folder, use_cache)
+    timelines = tables['timelines']
+    status = tables['patient_status']
+
+    session = parse_session_name(session_folder)
+    metrics = {key: session[key] for key in ["session", "test_subject_id", "tdp", "timestamp"]}
+    metrics['source_fingerprint'] = get_source_fingerprint(session_folder)
+
+    # mortality, the outcomes of the patients follow from their status
+    metrics['n_patients'] = len(timelines)
+    metrics['n_deceased'] = int((timelines['outcome'] == "deceased").sum()) if len(status) > 0 else None
+    metrics['mortality'] = metrics['n_deceased'] / metrics['n_patients'] \
+        if metrics['n_patients'] > 0 and metrics['n_deceased'] is not None else None
+
+    # time to triage
+    triaged = timelines.dropna(subset=["triage_decision"])
+    time_to_triage = triaged['time_to_triage'].dropna().astype(float)
+    metrics['n_triaged'] = len(triaged)
+    metrics['mean_time_to_triage'] = time_to_triage.mean() if len(time_to_triage) > 0 else None
+    metrics['median_time_to_triage'] = time_to_triage.median() if len(time_to_triage) > 0 else None
+
+    # agreement of the human with the triage agent, logs from before the triage agent could decide have no `triaged_by`
+    human_decisions = triaged[triaged['triaged_by'].fillna("human") == "human"]
+    advised = human_decisions.dropna(subset=["agent_triage_decision"])
+    metrics['n_human_decisions'] = len(human_decisions)
+    metrics['n_agent_decisions'] = len(triaged) - len(human_decisions)
+    metrics['human_agent_agreement'] = (advised['triage_decision'] == advised['agent_triage_decision']).mean() \
+        if len(advised) > 0 else None
+
+    # mean number of patients per room in the logged ticks, relative to the number of beds
+    patients_per_room = status.groupby(["world_nr", "tick_nr"])['medical_care'].value_counts().unstack(fill_value=0)
+    for room, n_beds in bed_capacity.items():
+        utilisation = None
+        if len(patients_per_room) > 0:
+            utilisation = (patients_per_room[room].mean() if room in patients_per_room.columns else 0.0) / n_beds
+        metrics[f"bed_utilisation_{room.replace(' ', '_')}"] = utilisation
+
+    return metrics
+
+
+def summarize_conditions(session_metrics):
+    """ Aggregate the metrics of the sessions (see `summarize_session`) per condition (TDP), as the mean and standard
+    deviation over the sessions. The mortality is also given over all patients of the condition (`pooled_mortality`),
+    leaving out the sessions of which the mortality is unknown
+
+    Parameters
+    ----------
+    session_metrics
+        DataFrame with the metrics of a session per row
+    """
+    other_columns = ["session", "test_subject_id", "tdp", "timestamp", "source_fingerprint", "n_patients", "n_deceased"]
+    metric_columns = [column for column in session_metrics.columns if column not in other_columns]
+    session_metrics = session_metrics.copy()
+    for column in metric_columns + ["n_deceased"]:
+        session_metrics[column] = pd.to_numeric(session_metrics[column], errors="coerce")
+    conditions = session_metrics.groupby("tdp")
+    known_mortality = session_metrics.dropna(subset=["n_deceased"]).groupby("tdp")
+
+    summary = pd.DataFrame({"n_sessions": conditions.size(),
+                            "n_patients": conditions['n_patients'].sum(),
+                            "pooled_mortality": known_mortality['n_deceased'].sum() /
+                            known_mortality['n_patients'].sum()})
+    for column in metric_columns:
+        summary[f"{column}_mean"] = conditions[column].mean()
+        summary[f"{column}_std"] = conditions[column].std()
+    return summary.reset_index()
@@ -0,0 +1,164 @@
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+
+class ArrivalProcess(ABC):
+    """ Decides when new patients arrive at the hospital.
+
+    An alternative to the hand-written `patient_planning` keypoints in the case config, which makes it possible to drive
+    the hospital with a (large) generated stream of arrivals.
+    """
+
+    def __init__(self, random_seed=0):
+        self.rnd_gen = np.random.RandomState(random_seed)
+
+        # the time (in seconds) at which the next patient arrives, None when not calculated yet
+        self.next_arrival = None
+
+    def arrivals_until(self, second):
+        """ Returns the number of patients that arrived since the previous call, up to and including `second` """
+        if self.next_arrival is None:
+            self.next_arrival = self.calc_next_arrival(0)
+
+        n_arrivals = 0
+        while self.next_arrival <= second:
+            n_arrivals += 1
+            self.next_arrival = self.calc_next_arrival(self.next_arrival)
+
+        return n_arrivals
+
+    @abstractmethod
+    def calc_next_arrival(self, previous_arrival):
+        """ Calculate the time (in seconds) of the arrival after `previous_arrival`. Returns np.inf if there are no
+        more arrivals """
+
+
+class PoissonArrivals(ArrivalProcess):
+    """ Poisson arrivals with a time-varying rate.
+
+    The rate is piecewise constant, and specified as a list of keypoints, e.g.:
+    [{"second": 0, "patients_per_minute": 6}, {"second": 120, "patients_per_minute": 30}]
+    """
+
+    def __init__(self, rate_schedule, random_seed=0):
+        super().__init__(random_seed=random_seed)
+
+        if len(rate_schedule) == 0:
+            raise Exception("A Poisson arrival process needs at least one keypoint in its `rate_schedule`")
+
+        # sort the keypoints on time, and convert the rates to patients per second
+        rate_schedule = sorted(rate_schedule, key=lambda keypoint: keypoint['second'])
+        self.keypoint_seconds = [keypoint['second'] for keypoint in rate_schedule]
+        self.rates = [keypoint['patients_per_minute'] / 60.0 for keypoint in rate_schedule]
+
+    def calc_next_arrival(self, previous_arrival):
+        # the amount of 'rate' that has to pass until the next arrival
+        remaining = self.rnd_gen.exponential(1.0)
+
+        # walk through the rate segments, starting from the previous arrival, until the remaining rate is used up
+        t = max(previous_arrival, self.keypoint_seconds[0])
+        segment = np.searchsorted(self.keypoint_seconds, t, side='right') - 1
+        while True:
+            rate = self.rates[segment]
+            segment_end = self.keypoint_seconds[segment + 1] if segment + 1 < len(self.rates) else np.inf
+
+            if rate > 0 and t + remaining / rate <= segment_end:
+                return t + remaining / rate
+
+            # the last segment has no arrivals, so no more patients will come
+            if segment_end == np.inf:
+                return np.inf
+
+            remaining -= rate * (segment_end - t)
+            t = segment_end
+            segment += 1
+
+
+class WaveArrivals(ArrivalProcess):
+    """ Bursty arrivals: patients arrive in waves of `patients_per_wave` patients, spread randomly over
+    `wave_duration_seconds`. A new wave starts every `wave_interval_seconds`, starting at `first_wave_second` """
+
+    def __init__(self, patients_per_wave, wave_interval_seconds, wave_duration_seconds=0, first_wave_second=0,
+                 number_of_waves=None, random_seed=0):
+        super().__init__(random_seed=random_seed)
+        self.patients_per_wave = patients_per_wave
+        self.wave_interval_seconds = wave_interval_seconds
+        self.wave_duration_seconds = wave_duration_seconds
+        self.first_wave_second = first_wave_second
+        self.number_of_waves = np.inf if number_of_waves is None else number_of_waves
+
+        self.waves_generated = 0
+        self.upcoming_arrivals = []
+
+    def calc_next_arrival(self, previous_arrival):
+        # generate the arrivals of the next wave if the current one is done
+        if len(self.upcoming_arrivals) == 0:
+            if self.waves_generated >= self.number_of_waves or self.patients_per_wave <= 0:
+                return np.inf
+
+            wave_start = self.first_wave_second + self.waves_generated * self.wave_interval_seconds
+            self.upcoming_arrivals = sorted(wave_start + self.rnd_gen.uniform(0, self.wave_duration_seconds,
+                                                                              self.patients_per_wave))
+            self.waves_generated += 1
+
+        return self.upcoming_arrivals.pop(0)
+
+
+class TraceArrivals(ArrivalProcess):
+    """ Replay of a recorded arrival trace, such as the `ticks` column of a `new_patients` log.
+
+    The trace is read from the column `column` of a csv file, and multiplied with `seconds_per_unit` to get seconds (e.g.
+    use the tick duration when replaying ticks). Alternatively, the arrival times can be passed directly as a list of
+    seconds.
+    """
+
+    def __init__(self, trace_file=None, column="second", seconds_per_unit=1, delimiter=";", arrival_seconds=None,
+                 random_seed=0):
+        super().__init__(random_seed=random_seed)
+
+        if arrival_seconds is None:
+            if trace_file is None:
+                raise Exception("A trace arrival process needs either a `trace_file` or a list of `arrival_seconds`")
+            trace = pd.read_csv(os.path.realpath(trace_file), sep=delimiter)
+            arrival_seconds = trace[column].dropna().values * seconds_per_unit
+
+        self.arrival_seconds = sorted(arrival_seconds)
+        self.arrivals_replayed = 0
+
+    def calc_next_arrival(self, previous_arrival):
+        if self.arrivals_replayed >= len(self.arrival_seconds):
+            return np.inf
+
+        next_arrival = self.arrival_seconds[self.arrivals_replayed]
+        self.arrivals_replayed += 1
+        return next_arrival
+
+
+# the arrival processes that can be chosen with the `type` key of the `arrival_process` config
+arrival_process_types = {"poisson": PoissonArrivals,
+                         "waves": WaveArrivals,
+                         "trace": TraceArrivals}
+
+
+def create_arrival_process(arrival_config, random_seed=0):
+    """ Create an arrival process from the `arrival_process` part of the case config
+
+    Parameters
+    ----------
+    arrival_config
+        A dict with the `type` of the arrival process ("poisson", "waves" or "trace"), and the keyword arguments of that
+        arrival process.
+    random_seed
+        The random seed used for generating the arrivals
+    """
+    arrival_config = dict(arrival_config)
+    arrival_type = arrival_config.pop('type')
+
+    if arrival_type not in arrival_process_types:
+        raise Exception(f"Unknown arrival process type `{arrival_type}`, choose one of "
+                        f"{list(arrival_process_types.keys())}")
+
+    return arrival_process_types[arrival_type](random_seed=random_seed, **arrival_config)
@@ -0,0 +1,144 @@
+from mhc.world_registry import get_world_service
+
+
+class BedRegistry:
+    """ Index of all hospital beds per room, with which beds are free and which are occupied.
+
+    Finding free beds with a MATRX state query (e.g. `state[{'name': "Bed_top", 'assigned_patient': 'free'}]`) scans
+    every object in the world. Instead, the registry is built once per world and kept up to date by the bed actions
+    (`AssignBed`, `UnassignBed`, `RemovePatient` and `RemovePatients`), such that agents can count and pick free beds in O(1).
+    The free and occupied beds are kept in dicts (used as ordered sets), so beds are picked in a deterministic order.
+
+    Agents decide on their actions one after another, before any action is performed. So to prevent two patients from
+    choosing the same bed in the same tick, a bed is reserved when it is picked (see `reserve_bed`). A reserved bed is
+    no longer free, and is occupied once the `AssignBed` action of the patient is performed.
+    """
+
+    def __init__(self):
+        # per room, the IDs of the free and occupied beds, and the reserved beds with who reserved them
+        self.free_beds = {}
+        self.occupied_beds = {}
+        self.reserved_beds = {}
+
+        # the room and location of every bed
+        self.bed_rooms = {}
+        self.bed_locations = {}
+
+    @classmethod
+    def from_grid_world(cls, grid_world):
+        """ Create the bed registry from the beds in a MATRX gridworld """
+        registry = cls()
+        for obj_id, obj in grid_world.environment_objects.items():
+            if obj.obj_name == "Bed_top":
+                registry.add_bed(obj_id, room=obj.custom_properties['room'], location=obj.location,
+                                 assigned_patient=obj.custom_properties['assigned_patient'])
+        return registry
+
+    @classmethod
+    def from_state(cls, state):
+        """ Create the bed registry from the beds in the state of an agent that can see all beds """
+        beds = state[{'name': "Bed_top"}]
+        if beds is None:
+            beds = []
+        elif not isinstance(beds, list):
+            beds = [beds]
+
+        registry = cls()
+        for bed in beds:
+            registry.add_bed(bed['obj_id'], room=bed['room'], location=bed['location'],
+                             assigned_patient=bed['assigned_patient'])
+        return registry
+
+    def add_bed(self, bed_id, room, location, assigned_patient='free'):
+        """ Add a bed to the registry """
+        self.bed_rooms[bed_id] = room
+        self.bed_locations[bed_id] = tuple(location)
+        self.free_beds.setdefault(room, {})
+        self.occupied_beds.setdefault(room, {})
+        self.reserved_beds.setdefault(room, {})
+
+        if assigned_patient == 'free':
+            self.free_beds[room][bed_id] = None
+        else:
+            self.occupied_beds[room][bed_id] = None
+
+    def reserve_bed(self, room, reserved_by):
+        """ Reserve a free bed in the room for `reserved_by` (e.g. a patient ID), and return its ID. If `reserved_by`
+        already reserved a bed in the room, that bed is returned. Returns None if there are no free beds """
+        for bed_id, reservation in self.reserved_beds.get(room, {}).items():
+            if reservation == reserved_by:
+                return bed_id
+
+        bed_id = self.get_free_bed(room)
+        if bed_id is not None:
+            del self.free_beds[room][bed_id]
+            self.reserved_beds[room][bed_id] = reserved_by
+        return bed_id
+
+    def occupy(self, bed_id):
+        """ Mark a bed as occupied """
+        room = self.bed_rooms[bed_id]
+        self.free_beds[room].pop(bed_id, None)
+        self.reserved_beds[room].pop(bed_id, None)
+        self.occupied_beds[room][bed_id] = None
+
+    def release(self, bed_id):
+        """ Mark a bed as free """
+        room = self.bed_rooms[bed_id]
+        self.occupied_beds[room].pop(bed_id, None)
+        self.reserved_beds[room].pop(bed_id, None)
+        self.free_beds[room][bed_id] = None
+
+    def transfer_reservations(self, reserved_by, new_reserved_by):
+        """ Hand the beds reserved by `reserved_by` over to `new_reserved_by`, e.g. from a new patient to its agent """
+        for reservations in self.reserved_beds.values():
+            for bed_id, reservation in reservations.items():
+                if reservation == reserved_by:
+                    reservations[bed_id] = new_reserved_by
+
+    def release_reservations(self, reserved_by):
+        """ Free all beds reserved by `reserved_by`, e.g. a patient that was removed before it got to its bed. Returns
+        the IDs of the freed beds """
+        bed_ids = [bed_id for reservations in self.reserved_beds.values()
+                   for bed_id, reservation in reservations.items() if reservation == reserved_by]
+        for bed_id in bed_ids:
+            self.release(bed_id)
+        return bed_ids
+
+    def is_free(self, bed_id):
+        """ Check if a bed is free (so not occupied or reserved) """
+        return bed_id in self.free_beds[self.bed_rooms[bed_id]]
+
+    def is_occupied(self, bed_id):
+        """ Check if a bed is occupied """
+        return bed_id in self.occupied_beds[self.bed_rooms[bed_id]]
+
+    def count_free_beds(self, room):
+        """ Count how many beds are free (so not occupied or reserved) in a room """
+        return len(self.free_beds.get(room, {}))
+
+    def get_free_bed(self, room):
+        """ Returns the ID of a free bed in the room, or None if there are no free beds """
+        for bed_id in self.free_beds.get(room, {}):
+            return bed_id
+        return None
+
+    def get_location(self, bed_id):
+        """ Returns the location of a bed """
+        return self.bed_locations[bed_id]
+
+
+def get_bed_registry(state=None, grid_world=None):
+    """ Returns the bed registry of the world, which is created the first time it is requested. Agents pass their
+    state, actions pass the gridworld
+
+    Parameters
+    ----------
+    state
+        The state of an agent in the world
+    grid_world
+        The MATRX gridworld
+    """
+    if grid_world is not None:
+        return get_world_service(grid_world.world_id, "bed_registry", lambda: BedRegistry.from_grid_world(grid_world))
+    return get_world_service(state['World']['world_ID'], "bed_registry", lambda: BedRegistry.from_state(state))
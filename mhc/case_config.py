@@ -0,0 +1,318 @@
+import json
+import os
+from dataclasses import dataclass, fields
+from typing import Optional
+
+from mhc.arrival_processes import arrival_process_types
+from mhc.hospital_layout import get_hospital_layout
+from mhc.patient_sources import patient_source_types
+
+# the TDPs (collaboration forms) of the cases, and the TDPs the triage agent can work in
+tdps = ("baseline", "decision_support", "tdp_decision_support_potential_bias", "tdp_decision_support_explained",
+        "tdp_supervised_autonomy", "tdp_dynamic_task_allocation")
+triage_agent_tdps = ("tdp_supervised_autonomy", "tdp_dynamic_task_allocation")
+
+# the properties of the Settings object that the frontend reads, besides the TDP, start timestamp and end message
+frontend_settings = ("visualize_your_vs_robot_patients", "visualize_your_vs_patient_robots", "show_agent_predictions",
+                     "bias")
+
+# the formats and compressions of the logs (see `mhc.loggers.TableLogger`)
+log_formats = ("csv", "jsonl", "parquet")
+log_compressions = (None, "gzip", "zstd")
+
+number = (int, float)
+
+# marks a config key without default value
+required = object()
+
+
+def get_value(section, key, value_types, path, default=required, options=None):
+    """ Returns the value of a key in a section of the config, after checking that it is there and has the right type
+
+    Parameters
+    ----------
+    section
+        A dict with a section of the config
+    key
+        The key of the value
+    value_types
+        A tuple with the types the value can have, or None for any type
+    path
+        The path of the section in the config, for the error message
+    default
+        The value if the key is not in the section. If not given, the key is required
+    options
+        Optionally, the values the value can have
+    """
+    if key not in section:
+        if default is required:
+            raise Exception(f"Missing `{path}{key}`")
+        return default
+
+    value = section[key]
+    # bools are ints in python, but not a valid number in the config
+    if value_types is not None and (not isinstance(value, value_types) or
+                                    (isinstance(value, bool) and bool not in value_types)):
+        raise Exception(f"`{path}{key}` should be of type {' or '.join(t.__name__ for t in value_types)}, "
+                        f"got {value!r}")
+    if options is not None and value not in options:
+        raise Exception(f"`{path}{key}` should be one of {list(options)}, got {value!r}")
+    return value
+
+
+def check_keys(section, known_keys, path):
+    """ Raise an exception for keys in a section of the config that are unknown, e.g. because of a typo """
+    unknown_keys = [key for key in section if key not in known_keys]
+    if unknown_keys:
+        raise Exception(f"Unknown keys {unknown_keys} in `{path.rstrip('.') or 'the config'}`, known keys are "
+                        f"{list(known_keys)}")
+
+
+def get_section(config, key, path="", default=required):
+    """ Returns a section (dict) of the config """
+    return get_value(config, key, (dict,), path, default)
+
+
+class FrozenDict(dict):
+    """ A dict that can't be changed, and can be hashed. The sections of the config that are kept as they are (such as
+    the sickness model) are frozen into these, see `freeze` """
+    __slots__ = ()
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError("The config can't be changed")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _frozen
+
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # unpickling a dict sets its items one by one, so recreate it instead
+        return self.__class__, (dict(self),)
+
+
+def freeze(value):
+    """ Returns a frozen copy of a part of the config, with its dicts as `FrozenDict`s and its lists as tuples """
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(entry) for key, entry in value.items()})
+    elif isinstance(value, (list, tuple)):
+        return tuple(freeze(entry) for entry in value)
+    return value
+
+
+class FrozenConfig:
+    """ Base class of the (frozen and slotted) config dataclasses. Their fields are frozen all the way down (see
+    `freeze`), so configs can be hashed and shared, and copies are not needed """
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # frozen slotted dataclasses can't be unpickled by setting their attributes, so recreate them instead
+        return self.__class__, tuple(getattr(self, field.name) for field in fields(self))
+
+
+@dataclass(frozen=True)
+class WorldConfig(FrozenConfig):
+    """ The `world` section of the config """
+    __slots__ = ("tick_duration", "trial_end_message", "world_size", "bg_color", "wall_color")
+    tick_duration: float
+    trial_end_message: str
+    world_size: tuple
+    bg_color: str
+    wall_color: str
+
+    @classmethod
+    def from_dict(cls, world, hospital_layout):
+        check_keys(world, ("tick_duration", "trial_end_message", "world_size", "bg_color", "wall_color"), "world")
+        return cls(tick_duration=get_value(world, 'tick_duration', number, "world."),
+                   trial_end_message=get_value(world, 'trial_end_message', (str,), "world."),
+                   world_size=tuple(hospital_layout['world_size']),
+                   bg_color=get_value(world, 'bg_color', (str,), "world.", "#ebebeb"),
+                   wall_color=get_value(world, 'wall_color', (str,), "world.", "#adadad"))
+
+
+@dataclass(frozen=True)
+class PatientsConfig(FrozenConfig):
+    """ The `patients` section of the config """
+    __slots__ = ("move_speed", "max_patients", "patients_file", "deceased_fade_after_ticks",
+                 "update_sickness_every_x_seconds", "patient_planning", "arrival_process", "patient_source",
+                 "spawn_cooldown_ticks", "max_spawns_per_tick", "patient_pool_size", "sense_profile")
+    move_speed: float
+    max_patients: int
+    patients_file: str
+    deceased_fade_after_ticks: int
+    update_sickness_every_x_seconds: float
+    # the keypoints of the patient planning, empty if the patients arrive according to the arrival process
+    patient_planning: tuple
+    arrival_process: FrozenDict
+    patient_source: FrozenDict
+    spawn_cooldown_ticks: int
+    # the maximum number of patients spawned in a tick, None if unlimited
+    max_spawns_per_tick: Optional[int]
+    patient_pool_size: int
+    sense_profile: str
+
+    @classmethod
+    def from_dict(cls, patients):
+        path = "patients."
+        check_keys(patients, [field.name for field in fields(cls)], path)
+
+        patient_planning = tuple(get_value(patients, 'patient_planning', (list,), path, []))
+        for keypoint in patient_planning:
+            get_value(keypoint, 'second', number, path + "patient_planning[].")
+            get_value(keypoint, 'seconds_per_patient', number, path + "patient_planning[].", None)
+
+        arrival_process = get_section(patients, 'arrival_process', path, None)
+        if arrival_process is not None:
+            get_value(arrival_process, 'type', (str,), path + "arrival_process.", options=arrival_process_types)
+        patient_source = get_section(patients, 'patient_source', path, {"type": "csv"})
+        get_value(patient_source, 'type', (str,), path + "patient_source.", options=patient_source_types)
+
+        return cls(move_speed=get_value(patients, 'move_speed', number, path),
+                   max_patients=get_value(patients, 'max_patients', (int,), path),
+                   patients_file=get_value(patients, 'patients_file', (str,), path),
+                   deceased_fade_after_ticks=get_value(patients, 'deceased_fade_after_ticks', (int,), path),
+                   update_sickness_every_x_seconds=get_value(patients, 'update_sickness_every_x_seconds', number,
+                                                             path),
+                   patient_planning=freeze(patient_planning),
+                   arrival_process=freeze(arrival_process),
+                   patient_source=freeze(patient_source),
+                   spawn_cooldown_ticks=get_value(patients, 'spawn_cooldown_ticks', (int,), path, 0),
+                   max_spawns_per_tick=get_value(patients, 'max_spawns_per_tick', (int,), path, None),
+                   patient_pool_size=get_value(patients, 'patient_pool_size', (int,), path, 0),
+                   sense_profile=get_value(patients, 'sense_profile', (str,), path, "minimal",
+                                           options=("minimal", "full")))
+
+
+@dataclass(frozen=True)
+class LoggingConfig(FrozenConfig):
+    """ The `logging` section of the config """
+    __slots__ = ("patient_status_format", "delta_logging", "compact_triage_agent_log", "triage_agent_compression")
+    patient_status_format: str
+    delta_logging: bool
+    compact_triage_agent_log: bool
+    triage_agent_compression: str
+
+    @classmethod
+    def from_dict(cls, logging):
+        path = "logging."
+        check_keys(logging, [field.name for field in fields(cls)], path)
+        return cls(patient_status_format=get_value(logging, 'patient_status_format', (str,), path, "csv",
+                                                   options=log_formats),
+                   delta_logging=get_value(logging, 'delta_logging', (bool,), path, False),
+                   compact_triage_agent_log=get_value(logging, 'compact_triage_agent_log', (bool,), path, False),
+                   triage_agent_compression=get_value(logging, 'triage_agent_compression', None, path, None,
+                                                      options=log_compressions))
+
+
+@dataclass(frozen=True)
+class CaseSettings(FrozenConfig):
+    """ The `case` section of the config: the TDP, whether there is a triage agent, the settings for the frontend and
+    the prefix of the log files """
+    __slots__ = ("tdp", "triage_agent", "settings", "log_file_prefix")
+    tdp: str
+    triage_agent: bool
+    settings: FrozenDict
+    log_file_prefix: str
+
+    @classmethod
+    def from_dict(cls, case):
+        path = "case."
+        check_keys(case, [field.name for field in fields(cls)], path)
+        settings = get_section(case, 'settings', path, {})
+        check_keys(settings, frontend_settings, path + "settings")
+        for key in settings:
+            get_value(settings, key, (bool,), path + "settings.")
+
+        tdp = get_value(case, 'tdp', (str,), path, options=tdps)
+        triage_agent = get_value(case, 'triage_agent', (bool,), path, False)
+        if triage_agent and tdp not in triage_agent_tdps:
+            raise Exception(f"The triage agent can't work in TDP `{tdp}`, only in {list(triage_agent_tdps)}")
+
+        return cls(tdp=tdp, triage_agent=triage_agent, settings=freeze(settings),
+                   log_file_prefix=get_value(case, 'log_file_prefix', (str,), path, ""))
+
+
+@dataclass(frozen=True)
+class CaseConfig(FrozenConfig):
+    """ The config of a case, parsed and validated once when the case is created, see `load_config` """
+    __slots__ = ("case", "hospital", "hospital_layout", "world", "patients", "logging", "human_doctor_location",
+                 "sickness_model", "triage_countdown", "triage_agent_uncertainty_threshold", "random_seed")
+    case: CaseSettings
+    # the `hospital` section as is, and the layout of the hospital (see `mhc.hospital_layout.get_hospital_layout`)
+    hospital: FrozenDict
+    hospital_layout: FrozenDict
+    world: WorldConfig
+    patients: PatientsConfig
+    logging: LoggingConfig
+    human_doctor_location: tuple
+    sickness_model: FrozenDict
+    # the seconds before the triage decision of the triage agent is final, None if patients have no countdown
+    triage_countdown: int
+    triage_agent_uncertainty_threshold: float
+    random_seed: int
+
+    @classmethod
+    def from_dict(cls, config):
+        """ Parse and validate a config, raises an exception describing the first error in the config """
+        check_keys(config, ("case", "hospital", "world", "patients", "logging", "human_doctor", "sickness_model",
+                            "triage_countdown", "triage_agent_uncertainty_threshold", "random_seed"), "")
+        case = CaseSettings.from_dict(get_section(config, 'case'))
+
+        hospital = get_section(config, 'hospital')
+        check_keys(hospital, ("entrance", "entrance2", "exit", "exit2", "layout"), "hospital")
+        if 'layout' not in hospital:
+            get_value(hospital, 'entrance', (list,), "hospital.")
+            get_value(hospital, 'exit', (list,), "hospital.")
+        world = get_section(config, 'world')
+        hospital_layout = get_hospital_layout({"hospital": hospital, "world": world})
+
+        triage_countdown = get_value(config, 'triage_countdown', (int,), "", None)
+        uncertainty_threshold = get_value(config, 'triage_agent_uncertainty_threshold', number, "", None)
+        if case.triage_agent and triage_countdown is None:
+            raise Exception("Missing `triage_countdown`, which is needed for the triage agent")
+        if case.triage_agent and case.tdp == "tdp_dynamic_task_allocation" and uncertainty_threshold is None:
+            raise Exception("Missing `triage_agent_uncertainty_threshold`, which is needed for the triage agent in "
+                            "TDP `tdp_dynamic_task_allocation`")
+
+        human_doctor = get_section(config, 'human_doctor')
+        check_keys(human_doctor, ("location",), "human_doctor")
+
+        return cls(case=case,
+                   hospital=freeze(hospital),
+                   hospital_layout=freeze(hospital_layout),
+                   world=WorldConfig.from_dict(world, hospital_layout),
+                   patients=PatientsConfig.from_dict(get_section(config, 'patients')),
+                   logging=LoggingConfig.from_dict(get_section(config, 'logging', default={})),
+                   human_doctor_location=tuple(get_value(human_doctor, 'location', (list,), "human_doctor.")),
+                   sickness_model=freeze(get_section(config, 'sickness_model', default={})),
+                   triage_countdown=triage_countdown,
+                   triage_agent_uncertainty_threshold=uncertainty_threshold,
+                   random_seed=get_value(config, 'random_seed', (int,), ""))
+
+
+def load_config(config_file):
+    """ Load a case config from the `mhc/cases` folder, and parse it into a `CaseConfig`. Errors in the config are
+    raised right away, instead of when the part of the config is used """
+    config_path = os.path.join(os.path.realpath("mhc"), 'cases', config_file)
+    with open(config_path) as config_json:
+        config = json.load(config_json)
+
+    try:
+        case_config = CaseConfig.from_dict(config)
+    except Exception as e:
+        raise Exception(f"Invalid case config {config_path}: {e}") from e
+
+    print("Loaded config file:", config_path)
+    return case_config
@@ -0,0 +1,153 @@
+import json
+import os
+
+import numpy as np
+from matrx import WorldBuilder
+
+from mhc.case_config import load_config
+from mhc.cases.generic import add_mhc_rooms, add_mhc_chairs_beds, add_mhc_extras
+from mhc.goals import AllPatientsTriaged
+from mhc.helper_functions import setTimestamp
+from mhc.hospital_manager import HospitalManager
+from mhc.human_agent import HumanDoctor
+from mhc.loggers import LogPatientStatus, LogNewPatients, LogTriageDecision, LogTriageAgent
+from mhc.patient_planner import PatientPlanner
+from mhc.triage_agent import TriageAgent
+from mhc.world_registry import reset_world_services
+
+# the static hospitals (walls, beds and signs) that were built before, per layout
+hospital_templates = {}
+
+
+def get_hospital_template(config, world_size, wall_color):
+    """ Returns the object settings of the static hospital (rooms, beds and signs) of the config. The hospital is only
+    built once per layout, every next case with the same layout gets a copy of the same template
+
+    Parameters
+    ----------
+    config
+        The `CaseConfig` of this condition, with the hospital layout
+    world_size
+        The size of the world
+    wall_color
+        The colour of the walls
+    """
+    layout = json.dumps({"hospital": config.hospital, "world_size": world_size, "wall_color": wall_color},
+                        sort_keys=True)
+
+    if layout not in hospital_templates:
+        template_builder = WorldBuilder(shape=world_size, run_matrx_api=False, verbose=False)
+        add_mhc_rooms(template_builder, config, world_size, wall_color)
+        add_mhc_chairs_beds(template_builder, config)
+        add_mhc_extras(template_builder, config)
+        hospital_templates[layout] = template_builder.object_settings
+
+    # the builder only reads the settings, so copying the (mutable) property containers is enough
+    return [dict(object_setting, custom_properties=dict(object_setting['custom_properties']),
+                 customizable_properties=list(object_setting['customizable_properties']),
+                 mandatory_properties=dict(object_setting['mandatory_properties']))
+            for object_setting in hospital_templates[layout]]
+
+
+def create_builder(config_file, test_subject_id=None, user_elicitation_results=None, tdp=None):
+    """ Create the MATRX builder of a case, as described by its config file.
+
+    Besides the hospital, patients etc. the config describes the case itself in its `case` section: the TDP, whether
+    there is a triage agent, the case specific properties of the Settings object for the frontend, and optionally a
+    prefix for the log files. E.g. `"case": {"tdp": "tdp_supervised_autonomy", "triage_agent": true, "settings":
+    {"show_agent_predictions": true}}`
+
+    Parameters
+    ----------
+    config_file
+        The config file in the `mhc/cases` folder
+    test_subject_id
+        The ID of the test subject, which is added to the name of the log folder
+    user_elicitation_results
+        The values elicited from the test subject, used by the triage agent
+    tdp
+        The TDP, overrides the TDP of the config
+    """
+    # parse and validate the config up front, so errors in the config show before the world is built
+    config = load_config(config_file)
+    case = config.case
+    tdp = case.tdp if tdp is None else tdp
+    world_size = list(config.world.world_size)
+    wall_color = config.world.wall_color
+    timestamp = setTimestamp()
+
+    np.random.seed(config.random_seed)
+    print("Set random seed:", config.random_seed)
+
+    # start with a clean slate for the services shared by the agents and actions of the world
+    reset_world_services()
+
+    # Create our builder instance
+    builder = WorldBuilder(shape=world_size, run_matrx_api=True,
+                           run_matrx_visualizer=False,
+                           visualization_bg_clr=config.world.bg_color,
+                           visualization_bg_img="", tick_duration=config.world.tick_duration,
+                           simulation_goal=AllPatientsTriaged(config.patients.max_patients),
+                           verbose=False)
+
+    #################################################################
+    # Rooms, beds and other static objects
+    ################################################################
+    builder.object_settings.extend(get_hospital_template(config, world_size, wall_color))
+
+    # add settings object, with only what the frontend needs as it is sent with the state every tick
+    builder.add_object(location=[0, 0], is_traversable=True, is_movable=False, name="Settings", visualize_size=0,
+                       tdp=tdp, start_timestamp=timestamp, trial_completed=False,
+                       end_message=config.world.trial_end_message, customizable_properties=['trial_completed'],
+                       **case.settings)
+
+    #################################################################
+    # Loggers
+    ################################################################
+    log_folder = tdp + "_" + timestamp
+    if test_subject_id is not None:
+        log_folder = f"test_subject_{test_subject_id}_{log_folder}"
+    log_file_prefix = case.log_file_prefix
+    logging = config.logging
+
+    builder.add_logger(LogPatientStatus, save_path=os.path.join('Results', log_folder),
+                       file_name_prefix=log_file_prefix + "patient_status",
+                       log_format=logging.patient_status_format, delta_logging=logging.delta_logging)
+
+    builder.add_logger(LogNewPatients, save_path=os.path.join('Results', log_folder),
+                       file_name_prefix=log_file_prefix + "new_patients")
+
+    builder.add_logger(LogTriageDecision, save_path=os.path.join('Results', log_folder),
+                       file_name_prefix=log_file_prefix + "triage_decisions")
+
+    if case.triage_agent:
+        builder.add_logger(LogTriageAgent, save_path=os.path.join('Results', log_folder),
+                           file_name_prefix=log_file_prefix + "triage_agent", delta_logging=logging.delta_logging,
+                           compact=logging.compact_triage_agent_log, compression=logging.triage_agent_compression)
+
+    #################################################################
+    # Actors
+    ################################################################
+
+    # create the patient planner (god agent) that spawns patients over time, as described in the config
+    builder.add_agent(location=[0, 0], is_traversable=True, is_movable=False,
+                      agent_brain=PatientPlanner(config=config, tdp=tdp),
+                      name="Patient planner", visualize_size=0)
+
+    # add the test subject: the human doctor
+    builder.add_human_agent(location=list(config.human_doctor_location), is_traversable=True, is_movable=False,
+                            agent=HumanDoctor(), name="human_doctor", visualize_size=0)
+
+    # add the hospital manager (god agent) that takes care of removing deceased patients
+    builder.add_agent(location=[0, 0], is_traversable=True, is_movable=False, agent_brain=HospitalManager(),
+                      name="hospital_manager", visualize_size=0)
+
+    # add the agent that can triage patients
+    if case.triage_agent:
+        builder.add_agent(location=[0, 0], is_traversable=True, is_movable=False,
+                          agent_brain=TriageAgent(config=config, tdp=tdp,
+                                                  user_elicitation_results=user_elicitation_results),
+                          name="triage_agent", visualize_size=0)
+
+    # Return the builder
+    return builder
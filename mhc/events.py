@@ -0,0 +1,56 @@
+from enum import Enum
+
+from mhc.world_registry import get_world_service
+
+
+class EventKind(Enum):
+    """ The kinds of events that are published on the event bus of a world """
+    PATIENT_SPAWNED = "patient_spawned"
+    # a patient received its final triage decision (from the human or the triage agent)
+    TRIAGE_DECISION = "triage_decision"
+    PATIENT_TRIAGED = "patient_triaged"
+    PATIENT_DECEASED = "patient_deceased"
+    PATIENT_HEALED = "patient_healed"
+    PATIENT_REMOVED = "patient_removed"
+
+
+class EventBus:
+    """ Publish / subscribe bus for the events in a world, such as a patient being triaged or passing away.
+
+    Agents and actions publish what happened, such that world goals, loggers etc. can keep track of it as it happens
+    instead of scanning all agents every tick. Subscribers are called right away, with the event kind and the data
+    published with the event as keyword arguments.
+    """
+
+    def __init__(self):
+        # the callbacks subscribed to every kind of event
+        self.subscribers = {}
+
+    def subscribe(self, event_kind, callback):
+        """ Call `callback(event_kind, **data)` for every event of this kind that is published """
+        self.subscribers.setdefault(event_kind, []).append(callback)
+
+    def unsubscribe(self, event_kind, callback):
+        """ Stop calling `callback` for events of this kind """
+        if callback in self.subscribers.get(event_kind, []):
+            self.subscribers[event_kind].remove(callback)
+
+    def publish(self, event_kind, **data):
+        """ Publish an event to all subscribers of its kind """
+        for callback in self.subscribers.get(event_kind, []):
+            callback(event_kind, **data)
+
+
+def get_event_bus(state=None, grid_world=None):
+    """ Returns the event bus of the world, which is created the first time it is requested. Agents pass their state,
+    actions and world goals pass the gridworld
+
+    Parameters
+    ----------
+    state
+        The state of an agent in the world
+    grid_world
+        The MATRX gridworld
+    """
+    world_id = grid_world.world_id if grid_world is not None else state['World']['world_ID']
+    return get_world_service(world_id, "event_bus", EventBus)
@@ -2,9 +2,14 @@ import matrx
 from matrx import goals
 from matrx.goals import *
 
+from mhc.events import EventKind, get_event_bus
+
 class AllPatientsTriaged(WorldGoal):
     """
-    A world goal that checks whether all patients have been triaged
+    A world goal that checks whether all patients have been triaged (or have passed away / healed).
+
+    The patients that are triaged, deceased, healed or removed are tracked with the events they publish on the event
+    bus of the world (see `mhc.events`), so checking the goal doesn't require a scan over all agents every tick.
     """
 
     def __init__(self, max_patient):
@@ -12,7 +17,13 @@ class AllPatientsTriaged(WorldGoal):
         """
         super().__init__()
         self.max_patient = max_patient
-        self.triaged_patients = []
+
+        # the IDs of all patients that have been triaged, passed away or healed
+        self.triaged_patients = set()
+        self.tracking_patients = False
+
+        # the Settings object, found once when the trial is completed
+        self.settings_obj = None
 
         # wait for X ticks after all patients have been triaged/died/healed before quitting
         self.countdown_after_completion = 0
@@ -22,19 +33,9 @@ class AllPatientsTriaged(WorldGoal):
         """ Returns whether the maximum number of specified patients has been reached.
 
         """
-        # get the triaged patients
-        triaged_patients = [agent_ID for agent_ID, agent in grid_world.registered_agents.items()
-                                if 'triaged' in agent.properties and agent.properties['triaged']]
-
-        # loop through all patients and add deceased / healed / triaged patients
-        for agent_ID, agent in grid_world.registered_agents.items():
-            if ('triaged' in agent.properties and agent.properties['triaged']) \
-                    or ('health' in agent.properties and agent.properties['health'] is not None and
-                        (agent.properties['health'] >= 100 or agent.properties['health'] <= 0)):
-                # add agents which we didn't have yet
-                if agent_ID not in self.triaged_patients:
-                    self.triaged_patients.append(agent_ID)
-                    print("New patient triaged/died/healed, total:", len(self.triaged_patients))
+        # start tracking the triaged / deceased / healed patients on the first check
+        if not self.tracking_patients:
+            self.track_patients(grid_world)
 
         # check if we are done
         if self.max_patient == np.inf or self.max_patient <= 0:
@@ -48,8 +49,7 @@ class AllPatientsTriaged(WorldGoal):
 
                     # activate the completion message when we are done
                     elif self.countdown_after_completion > int(self.countdown_after_completion_goal * 0.7):
-                        settings_obj = [obj for objID, obj in grid_world.environment_objects.items() if obj.properties['name'] == 'Settings'][0]
-                        settings_obj.change_property("trial_completed", True)
+                        self.get_settings_object(grid_world).change_property("trial_completed", True)
 
                     self.countdown_after_completion += 1
                 else:
@@ -58,20 +58,42 @@ class AllPatientsTriaged(WorldGoal):
                 self.is_done = False
         return self.is_done
 
+    def track_patients(self, grid_world):
+        """ Subscribe to the patient events, and add the patients that were already triaged / deceased / healed """
+        self.tracking_patients = True
+
+        event_bus = get_event_bus(grid_world=grid_world)
+        for event_kind in [EventKind.PATIENT_TRIAGED, EventKind.PATIENT_DECEASED, EventKind.PATIENT_HEALED,
+                           EventKind.PATIENT_REMOVED]:
+            event_bus.subscribe(event_kind, self.add_triaged_patient)
+
+        for agent_ID, agent in grid_world.registered_agents.items():
+            if ('triaged' in agent.properties and agent.properties['triaged']) \
+                    or ('health' in agent.properties and agent.properties['health'] is not None and
+                        (agent.properties['health'] >= 100 or agent.properties['health'] <= 0)):
+                self.add_triaged_patient(None, agent_ID)
+
+    def add_triaged_patient(self, event_kind, patient_id, **event):
+        """ Add a patient that was triaged, passed away, healed or removed """
+        # add agents which we didn't have yet
+        if patient_id not in self.triaged_patients:
+            self.triaged_patients.add(patient_id)
+            print("New patient triaged/died/healed, total:", len(self.triaged_patients))
+
+    def get_settings_object(self, grid_world):
+        """ Returns the Settings object of the world """
+        if self.settings_obj is None:
+            self.settings_obj = [obj for objID, obj in grid_world.environment_objects.items()
+                                 if obj.properties['name'] == 'Settings'][0]
+        return self.settings_obj
 
     def get_progress(self, grid_world):
         """ Returns the progress of reaching the AllPatientsTriaged in the simulated grid world.
         """
-        # get the triaged patients
-        triaged_patients = len([agent_ID for agent_ID, agent in grid_world.registered_agents.items()
-                                if 'triaged' in agent.properties and agent.properties['triaged']])
-
-        if triaged_patients != self.triaged_patients:
-            print("New patient triaged, total triaged:", triaged_patients)
-
-        self.triaged_patients = triaged_patients
+        if not self.tracking_patients:
+            self.track_patients(grid_world)
 
         # calc progress
         if self.max_patient == np.inf or self.max_patient <= 0:
             return 0.
-        return min(1.0, triaged_patients / self.max_patient)
\ No newline at end of file
+        return min(1.0, len(self.triaged_patients) / self.max_patient)
@@ -0,0 +1,196 @@
+import math
+
+# the rooms of a generated hospital from top to bottom, with their default number of beds, beds per row, and the space
+# [width, height] every bed takes up including the aisle next to it. The defaults give the rooms of the MHC hospital
+room_defaults = {"eerste hulp": {"beds": 6, "beds_per_row": 3, "bed_spacing": [6, 3]},
+                 "IC": {"beds": 3, "beds_per_row": 3, "bed_spacing": [6, 4]},
+                 "ziekenboeg": {"beds": 6, "beds_per_row": 3, "bed_spacing": [4, 3]}}
+
+# the sign above every room of a generated hospital, and the sign of the area with the exits
+room_signs = {"eerste hulp": ("waiting room sign", "first_help_sign.png"),
+              "IC": ("IC sign", "IC_sign_new.png"),
+              "ziekenboeg": ("ward sign", "ward_sign_new.png")}
+home_sign = ("home sign", "home_sign.png")
+
+# the width of the corridor left of the rooms, through which patients walk from room to room
+corridor_width = 4
+
+
+def get_hospital_layout(config):
+    """ Returns the layout of the hospital of a case config: generated from the `layout` in the `hospital` section of
+    the config if there is one, otherwise the MHC hospital.
+
+    The layout is a dict with the `world_size`, the `doors` in the outer walls, the `entrances` where patients arrive
+    and the `exits` where they leave, the inner `walls` as (start, end) lines, the `beds` per room as the locations of
+    the top of every bed, and the other `objects` (signs, IV drips etc.) as keyword arguments for
+    `WorldBuilder.add_object`
+
+    Parameters
+    ----------
+    config
+        A dict containing the configuration for this condition
+    """
+    if 'layout' in config['hospital']:
+        return generate_hospital_layout(config['hospital']['layout'])
+    return mhc_hospital_layout(config['hospital'], config['world'].get('world_size', [24, 28]))
+
+
+def get_bed_capacity(config):
+    """ Returns the number of beds per room of the hospital of a case config """
+    return {room: len(beds) for room, beds in get_hospital_layout(config)['beds'].items()}
+
+
+def mhc_hospital_layout(hospital_config, world_size):
+    """ The layout of the original MHC hospital, with the entrances and exit of the config
+
+    Parameters
+    ----------
+    hospital_config
+        The `hospital` section of the config, with the `entrance`, `entrance2`, `exit` and `exit2` locations
+    world_size
+        The size of the world
+    """
+    entrances = [hospital_config[entrance] for entrance in ['entrance', 'entrance2'] if entrance in hospital_config]
+    # the exit is two tiles high, patients leave through the top one
+    exit_doors = [hospital_config[hospital_exit] for hospital_exit in ['exit', 'exit2']
+                  if hospital_exit in hospital_config]
+
+    objects = []
+    for i, entrance in enumerate(entrances):
+        objects.append({"location": entrance, "is_traversable": True, "name": f"entrance arrow{i + 1}",
+                        "img_name": "arrow.png", "visualize_size": 0.8})
+    for i, (exit_door, img_name) in enumerate(zip(exit_doors, ["exit_top.png", "exit_bottom.png"])):
+        objects.append({"location": exit_door, "is_traversable": True, "name": f"exit sign{i + 1}",
+                        "img_name": img_name})
+
+    # the IV drip and heart monitor next to every IC bed
+    ic_beds = [[8, 11], [14, 11], [20, 11]]
+    for bed in ic_beds:
+        objects += ic_equipment(bed)
+
+    # the room signs
+    for (name, img_name), location in [(room_signs["eerste hulp"], [8, 2]), (room_signs["ziekenboeg"], [8, 15]),
+                                       (room_signs["IC"], [8, 9]), (home_sign, [8, 24])]:
+        objects.append({"location": location, "is_traversable": True, "name": name, "img_name": img_name,
+                        "visualize_depth": 110, "visualize_size": 3})
+
+    return {"world_size": list(world_size),
+            "doors": entrances + exit_doors,
+            "entrances": entrances,
+            "exits": exit_doors[:1],
+            "walls": [([5, 9], [22, 9]), ([5, 10], [5, 12]), ([5, 15], [22, 15]), ([5, 24], [22, 24]),
+                      ([5, 16], [5, 20])],
+            "beds": {"eerste hulp": [[6, 3], [12, 3], [18, 3], [6, 6], [12, 6], [18, 6]],
+                     "IC": ic_beds,
+                     "ziekenboeg": [[16, 17], [12, 17], [20, 17], [20, 20], [16, 20], [12, 20]]},
+            "objects": objects}
+
+
+def generate_hospital_layout(layout_config):
+    """ Generate a hospital with any number of beds, entrances and exits, e.g. to test with many more patients than
+    fit in the MHC hospital.
+
+    The hospital has a corridor on the left with the entrances at the top. Right of the corridor are the first aid
+    (eerste hulp), IC and ward (ziekenboeg) rooms from top to bottom, with their beds in a grid, and below them the
+    area with the exits in the right wall. The size of the rooms and the world follow from the number of beds, the
+    beds per row and the bed spacing. E.g. `"layout": {"rooms": {"eerste hulp": {"beds": 60, "beds_per_row": 10},
+    "IC": {"beds": 30, "beds_per_row": 10}, "ziekenboeg": {"beds": 60, "beds_per_row": 10}}, "entrances": 4,
+    "exits": 2}` gives a hospital with 10 times the beds of the MHC hospital. Rooms that are not in the config get
+    their defaults from `room_defaults`
+
+    Parameters
+    ----------
+    layout_config
+        The `layout` in the `hospital` section of the config
+    """
+    rooms = {room: {**defaults, **layout_config.get('rooms', {}).get(room, {})}
+             for room, defaults in room_defaults.items()}
+    unknown_rooms = set(layout_config.get('rooms', {})) - set(room_defaults)
+    if unknown_rooms:
+        raise Exception(f"Unknown rooms {sorted(unknown_rooms)} in the hospital layout, the hospital has the rooms "
+                        f"{list(room_defaults)}")
+
+    # the rooms start right of the corridor, beds start 3 tiles into a room
+    rooms_left = corridor_width + 1
+    bed_offset = 3
+
+    # the world is as wide as the widest room: the beds plus the IV drip and an aisle on the right, and the outer wall
+    for room, room_config in rooms.items():
+        if room_config['beds'] < 1 or room_config['beds_per_row'] < 1:
+            raise Exception(f"The {room} room in the hospital layout needs at least 1 bed and 1 bed per row")
+    width = max(rooms_left + bed_offset + (min(room_config['beds'], room_config['beds_per_row']) - 1) *
+                room_config['bed_spacing'][0] + 3 for room_config in rooms.values()) + 1
+
+    n_entrances = layout_config.get('entrances', 2)
+    n_exits = layout_config.get('exits', 1)
+    if n_entrances < 1 or n_exits < 1:
+        raise Exception("The hospital layout needs at least 1 entrance and 1 exit")
+    if 2 + n_entrances > width - 1:
+        raise Exception(f"{n_entrances} entrances don't fit in the top wall of a hospital that is {width} wide, add "
+                        f"beds per row to make the hospital wider")
+
+    # entrances next to each other in the top wall, above the corridor
+    entrances = [[2 + i, 0] for i in range(n_entrances)]
+    objects = [{"location": entrance, "is_traversable": True, "name": f"entrance arrow{i + 1}",
+                "img_name": "arrow.png", "visualize_size": 0.8} for i, entrance in enumerate(entrances)]
+    walls = []
+    beds = {}
+
+    # add the rooms from top to bottom, y is the first row inside the room
+    y = 1
+    for room, room_config in rooms.items():
+        first_aid = room == "eerste hulp"
+        n_rows = math.ceil(room_config['beds'] / room_config['beds_per_row'])
+        spacing_x, spacing_y = room_config['bed_spacing']
+
+        # first aid is open to the corridor and its sign is inside the room, the other rooms have a wall on top with
+        # the sign, and a wall on the left with a door at the bottom
+        sign_location = [rooms_left + bed_offset, y + 1 if first_aid else y - 1]
+        first_row = y + 2 if first_aid else y + 1
+        height = (first_row - y) + n_rows * spacing_y
+        if not first_aid and height > 3:
+            walls.append(([rooms_left, y], [rooms_left, y + height - 3]))
+
+        beds[room] = [[rooms_left + bed_offset + (i % room_config['beds_per_row']) * spacing_x,
+                       first_row + (i // room_config['beds_per_row']) * spacing_y]
+                      for i in range(room_config['beds'])]
+        if room == "IC":
+            for bed in beds[room]:
+                objects += ic_equipment(bed)
+
+        name, img_name = room_signs[room]
+        objects.append({"location": sign_location, "is_traversable": True, "name": name, "img_name": img_name,
+                        "visualize_depth": 110, "visualize_size": 3})
+
+        # the wall below the room
+        y += height
+        walls.append(([rooms_left, y], [width - 2, y]))
+        y += 1
+
+    # the exits are two tiles high, below each other in the right wall of the bottom area
+    name, img_name = home_sign
+    objects.append({"location": [rooms_left + bed_offset, y - 1], "is_traversable": True, "name": name,
+                    "img_name": img_name, "visualize_depth": 110, "visualize_size": 3})
+    exit_doors = []
+    for i in range(n_exits):
+        exit_doors += [[width - 1, y + 2 * i], [width - 1, y + 2 * i + 1]]
+    for i, exit_door in enumerate(exit_doors):
+        objects.append({"location": exit_door, "is_traversable": True, "name": f"exit sign{i + 1}",
+                        "img_name": "exit_top.png" if i % 2 == 0 else "exit_bottom.png"})
+    height = y + 2 * n_exits + 1
+
+    return {"world_size": [width, height],
+            "doors": entrances + exit_doors,
+            "entrances": entrances,
+            "exits": exit_doors[::2],
+            "walls": walls,
+            "beds": beds,
+            "objects": objects}
+
+
+def ic_equipment(bed):
+    """ The IV drip right of an IC bed, and the heart monitor below it """
+    return [{"location": [bed[0] + 1, bed[1]], "is_traversable": False, "is_movable": False, "name": "IV",
+             "assigned_patient": 'free', "img_name": "iv_drip.png"},
+            {"location": [bed[0], bed[1] + 2], "is_traversable": False, "is_movable": False, "name": "heart_monitor",
+             "assigned_patient": 'free', "img_name": "heart_monitor.png"}]
@@ -1,7 +1,10 @@
+from collections import deque
+
 from matrx.actions import RemoveObject
 from matrx.agents import AgentBrain
 
-from mhc.actions import RemovePatient
+from mhc.actions import RemovePatients
+from mhc.messages import MessageKind, parse_message
 
 
 class HospitalManager(AgentBrain):
@@ -10,27 +13,33 @@ class HospitalManager(AgentBrain):
     def __init__(self):
         super().__init__()
 
-        self.removal_queue = []
+        self.removal_queue = deque()
+
+        # received typed messages that still have to be handled, and the handler for every kind of message
+        self.message_queue = deque()
+        self.message_handlers = {MessageKind.REMOVAL_REQUEST: self.handle_removal_request}
 
     def filter_observations(self, state):
         """ process all request messages """
-        for message in self.received_messages.copy():
-
-            if message.content == "agent_removal_request":
-                self.removal_queue.append(message.from_id)
-                self.received_messages.remove(message)
+        while len(self.message_queue) > 0:
+            message = self.message_queue.popleft()
+            self.message_handlers[message.kind](message)
 
         return state
 
+    def handle_removal_request(self, message):
+        """ A patient requested to be removed from the gridworld """
+        self.removal_queue.append(message.from_id)
+
     def decide_on_action(self, state):
         action = None
         action_kwargs = {}
 
-        # remove the first patient from the queue and the gridworld
+        # remove all patients in the queue from the gridworld at once
         if len(self.removal_queue) > 0:
-            action_kwargs['object_id'] = self.removal_queue.pop(0)
-            action = RemovePatient.__name__
-            print(f"Removing agent {action_kwargs['object_id']} with name {state[action_kwargs['object_id']]['patient_name']} from gridworld")
+            action_kwargs['object_ids'] = list(self.removal_queue)
+            self.removal_queue.clear()
+            action = RemovePatients.__name__
 
         return action, action_kwargs
 
@@ -41,5 +50,9 @@ class HospitalManager(AgentBrain):
         # Loop through all messages and create a Message object out of the dictionaries.
         for mssg in messages:
 
-            # Add the message object to the received messages
-            self.received_messages.append(mssg)
\ No newline at end of file
+            # queue the messages we know as typed messages, keep any other message object in the received messages
+            message = parse_message(mssg)
+            if message is not None and message.kind in self.message_handlers:
+                self.message_queue.append(message)
+            else:
+                self.received_messages.append(mssg)
\ No newline at end of file
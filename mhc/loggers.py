@@ -1,24 +1,462 @@
+import atexit
+import copy
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+
+import numpy as np
 from matrx.logger.logger import GridWorldLogger
 
+from mhc.events import EventKind, get_event_bus
 
-class LogNewPatients(GridWorldLogger):
-    """ Log all info of new patients """
+
+def to_loggable(value):
+    """ Returns a copy of a logged value with numpy numbers (e.g. the health of a patient) as plain python numbers,
+    so they are logged as e.g. `47.16` instead of `np.float64(47.16)` """
+    if isinstance(value, dict):
+        return {key: to_loggable(entry) for key, entry in value.items()}
+    elif isinstance(value, (list, tuple, set)):
+        return type(value)(to_loggable(entry) for entry in value)
+    elif isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def open_log_stream(file_path, compression=None):
+    """ Open a text file for appending, optionally gzip or zstd compressed (zstd requires the zstandard package). Every
+    flush ends a compressed block, so the file can be read while the experiment is still running
+
+    Parameters
+    ----------
+    file_path
+        The path of the file
+    compression
+        None, "gzip" or "zstd"
+    """
+    if compression is None:
+        return open(file_path, mode="a", newline='')
+    elif compression == "gzip":
+        return gzip.open(file_path, mode="at", newline='')
+    elif compression == "zstd":
+        import zstandard
+        writer = zstandard.ZstdCompressor().stream_writer(open(file_path, mode="ab"))
+        return io.TextIOWrapper(writer, newline='')
+    raise Exception(f"Unknown compression `{compression}`, choose one of [None, 'gzip', 'zstd']")
+
+
+class CsvLogFile:
+    """ Log file in the csv format of the MATRX GridWorldLogger, with fixed columns """
+
+    def __init__(self, file_path, columns, delimiter=";", compression=None):
+        write_header = not os.path.isfile(file_path)
+        self.data_file = open_log_stream(file_path, compression)
+        self.csv_writer = csv.DictWriter(self.data_file, delimiter=delimiter, quotechar='"',
+                                         quoting=csv.QUOTE_MINIMAL, fieldnames=columns)
+        if write_header:
+            self.csv_writer.writeheader()
+
+    def write(self, rows):
+        self.csv_writer.writerows(rows)
+        self.data_file.flush()
+
+    def close(self):
+        self.data_file.close()
+
+
+class JsonLinesLogFile:
+    """ Log file with one JSON object per row, so every row can have its own fields """
+
+    def __init__(self, file_path, compression=None):
+        self.data_file = open_log_stream(file_path, compression)
+
+    def write(self, rows):
+        self.data_file.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+        self.data_file.flush()
+
+    def close(self):
+        self.data_file.close()
+
+
+class ParquetLogFile:
+    """ Parquet log file with typed columns, every batch of rows is written as a row group. Requires pyarrow """
+
+    def __init__(self, file_path, columns, column_types=None, compression=None):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.columns = columns
+        self.compression = "snappy" if compression is None else compression
+
+        # parquet files can't be appended to, so continue in a new file if the log file already exists
+        base_path, extension = os.path.splitext(file_path)
+        part = 1
+        while os.path.isfile(file_path):
+            file_path = f"{base_path}_{part}{extension}"
+            part += 1
+        self.file_path = file_path
+
+        # the column types are set by the logger, or inferred from the first batch of rows
+        self.schema = None
+        if column_types is not None:
+            self.schema = pyarrow.schema([(column, pyarrow.type_for_alias(column_types.get(column, "string")))
+                                          for column in columns])
+        self.writer = None
+
+    def write(self, rows):
+        table = self.pyarrow.Table.from_pylist(rows, schema=self.schema)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.file_path, self.schema, compression=self.compression)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# the value of a dict entry in a delta that was removed since the previous record. A string rather than None, as None
+# can be the value of an entry, and it has to survive being written to and read from the log file
+removed_entry = "__removed__"
+
+
+class DeltaEncoder:
+    """ Encodes logged records as the changes since the previous record, with a full record (keyframe) every
+    `keyframe_every_ticks` ticks.
+
+    Fields that didn't change are left out of the delta. For dict fields (such as the scores per patient), only the
+    entries that changed are included, and removed entries are included as `removed_entry`. The full records can be
+    reconstructed from the keyframes and deltas with `apply_log_delta`.
+    """
+
+    def __init__(self, keyframe_every_ticks=100):
+        self.keyframe_every_ticks = keyframe_every_ticks
+        self.last_keyframe_tick = None
+
+        # the last logged value of every field
+        self.previous = {}
+
+    def encode(self, record, tick):
+        """ Returns whether the record is logged as keyframe, and the keyframe or delta to log """
+        keyframe = self.last_keyframe_tick is None or tick - self.last_keyframe_tick >= self.keyframe_every_ticks
+        if keyframe:
+            self.last_keyframe_tick = tick
+            self.previous = copy.deepcopy(record)
+            return True, record
+
+        delta = {}
+        for field, value in record.items():
+            previous_value = self.previous.get(field, None)
+
+            # only the changed entries of a dict
+            if isinstance(value, dict) and isinstance(previous_value, dict):
+                changes = {key: entry for key, entry in value.items()
+                           if key not in previous_value or previous_value[key] != entry}
+                for key in previous_value:
+                    if key not in value:
+                        changes[key] = removed_entry
+
+                if len(changes) > 0:
+                    delta[field] = changes
+                    for key, entry in changes.items():
+                        if key not in value:
+                            previous_value.pop(key, None)
+                        else:
+                            previous_value[key] = copy.deepcopy(entry)
+
+            elif field not in self.previous or previous_value != value:
+                delta[field] = value
+                self.previous[field] = copy.deepcopy(value)
+
+        return False, delta
+
+
+def apply_log_delta(state, delta, keyframe):
+    """ Update the full logged record `state` with a keyframe or delta that was logged with delta logging (see
+    `DeltaEncoder`), and return it
+
+    Parameters
+    ----------
+    state
+        The full record up till now, or an empty dict at the start of the log
+    delta
+        The logged record: a keyframe or the changes since the previous record
+    keyframe
+        Whether the logged record is a keyframe
+    """
+    if keyframe:
+        return copy.deepcopy(delta)
+
+    for field, value in delta.items():
+        if isinstance(value, dict) and isinstance(state.get(field, None), dict):
+            for key, entry in value.items():
+                if isinstance(entry, str) and entry == removed_entry:
+                    state[field].pop(key, None)
+                else:
+                    state[field][key] = entry
+        else:
+            state[field] = value
+    return state
+
+
+class AsyncGridWorldLogger(GridWorldLogger):
+    """ A GridWorldLogger that writes its log rows to disk in a background thread.
+
+    The MATRX GridWorldLogger opens, writes and closes its log file on the tick thread every time it logs. Instead, the
+    rows returned by `log` are put on a bounded queue, and a background thread writes them to the (kept open) log file
+    in batches. `log` can return a single row (a dict), or a list of rows.
+
+    With `log_format` the rows are written as csv (the same file the GridWorldLogger writes), as JSON Lines or as
+    Parquet (requires pyarrow). The types of the Parquet columns can be set with `column_types` (column name to
+    pyarrow type name), otherwise they are inferred from the first rows. With `compression` ("gzip" or "zstd") the log
+    file is compressed while it is written.
+
+    All queued rows are written when the world is done, or when the program exits. If the queue is full (the writer
+    can't keep up), the tick waits until there is room again, so no rows are lost. See `get_queue_metrics` for how full
+    the queue gets. If the writer fails, its exception is raised on the tick thread the next time a row is queued or the
+    logger is closed, instead of the tick waiting forever for a writer that is gone.
+    """
+
+    # the file extension of every log format and compression
+    log_formats = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+    compressions = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+    # the types of the columns in the parquet format
+    column_types = None
+
+    # how many seconds to wait for room in a full queue, before checking that the writer is still running
+    put_timeout = 1
+
+    def __init__(self, log_strategy=1, save_path="", file_name="", file_extension=".csv", delimiter=";",
+                 log_format="csv", compression=None, max_queue_size=10000, batch_size=100):
+        if log_format not in self.log_formats:
+            raise Exception(f"Unknown log format `{log_format}`, choose one of {list(self.log_formats.keys())}")
+        if compression not in self.compressions:
+            raise Exception(f"Unknown compression `{compression}`, choose one of {list(self.compressions.keys())}")
+        if log_format == "parquet":
+            try:
+                import pyarrow
+            except ImportError:
+                raise Exception("Logging in the parquet format requires pyarrow, install it with `pip install pyarrow`")
+        elif compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise Exception("zstd compression requires zstandard, install it with `pip install zstandard`")
+        if log_format != "csv":
+            file_extension = self.log_formats[log_format]
+
+        # parquet files are compressed internally, other files get the extension of the compression
+        if log_format != "parquet":
+            file_extension += self.compressions[compression]
+
+        super().__init__(log_strategy=log_strategy, save_path=save_path, file_name=file_name,
+                         file_extension=file_extension, delimiter=delimiter)
+        self.log_format = log_format
+        self.compression = compression
+        self.delimiter = delimiter
+        self.file_path = None
+        self.world_nr = None
+        self.columns = []
+
+        # the rows that still have to be written, and the thread that writes them
+        self.log_queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.writer_thread = None
+        self.writer_error = None
+        self.stop_writing = object()
+
+        # queue metrics
+        self.max_queue_depth = 0
+        self.rows_queued = 0
+        self.rows_written = 0
+        self.batches_written = 0
+        self.full_queue_waits = 0
+
+    def _set_world_nr(self, world_nr):
+        super()._set_world_nr(world_nr)
+        # the path to the log file, as created by the GridWorldLogger
+        self.world_nr = world_nr
+        self.file_path = self._GridWorldLogger__file_name
+
+    def _grid_world_log(self, grid_world, agent_data, last_tick=False, goal_status=None):
+        if self._needs_to_log(grid_world, last_tick, goal_status):
+            data = self.log(grid_world, agent_data)
+            if isinstance(data, list):
+                for row in data:
+                    self.queue_row(row, grid_world.current_nr_ticks)
+            elif data is not None and data != {}:
+                self.queue_row(data, grid_world.current_nr_ticks)
+
+        # make sure everything is written when the world is done
+        if last_tick:
+            self.close()
+
+    def queue_row(self, data, tick_nr):
+        """ Queue a row for writing. Nested values are converted to strings (csv) or copied right away, as they might be
+        changed by the agents before the row is written. Numpy numbers are logged as plain numbers """
+        if not isinstance(data, dict):
+            raise Exception(f"The data in this {self.__class__} should be a dictionary.")
+
+        row = {}
+        for key, value in data.items():
+            value = to_loggable(value)
+            if isinstance(value, (dict, list, set)) and self.log_format == "csv":
+                value = str(value)
+            row[key] = value
+
+        # we always include the world number and the tick number
+        row.setdefault("world_nr", self.world_nr)
+        row.setdefault("tick_nr", tick_nr)
+
+        # the columns are set by the first row, and can't be changed afterwards (except in JSON Lines)
+        if len(self.columns) == 0:
+            self.columns = list(row.keys())
+        elif self.log_format != "jsonl":
+            new_columns = set(row.keys()) - set(self.columns)
+            if len(new_columns) > 0:
+                raise Exception(f"Cannot append columns to the log file when we already logged with different "
+                                f"columns. The following columns are new; {list(new_columns)}")
+
+        self.start_writer()
+        if self.log_queue.full():
+            self.full_queue_waits += 1
+        self.put(row)
+
+        self.rows_queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.log_queue.qsize())
+
+    def put(self, item):
+        """ Put a row (or the stop signal) on the queue, waiting for room if the queue is full. Raises the exception of
+        the writer if it failed """
+        while True:
+            self.check_writer()
+            try:
+                self.log_queue.put(item, timeout=self.put_timeout)
+                return
+            except queue.Full:
+                pass
+
+    def check_writer(self):
+        """ Raise an exception if the background writer failed or stopped, as no rows will be written anymore """
+        if self.writer_error is not None:
+            raise Exception(f"Writing the log file {self.file_path} failed: {self.writer_error!r}") \
+                from self.writer_error
+        if self.writer_thread is not None and not self.writer_thread.is_alive():
+            raise Exception(f"The writer of the log file {self.file_path} stopped unexpectedly")
+
+    def start_writer(self):
+        """ Start the background writer thread, if it isn't running yet """
+        self.check_writer()
+        if self.writer_thread is None:
+            self.writer_thread = threading.Thread(target=self.write_rows, name=f"{self.__class__.__name__}-writer",
+                                                  daemon=True)
+            self.writer_thread.start()
+            atexit.register(self.close)
+
+    def open_log_file(self):
+        """ Open the log file in the log format """
+        if self.log_format == "jsonl":
+            return JsonLinesLogFile(self.file_path, compression=self.compression)
+        elif self.log_format == "parquet":
+            return ParquetLogFile(self.file_path, self.columns, column_types=self.column_types,
+                                  compression=self.compression)
+        return CsvLogFile(self.file_path, self.columns, delimiter=self.delimiter, compression=self.compression)
+
+    def write_rows(self):
+        """ Write the queued rows to the log file in batches, until the writer is stopped. An exception is kept in
+        `writer_error`, to be raised on the tick thread """
+        try:
+            self.write_batches()
+        except BaseException as e:
+            self.writer_error = e
+
+    def write_batches(self):
+        """ Write the queued rows to the log file in batches, until the stop signal is queued """
+        log_file = self.open_log_file()
+
+        stopped = False
+        while not stopped:
+            # wait for a row, and take any other rows that are already waiting along in the same batch
+            batch = [self.log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.log_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [row for row in batch if row is not self.stop_writing]
+            stopped = len(rows) < len(batch)
+            if len(rows) > 0:
+                log_file.write(rows)
+
+            self.rows_written += len(rows)
+            self.batches_written += 1
+            for _ in batch:
+                self.log_queue.task_done()
+
+        log_file.close()
+
+    def close(self):
+        """ Write all queued rows and stop the background writer. Logging again starts a new writer """
+        if self.writer_thread is None:
+            return
+        try:
+            self.put(self.stop_writing)
+            self.writer_thread.join()
+        finally:
+            self.writer_thread = None
+            atexit.unregister(self.close)
+        self.check_writer()
+
+    def get_queue_metrics(self):
+        """ Returns how many rows are waiting to be written, the most rows that were waiting at once, how many rows were
+        queued and written, in how many batches, and how often a tick had to wait for room in the queue """
+        return {"queue_depth": self.log_queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "rows_queued": self.rows_queued,
+                "rows_written": self.rows_written,
+                "batches_written": self.batches_written,
+                "full_queue_waits": self.full_queue_waits}
+
+
+class LogNewPatients(AsyncGridWorldLogger):
+    """ Log all info of new patients, one row per new patient.
+
+    New patients are found through the spawn events of the patients (see `mhc.events`), so the agents don't have to be
+    scanned every tick.
+    """
 
     def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
                          delimiter=delimeter, log_strategy=1)
 
-        self.patients = []
+        # the IDs of all patients we have seen, and the new patients that still have to be logged
+        self.patients = set()
+        self.new_patients = []
+        self.tracking_patients = False
 
     def log(self, grid_world, agent_data):
-        log_statement = {}
+        log_statements = []
 
+        # start listening for new patients on the first call, and pick up the patients that are already there
+        if not self.tracking_patients:
+            self.tracking_patients = True
+            get_event_bus(grid_world=grid_world).subscribe(EventKind.PATIENT_SPAWNED, self.add_new_patient)
+            for agent_id, agent in grid_world.registered_agents.items():
+                if 'PatientAgent' in agent.properties['class_inheritance']:
+                    self.add_new_patient(None, agent_id)
 
-        new_patients = []
         # log new patients
-        for agent_id, agent in grid_world.registered_agents.items():
-            if 'PatientAgent' in agent.properties['class_inheritance'] and not agent_id in self.patients:
-                self.patients.append(agent_id)
+        for agent_id in self.new_patients:
+            # the patient might have been removed already
+            if agent_id in grid_world.registered_agents:
+                agent = grid_world.registered_agents[agent_id]
+                log_statement = {}
 
                 # add info on patient
                 log_statement["ticks"] = grid_world.current_nr_ticks
@@ -38,21 +476,40 @@ class LogNewPatients(GridWorldLogger):
                 log_statement["symptoms"] = agent.properties['symptoms']
                 log_statement["health"] = agent.properties['health']
                 log_statement["medical_care"] = agent.properties['medical_care']
+                log_statements.append(log_statement)
 
-        return log_statement
+        self.new_patients = []
+        return log_statements
+
+    def add_new_patient(self, event_kind, patient_id, **event):
+        """ Note a new patient, to be logged on the next call """
+        if patient_id not in self.patients:
+            self.patients.add(patient_id)
+            self.new_patients.append(patient_id)
 
 
 
-class LogPatientStatus(GridWorldLogger):
+class LogPatientStatus(AsyncGridWorldLogger):
     """ Log the status of every patient.
 
-     As it is not possible to add columns during the experiment (as extra patients are created), all info is put
-     in a dict that is logged.
+     As it is not possible to add columns to a csv file during the experiment (as extra patients are created), all info
+     is put in a dict that is logged. With the `jsonl` or `parquet` log format, the status of every patient is logged in
+     its own row instead (long format), with typed columns.
+
+     With `delta_logging`, only the patients whose status changed since the last log are logged, plus the status of all
+     patients every `keyframe_every_ticks` ticks (see `DeltaEncoder`). In the csv format removed patients have
+     `removed_entry` as status, in the long format they get a row with `removed` set.
      """
 
-    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
+    # the types of the columns in the parquet format
+    column_types = {"agent_id": "string", "symptoms": "string", "health": "double", "medical_care": "string",
+                    "keyframe": "bool", "removed": "bool", "world_nr": "int64", "tick_nr": "int64"}
+
+    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";", log_format="csv",
+                 delta_logging=False, keyframe_every_ticks=100):
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
-                         delimiter=delimeter, log_strategy=10)
+                         delimiter=delimeter, log_strategy=10, log_format=log_format)
+        self.delta_encoder = DeltaEncoder(keyframe_every_ticks) if delta_logging else None
 
     def log(self, grid_world, agent_data):
         log_statement = {}
@@ -73,61 +530,102 @@ class LogPatientStatus(GridWorldLogger):
                 # add the patient info under the agent ID
                 patient_statusses[agent_id] = patient_info
 
-        if patient_statusses != {}:
+        # only log the patients whose status changed, except for keyframes
+        keyframe = None
+        if self.delta_encoder is not None:
+            keyframe, changes = self.delta_encoder.encode({'status_per_patient': patient_statusses},
+                                                          grid_world.current_nr_ticks)
+            patient_statusses = changes.get('status_per_patient', {})
+            if not keyframe and patient_statusses == {}:
+                return log_statement
+
+        # one row per patient
+        if self.log_format != "csv":
+            if keyframe is None:
+                return list(patient_statusses.values())
+            return [{"agent_id": agent_id, "symptoms": None, "health": None, "medical_care": None,
+                     "keyframe": keyframe, "removed": True} if patient_info == removed_entry
+                    else dict(patient_info, keyframe=keyframe, removed=False)
+                    for agent_id, patient_info in patient_statusses.items()]
+
+        if patient_statusses != {} or keyframe:
             log_statement['status_per_patient'] = patient_statusses
+            if keyframe is not None:
+                log_statement['keyframe'] = keyframe
 
 
         return log_statement
 
 
-class LogTriageDecision(GridWorldLogger):
-    """ Log triage decisions.
+class LogTriageDecision(AsyncGridWorldLogger):
+    """ Log triage decisions, one row per triage decision.
 
+     The decisions are received as the triage decision events published by the patients (see `mhc.events`), so the
+     messages between the agents don't have to be scanned.
      """
 
     def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
                          delimiter=delimeter, log_strategy=1)
 
-    def log(self, grid_world, agent_data):
-        log_statement = {}
+        # the triage decisions that still have to be logged
+        self.triage_decisions = []
+        self.tracking_decisions = False
 
-        # we check the messages of the previous tick, as the messages of this tick haven't been processed yet
-        tick_to_check = grid_world.current_nr_ticks-1
+    def log(self, grid_world, agent_data):
+        log_statements = []
 
-        if tick_to_check in grid_world.message_manager.preprocessed_messages.keys():
+        # start listening for triage decisions on the first call
+        if not self.tracking_decisions:
+            self.tracking_decisions = True
+            get_event_bus(grid_world=grid_world).subscribe(EventKind.TRIAGE_DECISION, self.add_triage_decision)
 
-            # loop through all messages of this tick
-            for message in grid_world.message_manager.preprocessed_messages[tick_to_check]:
+        for triage_decision in self.triage_decisions:
+            log_statement = {}
 
-                # only check triage decision messages
-                if isinstance(message.content, dict) and 'type' in message.content.keys() \
-                        and message.content['type'] == "triage_decision":
-                    #agent might have died when being triaged
-                    if message.to_id in grid_world.registered_agents:
-                        agent = grid_world.registered_agents[message.to_id]
+            # log triage message and some info on the patient
+            log_statement['agent_id'] = triage_decision['patient_id']
+            log_statement['triage_decision'] = triage_decision['decision']
+            log_statement['health'] = triage_decision['health']
+            log_statement["symptoms"] = triage_decision['symptoms']
+            log_statement['decided_by'] = "human-agent"
+            log_statement['triaged_by'] = triage_decision['triaged_by']
+            # the tick in which the decision was sent, the patient receives it the tick after
+            log_statement['correct_tick'] = triage_decision['tick'] - 1
+            log_statements.append(log_statement)
 
-                        # log triage message and some info on the patient
-                        log_statement['agent_id'] = message.to_id
-                        log_statement['triage_decision'] = message.content['decision']
-                        log_statement['health'] = agent.properties['health']
-                        log_statement["symptoms"] = agent.properties['symptoms']
-                        log_statement['decided_by'] = "human-agent"
-                        log_statement['correct_tick'] = tick_to_check
+        self.triage_decisions = []
+        return log_statements
 
-        return log_statement
+    def add_triage_decision(self, event_kind, **triage_decision):
+        """ Note a triage decision, to be logged on the next call """
+        self.triage_decisions.append(triage_decision)
 
 
 
-class LogTriageAgent(GridWorldLogger):
+class LogTriageAgent(AsyncGridWorldLogger):
     """
     For each tick, log the triage score, triage decision, triage reasoning, and user elicitation used or calculated
-    by the triage agent
+    by the triage agent.
+
+    With `delta_logging`, only the values (and scores etc. of patients) that changed since the last logged tick are
+    logged, plus all values every `keyframe_every_ticks` ticks (see `DeltaEncoder`). Ticks without changes are skipped.
+
+    With `compact`, the triage score influences are logged as only the numeric influence per rule
+    (`triage_score_influences`), and the ID of the reason per rule (`triage_score_reasons`). The reasons themselves are
+    written to a reason table next to the log file (`<log file>_reasons.csv`) when the logger is closed. Combined with
+    `compression` ("gzip" or "zstd") this keeps the log small.
     """
 
-    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
+    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";", delta_logging=False,
+                 keyframe_every_ticks=100, compact=False, compression=None):
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
-                         delimiter=delimeter, log_strategy=1)
+                         delimiter=delimeter, log_strategy=1, compression=compression)
+        self.delta_encoder = DeltaEncoder(keyframe_every_ticks) if delta_logging else None
+
+        # the ID of every reason in the reason table
+        self.compact = compact
+        self.reason_ids = {}
 
     def log(self, grid_world, agent_data):
 
@@ -137,6 +635,57 @@ class LogTriageAgent(GridWorldLogger):
             agent_name = agent_id.replace("_" + id_num, "")
             # counts the received 'requests', 'accepts', 'rejects' an agent has received
             for col, val in agent_data.items():
-                data[f"{agent_name} - {col}"] = val
+                if self.compact and col == "triage_score_influences":
+                    data[f"{agent_name} - triage_score_influences"], data[f"{agent_name} - triage_score_reasons"] = \
+                        self.compact_influences(val)
+                else:
+                    data[f"{agent_name} - {col}"] = val
+
+        # only log what changed, except for keyframes
+        if self.delta_encoder is not None:
+            keyframe, data = self.delta_encoder.encode(data, grid_world.current_nr_ticks)
+            if not keyframe and data == {}:
+                return data
+            data['keyframe'] = keyframe
 
         return data
+
+    def compact_influences(self, influences_per_patient):
+        """ Split the triage score influences per patient ({patient: {rule: {'influence': .., 'reason': ..}}}) in the
+        influence per rule and the reason ID per rule """
+        influences = {}
+        reasons = {}
+        for patient_id, patient_influences in influences_per_patient.items():
+            influences[patient_id] = {rule: influence['influence'] for rule, influence in patient_influences.items()}
+            reasons[patient_id] = {rule: self.get_reason_id(influence['reason'])
+                                   for rule, influence in patient_influences.items()}
+        return influences, reasons
+
+    def get_reason_id(self, reason):
+        """ Returns the ID of a reason, and adds it to the reason table if it is new """
+        if reason not in self.reason_ids:
+            self.reason_ids[reason] = len(self.reason_ids)
+        return self.reason_ids[reason]
+
+    def close(self):
+        """ Write all queued rows and stop the background writer, and write the reason table of a compact log """
+        try:
+            super().close()
+        finally:
+            if len(self.reason_ids) > 0:
+                self.write_reasons()
+
+    def write_reasons(self):
+        """ Write the reason table next to the log file. There are only a few different reasons, so the whole table is
+        written at once """
+        reasons_path = self.file_path
+        for extension in [self.compressions[self.compression], self.log_formats[self.log_format]]:
+            if extension != "" and reasons_path.endswith(extension):
+                reasons_path = reasons_path[:-len(extension)]
+        reasons_path += "_reasons.csv"
+
+        with open(reasons_path, mode="w", newline='', encoding="utf-8") as reasons_file:
+            csv_writer = csv.writer(reasons_file, delimiter=self.delimiter)
+            csv_writer.writerow(["reason_id", "reason"])
+            for reason, reason_id in self.reason_ids.items():
+                csv_writer.writerow([reason_id, reason])
@@ -0,0 +1,115 @@
+from enum import Enum
+
+
+class MessageKind(Enum):
+    """ The kinds of messages that are sent to patients and the hospital manager. The value is the `type` of the
+    message content as it is sent by the agents and the GUI """
+    TRIAGE_DECISION = "triage_decision"
+    RESET_COUNTER = "reset_counter"
+    REASSIGN = "reassign"
+    REMOVAL_REQUEST = "agent_removal_request"
+
+
+class AgentMessage:
+    """ Base class for the typed messages. MATRX messages (and those sent via the API by the GUI) carry a JSON dict
+    as content, which is converted to a typed message on arrival with `parse_message` """
+    __slots__ = ("from_id",)
+    kind = None
+
+    def __init__(self, from_id=None):
+        self.from_id = from_id
+
+    def to_content(self):
+        """ Returns the message as a JSON serializable dict, to be used as the content of a MATRX message """
+        return {"type": self.kind.value}
+
+    @classmethod
+    def from_content(cls, content, from_id=None):
+        """ Create the typed message from the content of a MATRX message """
+        return cls(from_id=from_id)
+
+
+class TriageDecision(AgentMessage):
+    """ The final triage decision for a patient, made by the human or the triage agent """
+    __slots__ = ("decision", "triaged_by")
+    kind = MessageKind.TRIAGE_DECISION
+
+    def __init__(self, decision, triaged_by, from_id=None):
+        super().__init__(from_id=from_id)
+        self.decision = decision
+        self.triaged_by = triaged_by
+
+    def to_content(self):
+        return {"type": self.kind.value, "decision": self.decision, "triaged_by": self.triaged_by}
+
+    @classmethod
+    def from_content(cls, content, from_id=None):
+        return cls(decision=content['decision'], triaged_by=content['triaged_by'], from_id=from_id)
+
+
+class ResetCounter(AgentMessage):
+    """ Reset the triage countdown of a patient """
+    __slots__ = ("counter_value",)
+    kind = MessageKind.RESET_COUNTER
+
+    def __init__(self, counter_value, from_id=None):
+        super().__init__(from_id=from_id)
+        self.counter_value = counter_value
+
+    def to_content(self):
+        return {"type": self.kind.value, "counter_value": self.counter_value}
+
+    @classmethod
+    def from_content(cls, content, from_id=None):
+        return cls(counter_value=content['counter_value'], from_id=from_id)
+
+
+class Reassign(AgentMessage):
+    """ Assign a patient to the human ('person') or the triage agent ('robot') """
+    __slots__ = ("assigned_to",)
+    kind = MessageKind.REASSIGN
+
+    def __init__(self, assigned_to, from_id=None):
+        super().__init__(from_id=from_id)
+        self.assigned_to = assigned_to
+
+    def to_content(self):
+        return {"type": self.kind.value, "assigned_to": self.assigned_to}
+
+    @classmethod
+    def from_content(cls, content, from_id=None):
+        return cls(assigned_to=content['assigned_to'], from_id=from_id)
+
+
+class RemovalRequest(AgentMessage):
+    """ Request of a patient to the hospital manager to be removed from the world """
+    __slots__ = ()
+    kind = MessageKind.REMOVAL_REQUEST
+
+
+# the typed message class of each message type
+message_classes = {message_class.kind.value: message_class for message_class in
+                   [TriageDecision, ResetCounter, Reassign, RemovalRequest]}
+
+
+def parse_message(message):
+    """ Convert a MATRX message to a typed message. Returns None if the message is not of a known type
+
+    Parameters
+    ----------
+    message
+        The MATRX message, with as content a dict with the message `type` and its fields, or only the message type as
+        a string (for messages without fields)
+    """
+    content = message.content
+    if isinstance(content, dict):
+        message_type = content.get('type', None)
+    elif isinstance(content, str):
+        message_type = content
+    else:
+        return None
+
+    if message_type not in message_classes:
+        return None
+
+    return message_classes[message_type].from_content(content, from_id=message.from_id)
@@ -0,0 +1,364 @@
+import heapq
+import itertools
+from collections import deque
+
+import numpy as np
+from matrx.actions.move_actions import MoveNorth, MoveNorthEast, MoveEast, MoveSouthEast, MoveSouth, MoveSouthWest, \
+    MoveWest, MoveNorthWest
+
+from mhc.world_registry import get_world_service
+
+# the move actions of a patient, and the step on the grid they make
+move_actions = {MoveNorth.__name__: (0, -1),
+                MoveNorthEast.__name__: (1, -1),
+                MoveEast.__name__: (1, 0),
+                MoveSouthEast.__name__: (1, 1),
+                MoveSouth.__name__: (0, 1),
+                MoveSouthWest.__name__: (-1, 1),
+                MoveWest.__name__: (-1, 0),
+                MoveNorthWest.__name__: (-1, -1)}
+step_to_move_action = {step: action_name for action_name, step in move_actions.items()}
+# the distance covered by each step, diagonal steps are longer
+step_distances = {step: float(np.hypot(step[0], step[1])) for step in move_actions.values()}
+
+
+class RouteTable:
+    """ Shortest routes through the (static) hospital layout, shared by all patients of a world.
+
+    The walls, beds and other furniture of the hospital don't move, so instead of every patient running A* with its own
+    navigator, the routes to every bed and exit are calculated once. For every target we store the next step towards
+    that target from every location in the hospital, such that a route from any location is a simple lookup. Beds are
+    obstacles, except for the bed that is the start or end of a route. Other patients are not taken into account here,
+    walking patients plan around each other with the `PathReservations` of the world, which use the step counts of
+    this table as heuristic.
+    """
+
+    def __init__(self, grid_shape, obstacles, beds=(), entrances=(), exits=()):
+        self.grid_shape = tuple(grid_shape)
+        self.obstacles = set(tuple(location) for location in obstacles)
+
+        # for every target location: the next waypoint towards that target, for every location that can reach it
+        self.next_waypoints = {}
+
+        # for every target location: the minimal number of steps to that target, for every location that can reach it
+        self.step_counts = {}
+
+        # waypoint lists that have been requested or precalculated, with (start, target) as key
+        self.routes = {}
+
+        # precalculate the routes from the entrances to every bed, from every bed to every other bed, and from every
+        # bed to the exits
+        beds = [tuple(bed) for bed in beds]
+        entrances = [tuple(entrance) for entrance in entrances]
+        for bed in beds:
+            for start in entrances + beds:
+                self.get_route(start, bed)
+        for hospital_exit in exits:
+            for bed in beds:
+                self.get_route(bed, hospital_exit)
+
+    @classmethod
+    def from_grid_world(cls, grid_world, entrances=(), exits=()):
+        """ Create a route table from the objects in a MATRX gridworld. All intraversable objects and every bed are
+        obstacles, agents are not """
+        obstacles = []
+        beds = []
+        for obj in grid_world.environment_objects.values():
+            if obj.obj_name == "Bed_top":
+                beds.append(obj.location)
+                obstacles.append(obj.location)
+            elif not obj.is_traversable:
+                obstacles.append(obj.location)
+
+        return cls(grid_shape=grid_world.shape, obstacles=obstacles, beds=beds, entrances=entrances, exits=exits)
+
+    def get_route(self, start, target):
+        """ Get the route from `start` to `target` as a tuple of waypoints, excluding the start and including the
+        target. Returns None if the target can't be reached """
+        start = tuple(start)
+        target = tuple(target)
+        key = (start, target)
+
+        if key not in self.routes:
+            if target not in self.next_waypoints:
+                self.add_target(target)
+            next_waypoints = self.next_waypoints[target]
+
+            route = None
+            if start == target:
+                route = ()
+            elif start in next_waypoints:
+                route = []
+                location = start
+                while location != target:
+                    location = next_waypoints[location]
+                    route.append(location)
+                route = tuple(route)
+
+            self.routes[key] = route
+
+        return self.routes[key]
+
+    def add_target(self, target):
+        """ Calculate the next waypoint towards `target` for every location, by doing a Dijkstra search from the target
+        outwards """
+        distances = {target: 0}
+        next_waypoints = {}
+
+        queue = [(0, target)]
+        while queue:
+            distance, location = heapq.heappop(queue)
+            if distance > distances[location]:
+                continue
+
+            for step in move_actions.values():
+                # the neighbour that gets to this location with this step
+                neighbour = (location[0] - step[0], location[1] - step[1])
+                if not (0 <= neighbour[0] < self.grid_shape[0] and 0 <= neighbour[1] < self.grid_shape[1]):
+                    continue
+
+                new_distance = distance + step_distances[step]
+                if new_distance < distances.get(neighbour, np.inf):
+                    distances[neighbour] = new_distance
+                    next_waypoints[neighbour] = location
+
+                    # we can leave an obstacle (e.g. the bed we are lying in), but never pass through one
+                    if neighbour not in self.obstacles:
+                        heapq.heappush(queue, (new_distance, neighbour))
+
+        self.next_waypoints[target] = next_waypoints
+
+    def get_step_counts(self, target):
+        """ Returns the minimal number of steps to `target` from every location that can reach it, calculated with a
+        breadth first search from the target outwards """
+        target = tuple(target)
+        if target not in self.step_counts:
+            step_counts = {target: 0}
+            queue = deque([target])
+            while queue:
+                location = queue.popleft()
+                for step in move_actions.values():
+                    neighbour = (location[0] - step[0], location[1] - step[1])
+                    if neighbour in step_counts or not (0 <= neighbour[0] < self.grid_shape[0]
+                                                        and 0 <= neighbour[1] < self.grid_shape[1]):
+                        continue
+                    step_counts[neighbour] = step_counts[location] + 1
+
+                    # we can leave an obstacle (e.g. the bed we are lying in), but never pass through one
+                    if neighbour not in self.obstacles:
+                        queue.append(neighbour)
+
+            self.step_counts[target] = step_counts
+
+        return self.step_counts[target]
+
+    def is_walkable(self, location, target):
+        """ Check if a location is within the grid and not a static obstacle, or is the target itself """
+        if location == target:
+            return True
+        return 0 <= location[0] < self.grid_shape[0] and 0 <= location[1] < self.grid_shape[1] \
+            and location not in self.obstacles
+
+
+class PathReservations:
+    """ Space-time reservation table for the routes of patients (cooperative A*).
+
+    Patients are intraversable, so when many of them walk at the same time they block each other. Instead of each
+    patient following its shortest route and retrying when blocked, every patient plans its route through space and
+    time around the routes that other patients already reserved, and then reserves the locations of its own route for
+    the ticks it will be there. Other patients then plan around it, waiting or taking a detour where needed.
+
+    The route table of the hospital gives the exact number of steps to the target, ignoring other patients, which is
+    used as the heuristic for the search.
+    """
+
+    def __init__(self, route_table, max_search_ticks=300, max_expansions=20000):
+        self.route_table = route_table
+
+        # routes are planned at most this many ticks ahead, and the search is stopped after this many expansions
+        self.max_search_ticks = max_search_ticks
+        self.max_expansions = max_expansions
+
+        # per tick, the reserved locations and by which agent
+        self.reservations = {}
+        # per agent, its reserved (tick, location) pairs
+        self.agent_reservations = {}
+        # all ticks before this tick have been cleaned up
+        self.oldest_tick = 0
+
+    def is_free(self, location, first_tick, last_tick, agent_id, blocked):
+        """ Check if the location is not reserved by another agent, or blocked, from first_tick until last_tick
+        (inclusive) """
+        if location in blocked and first_tick <= blocked[location]:
+            return False
+        for tick in range(first_tick, last_tick + 1):
+            reserved_by = self.reservations.get(tick, {}).get(location, agent_id)
+            if reserved_by != agent_id:
+                return False
+        return True
+
+    def reserve(self, agent_id, location, first_tick, last_tick):
+        """ Reserve the location for the agent from first_tick until last_tick (inclusive) """
+        agent_reservations = self.agent_reservations.setdefault(agent_id, [])
+        for tick in range(first_tick, last_tick + 1):
+            self.reservations.setdefault(tick, {})[location] = agent_id
+            agent_reservations.append((tick, location))
+
+    def release(self, agent_id):
+        """ Remove all reservations of an agent """
+        for tick, location in self.agent_reservations.pop(agent_id, []):
+            reservations = self.reservations.get(tick, {})
+            if reservations.get(location, None) == agent_id:
+                del reservations[location]
+
+    def remove_old_reservations(self, current_tick):
+        """ Remove the reservations of ticks that have passed """
+        for tick in range(self.oldest_tick, current_tick):
+            self.reservations.pop(tick, None)
+        self.oldest_tick = max(self.oldest_tick, current_tick)
+
+    def plan_route(self, agent_id, start, target, current_tick, move_duration, blocked=None):
+        """ Plan and reserve a route from `start` to `target` through space and time.
+
+        A move decided on at tick t is performed at tick t + move_duration, after which the agent can decide on its next
+        action at tick t + move_duration + 1. Waiting takes one tick. The agent stays at its location until its move is
+        performed, and a location is reserved including the tick the agent moves in or out of it, such that
+        patients never swap places or move into a location in the same tick another patient leaves it.
+
+        Parameters
+        ----------
+        agent_id
+            The ID of the agent for which to plan the route
+        start
+            The current location of the agent
+        target
+            The location the agent wants to go to
+        current_tick
+            The tick at which the agent starts following the route
+        move_duration
+            The duration of a move action in ticks
+        blocked
+            Optional dict with locations that are blocked (e.g. by a patient that is not following a reserved route)
+            as keys, and the last tick they are blocked as value
+
+        Returns
+        -------
+        route
+            A list of (tick, waypoint) tuples: the tick at which the agent should decide on the step towards the
+            waypoint. If the waypoint is the location of the agent, it should wait that tick. None if no route was
+            found
+        """
+        start = tuple(start)
+        target = tuple(target)
+        blocked = {} if blocked is None else blocked
+        step_duration = move_duration + 1
+
+        self.remove_old_reservations(current_tick)
+        self.release(agent_id)
+
+        step_counts = self.route_table.get_step_counts(target)
+        if start not in step_counts:
+            return None
+
+        # A* search through space and time, with states (location, tick)
+        counter = itertools.count()
+        start_state = (start, current_tick)
+        parents = {start_state: None}
+        queue = [(step_counts[start] * step_duration, next(counter), start_state)]
+        expansions = 0
+        goal_state = None
+
+        while queue and expansions < self.max_expansions:
+            _, _, state = heapq.heappop(queue)
+            location, tick = state
+            expansions += 1
+
+            if location == target:
+                goal_state = state
+                break
+
+            if tick - current_tick > self.max_search_ticks:
+                continue
+
+            # wait a tick
+            successors = []
+            if self.is_free(location, tick + 1, tick + 1, agent_id, blocked):
+                successors.append((location, tick + 1))
+
+            # move to a neighbour, if we can stay here until the move is performed and the neighbour is free from
+            # that moment on until we decide on our next step
+            if self.is_free(location, tick + 1, tick + move_duration, agent_id, blocked):
+                for step in move_actions.values():
+                    neighbour = (location[0] + step[0], location[1] + step[1])
+                    if neighbour in step_counts and self.route_table.is_walkable(neighbour, target) and \
+                            self.is_free(neighbour, tick + move_duration, tick + step_duration, agent_id, blocked):
+                        successors.append((neighbour, tick + step_duration))
+
+            for successor in successors:
+                if successor not in parents:
+                    parents[successor] = state
+                    cost = successor[1] - current_tick + step_counts[successor[0]] * step_duration
+                    heapq.heappush(queue, (cost, next(counter), successor))
+
+        if goal_state is None:
+            return None
+
+        # walk back from the goal to get the states of the route
+        states = []
+        state = goal_state
+        while state is not None:
+            states.append(state)
+            state = parents[state]
+        states.reverse()
+
+        # convert the states to steps, and reserve the route
+        route = []
+        for (location, tick), (next_location, next_tick) in zip(states[:-1], states[1:]):
+            route.append((tick, next_location))
+            if location == next_location:
+                self.reserve(agent_id, location, tick, next_tick)
+            else:
+                self.reserve(agent_id, location, tick, tick + move_duration)
+                self.reserve(agent_id, next_location, tick + move_duration, next_tick)
+
+        # keep the target reserved until we decided on what to do next
+        arrival_tick = states[-1][1]
+        self.reserve(agent_id, target, arrival_tick, arrival_tick + step_duration)
+
+        return route
+
+
+def get_route_table(grid_world, entrances=(), exits=()):
+    """ Returns the route table of this gridworld, which is created the first time it is requested
+
+    Parameters
+    ----------
+    grid_world
+        The MATRX gridworld
+    entrances
+        The locations from which routes to every bed are precalculated
+    exits
+        The locations to which routes from every bed are precalculated
+    """
+    return get_world_service(grid_world.world_id, "route_table",
+                             lambda: RouteTable.from_grid_world(grid_world, entrances=entrances, exits=exits))
+
+
+def get_path_reservations(state, route_table):
+    """ Returns the path reservations of the world, which are created the first time they are requested
+
+    Parameters
+    ----------
+    state
+        The state of an agent in the world
+    route_table
+        The route table of the world
+    """
+    return get_world_service(state['World']['world_ID'], "path_reservations", lambda: PathReservations(route_table))
+
+
+def get_move_action(location, waypoint):
+    """ Returns the name of the move action that brings an agent from `location` to the neighbouring `waypoint`, or
+    None if the waypoint is not a neighbour """
+    step = (waypoint[0] - location[0], waypoint[1] - location[1])
+    return step_to_move_action.get(step, None)
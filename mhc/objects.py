@@ -0,0 +1,15 @@
+from matrx.objects import EnvObject
+
+
+class HospitalBed(EnvObject):
+    """ The top part of a hospital bed or first aid chair, to which a patient can be assigned.
+
+    Beds get their own class (instead of a plain EnvObject) so agents can sense them by type, see
+    `PatientAgent.sense_profiles`.
+    """
+
+    def __init__(self, location, room, img_name, name="Bed_top", assigned_patient='free', is_traversable=False,
+                 **kwargs):
+        super().__init__(location=location, name=name, class_callable=HospitalBed, is_traversable=is_traversable,
+                         is_movable=False, customizable_properties=['assigned_patient'], room=room,
+                         img_name=img_name, assigned_patient=assigned_patient, **kwargs)
@@ -1,12 +1,17 @@
 import csv
 import os
+from collections import deque
 
 from matrx.agents import AgentBrain
-from matrx.agents.agent_utils.navigator import Navigator
-from matrx.agents.agent_utils.state_tracker import StateTracker
 from matrx.messages import Message
+from matrx.objects import AgentBody
 
 from mhc.actions import AssignBed, UnassignBed
+from mhc.bed_registry import get_bed_registry
+from mhc.events import EventKind, get_event_bus
+from mhc.messages import MessageKind, RemovalRequest, parse_message
+from mhc.navigation import get_move_action, get_path_reservations
+from mhc.objects import HospitalBed
 from mhc.sickness_model import SicknessModel
 from json import JSONEncoder
 import numpy as np
@@ -14,11 +19,42 @@ import numpy as np
 
 class PatientAgent(AgentBrain):
 
+    # the objects a patient can sense, as passed to its SenseCapability. With "full" the patient senses the whole
+    # world, with "minimal" only the agents (itself, the hospital manager and other patients) and hospital beds, which is
+    # all a patient needs. This keeps the state MATRX builds for every patient every tick small.
+    sense_profiles = {"full": {"*": np.inf},
+                      "minimal": {AgentBody: np.inf, HospitalBed: np.inf}}
+
     def __init__(self,  move_speed=0, hospital_exit=None, deceased_fade_after_ticks=None, random_seed=0,
-                 sickness_model_config=None, update_sickness_every_x_seconds=1, current_medical_care="eerste hulp"):
+                 sickness_model_config=None, update_sickness_every_x_seconds=1, current_medical_care="eerste hulp",
+                 sense_profile="minimal", reserved_bed_id=None):
         super().__init__()
+
+        # the handler for every kind of received message
+        self.message_handlers = {MessageKind.TRIAGE_DECISION: self.handle_triage_decision,
+                                 MessageKind.RESET_COUNTER: self.handle_reset_counter,
+                                 MessageKind.REASSIGN: self.handle_reassign}
+
+        self.sickness_model = None
+        self.reset(move_speed=move_speed, hospital_exit=hospital_exit,
+                   deceased_fade_after_ticks=deceased_fade_after_ticks, random_seed=random_seed,
+                   sickness_model_config=sickness_model_config,
+                   update_sickness_every_x_seconds=update_sickness_every_x_seconds,
+                   current_medical_care=current_medical_care, sense_profile=sense_profile,
+                   reserved_bed_id=reserved_bed_id)
+
+    def reset(self, move_speed=0, hospital_exit=None, deceased_fade_after_ticks=None, random_seed=0,
+              sickness_model_config=None, update_sickness_every_x_seconds=1, current_medical_care="eerste hulp",
+              sense_profile="minimal", reserved_bed_id=None):
+        """ (Re)initialize the patient as a newly arrived patient. Called on creation, and when the patient is recycled
+        from the patient pool for a new arrival (see `PatientPool`) """
+        # forget anything of the previous patient this brain was used for
+        self.messages_to_send = []
+        self.received_messages = []
+        self.previous_action = None
+        self.previous_action_result = None
+
         self.bed_unassigning = False
-        self.state_tracker = None
 
         # general for all patients
         self.move_speed = move_speed
@@ -29,6 +65,9 @@ class PatientAgent(AgentBrain):
         self.target_location = None
         self.current_bed_id = None
 
+        # the bed that was reserved for us when we were spawned, if any
+        self.reserved_bed_id = reserved_bed_id
+
         # the medical care the patient currently receives
         self.current_medical_care = current_medical_care
 
@@ -36,11 +75,18 @@ class PatientAgent(AgentBrain):
         self.hospital_exit = hospital_exit
         assert isinstance(hospital_exit, list)
 
-        # init the state tracker for navigation
-        self.state_tracker = None
-
-        # initiate our sickness model
-        self.sickness_model = SicknessModel(config=sickness_model_config)
+        # the route table of the hospital shared by all patients, set when the patient is added to the world
+        self.route_table = None
+        # the location we are navigating to, if any
+        self.navigation_target = None
+        # our planned and reserved route: the steps we still have to take as (tick, waypoint) tuples, and where we
+        # expect to be when taking the next step
+        self.route = deque()
+        self.expected_location = None
+
+        # initiate our sickness model, a recycled patient can keep its model if the config is the same
+        if self.sickness_model is None or self.sickness_model.config != sickness_model_config:
+            self.sickness_model = SicknessModel(config=sickness_model_config)
         self.update_sickness_every_x_seconds = update_sickness_every_x_seconds
         self.last_sickness_update = None
 
@@ -53,34 +99,47 @@ class PatientAgent(AgentBrain):
         # set seed
         self.rnd_seed = random_seed
 
+        # which objects the patient can sense
+        if sense_profile not in self.sense_profiles:
+            raise Exception(f"Unknown sense profile `{sense_profile}` for patient, choose one of "
+                            f"{list(self.sense_profiles.keys())}")
+        self.sense_profile = sense_profile
+
         # double check that patient assignment is correct with the last message
         self.assigned_to = None
         self.triaged = False
 
-    def filter_observations(self, state):
-        if self.state_tracker is None:
-            # Initialize this agent's state tracker and navigator, has to be done here and not in the initialize
-            # function, as that doesn'twork for agents created during the experiment.
-            self.state_tracker = StateTracker(agent_id=self.agent_id)
-            self.navigator = Navigator(self.agent_id, self.action_set, Navigator.A_STAR_ALGORITHM)
+        # patients are either active (walking, requesting a bed, etc.) or idle (lying in bed, waiting at the exit or
+        # fading away after passing away). Idle patients skip their decision making until they are woken up by a
+        # message, a sickness update that changes what they should do, their triage countdown running out, or the tick
+        # in `wake_at_tick`
+        self.active = True
+        self.wake_at_tick = None
 
-        # for navigator update state tracker
-        self.state_tracker.update(state)
+        # received typed messages that still have to be handled
+        self.message_queue = deque()
 
+    def filter_observations(self, state):
         # let the agent triage countdown go down with every tick (if we are in TDP 2 or 3)
         # and is not assigned to a person in TDP 2
         if 'countdown' in self.agent_properties:
             if self.agent_properties['assigned_to'] == 'robot':
-                self.agent_properties['countdown'] = round(self.agent_properties['countdown'] - state['World']['tick_duration'], 1)
+                countdown = self.agent_properties['countdown']
+                self.agent_properties['countdown'] = round(countdown - state['World']['tick_duration'], 1)
 
-        # skip if we have passed away or fully recovered
+                # wake up when our countdown runs out
+                if countdown > 0 >= self.agent_properties['countdown']:
+                    self.wake_up()
+
+        # skip if we have passed away or fully recovered, but still handle the messages, so e.g. a triage decision
+        # that was sent to us is logged
         if self.agent_properties['health'] is not None and (self.agent_properties['health'] <= 0 or
                                                             self.agent_properties['health'] >= 100):
+            self.handle_messages()
             return state
 
         # update our sickness and health every x seconds
         time = state['World']['nr_ticks'] * state['World']['tick_duration']
-        settings = state[{'name': 'Settings'}]
         try:
             self.agent_properties['assigned_to'] = self.assigned_to;
         except:
@@ -94,72 +153,58 @@ class PatientAgent(AgentBrain):
             self.last_sickness_update = time
             self.update_sickness()
 
-        # check if we have received any messages
-        for message in self.received_messages.copy():
-
-            # check if it is a user triage decision
-            if isinstance(message.content, dict) \
-                    and 'type' in message.content.keys() \
-                    and message.content['type'] == "triage_decision":
-                print(f"{self.agent_id} received user triage decision {message.content['decision']}")
-                self.current_medical_care = message.content['decision']
-                self.triaged = True
-
-                self.agent_properties['triaged_by'] = message.content['triaged_by']
-                self.received_messages.remove(message)
-
-            # reset the triage counter if we receive a message to do so
-            elif isinstance(message.content, dict) \
-                    and 'type' in message.content.keys() \
-                    and message.content['type'] == "reset_counter":
-                self.agent_properties['countdown'] = message.content['counter_value']
-                self.received_messages.remove(message)
-
-            elif isinstance(message.content, dict) \
-                    and 'type' in message.content.keys() \
-                    and message.content['type'] == "reassign":
-                self.assigned_to = message.content['assigned_to']
-                self.agent_properties['assigned_to'] = message.content['assigned_to']
-                self.assigned_to = message.content['assigned_to']
-
-                # also reset counter
-                self.agent_properties['countdown'] = self.agent_properties['original_countdown']
-                self.received_messages.remove(message)
+        # let the world know if we passed away or recovered. This happens only once, as we skip all of the above from
+        # then on
+        if self.agent_properties['health'] <= 0:
+            get_event_bus(state=state).publish(EventKind.PATIENT_DECEASED, patient_id=self.agent_id,
+                                               tick=state['World']['nr_ticks'])
+        elif self.agent_properties['health'] >= 100:
+            get_event_bus(state=state).publish(EventKind.PATIENT_HEALED, patient_id=self.agent_id,
+                                               tick=state['World']['nr_ticks'])
+
+        self.handle_messages()
 
         return state
 
+    def handle_messages(self):
+        """ Handle the messages we received """
+        # messages might require action, so wake up
+        if len(self.message_queue) > 0:
+            self.wake_up()
+
+        while len(self.message_queue) > 0:
+            message = self.message_queue.popleft()
+            self.message_handlers[message.kind](message)
+
 
     def decide_on_action(self, state):
         action = None
         action_kwargs = {"action_duration": self.move_speed}
 
-        # fetch info from state
-        time = state['World']['nr_ticks'] * state['World']['tick_duration']
-        settings = state[{"name": "Settings"}]
-        timestamp = state[{"name"}]
-
-        if self.agent_properties['patient_name'] == "Sybren":
-            assign_to_real = self.agent_properties['assigned_to']
-            assign_to_local = self.assigned_to
-            pass
+        # idle patients have nothing to do until they are woken up
+        if not self.active:
+            if self.wake_at_tick is None or state['World']['nr_ticks'] < self.wake_at_tick:
+                return action, action_kwargs
+            self.wake_up()
 
         # skip everything if we are waiting for removal of this agent
         if self.removal_request_sent:
+            self.go_idle()
             return action, action_kwargs
 
         if not self.current_medical_care == 'eerste hulp':
-            self.agent_properties['triaged'] = True
+            self.set_triaged(state)
         # request removal of the agent if we have arrived at the hospital exit
         if tuple(self.agent_properties['location']) == tuple(self.hospital_exit):
             # find the hospital_manager and request that it removes this agent
             hospital_manager = state[{"name": "hospital_manager"}]
             if self.agent_properties['health'] >= 100 or self.agent_properties['health'] <= 0:
-                self.send_message(Message(content="agent_removal_request", from_id=self.agent_id,
+                self.send_message(Message(content=RemovalRequest().to_content(), from_id=self.agent_id,
                                           to_id=hospital_manager['obj_id']))
                 self.removal_request_sent = True
             # set this agent to be traversable, so the pathplanning of other agents isn't blocked
             self.agent_properties['is_traversable'] = True
-            self.agent_properties['triaged'] = True
+            self.set_triaged(state)
             # print("Agent walked to exit, requesting disappearance")
 
 
@@ -168,6 +213,13 @@ class PatientAgent(AgentBrain):
             # timestamp our tick of death
             if self.tick_of_death is None:
                 self.tick_of_death = state['World']['nr_ticks']
+
+                # we won't walk our reserved route anymore
+                self.navigation_target = None
+                get_path_reservations(state, self.route_table).release(self.agent_id)
+
+                # nothing to do until we can be removed
+                self.go_idle(wake_at_tick=self.tick_of_death + self.deceased_fade_after_ticks + 1)
                 return None, {}
 
             # give the test subject to see that this patient has died, before removing the patient from the gridworld
@@ -176,7 +228,7 @@ class PatientAgent(AgentBrain):
 
                 # find the hospital_manager and request that it removes this agent
                 hospital_manager = state[{"name": "hospital_manager"}]
-                self.send_message(Message(content="agent_removal_request", from_id=self.agent_id,
+                self.send_message(Message(content=RemovalRequest().to_content(), from_id=self.agent_id,
                                           to_id=hospital_manager['obj_id']))
                 self.removal_request_sent = True
 
@@ -189,9 +241,8 @@ class PatientAgent(AgentBrain):
         elif self.agent_properties['health'] >= 100:
 
             if self.target_location is None or tuple(self.target_location) != tuple(self.hospital_exit):
-                # reset the navigator
-                self.navigator.reset_full()
-                self.navigator.add_waypoint(tuple(self.hospital_exit))
+                # navigate to the exit
+                self.navigate_to(self.hospital_exit)
                 self.target_location = self.hospital_exit
                 return self.unassign_self_bed(state, action_kwargs)
 
@@ -204,8 +255,7 @@ class PatientAgent(AgentBrain):
 
             # navigate to the door
             if self.current_medical_care == "huis":
-                self.navigator.reset_full()
-                self.navigator.add_waypoint(tuple(self.hospital_exit))
+                self.navigate_to(self.hospital_exit)
                 self.target_location = self.hospital_exit
                 self.agent_properties['medical_care'] = self.current_medical_care
 
@@ -214,14 +264,61 @@ class PatientAgent(AgentBrain):
                 return self.assign_self_free_bed(state, action_kwargs)
 
         # navigate to our bed / target location if we are not done yet
-        if not self.navigator.is_done and len(self.navigator.get_all_waypoints()) > 0:
-            action = self.navigator.get_move_action(self.state_tracker)
+        if self.navigation_target is not None:
+            action = self.get_navigation_action(state)
             # print("Doing navigation action:", action)
 
+        # we arrived and are not waiting for anything, so go idle
+        if action is None and self.navigation_target is None and not self.bed_requested:
+            self.go_idle()
 
         return action, action_kwargs
 
 
+    def handle_triage_decision(self, message):
+        """ The human or triage agent made a (final) triage decision for us """
+        print(f"{self.agent_id} received user triage decision {message.decision}")
+        self.current_medical_care = message.decision
+        self.triaged = True
+
+        self.agent_properties['triaged_by'] = message.triaged_by
+
+        # let the loggers etc. know
+        get_event_bus(state=self.state).publish(EventKind.TRIAGE_DECISION, patient_id=self.agent_id,
+                                                decision=message.decision, triaged_by=message.triaged_by,
+                                                health=self.agent_properties['health'],
+                                                symptoms=self.agent_properties['symptoms'],
+                                                tick=self.state['World']['nr_ticks'])
+
+    def handle_reset_counter(self, message):
+        """ Reset the triage counter """
+        self.agent_properties['countdown'] = message.counter_value
+
+    def handle_reassign(self, message):
+        """ We have been (re)assigned to the human or triage agent """
+        self.assigned_to = message.assigned_to
+        self.agent_properties['assigned_to'] = message.assigned_to
+
+        # also reset counter
+        self.agent_properties['countdown'] = self.agent_properties['original_countdown']
+
+    def set_triaged(self, state):
+        """ Mark ourselves as triaged, and let the world know the first time """
+        if not self.agent_properties['triaged']:
+            self.agent_properties['triaged'] = True
+            get_event_bus(state=state).publish(EventKind.PATIENT_TRIAGED, patient_id=self.agent_id,
+                                               tick=state['World']['nr_ticks'])
+
+    def go_idle(self, wake_at_tick=None):
+        """ Stop deciding on actions until we are woken up, or until tick `wake_at_tick` if passed """
+        self.active = False
+        self.wake_at_tick = wake_at_tick
+
+    def wake_up(self):
+        """ Start deciding on actions again """
+        self.active = True
+        self.wake_at_tick = None
+
     def _set_messages(self, messages=None):
         """
         Tweak to the standard MATRX function, such that the complete message is passed, instead of only the content
@@ -229,8 +326,12 @@ class PatientAgent(AgentBrain):
         # Loop through all messages and create a Message object out of the dictionaries.
         for mssg in messages:
 
-            # Add the message object to the received messages
-            self.received_messages.append(mssg)
+            # queue the messages we know as typed messages, keep any other message object in the received messages
+            message = parse_message(mssg)
+            if message is not None and message.kind in self.message_handlers:
+                self.message_queue.append(message)
+            else:
+                self.received_messages.append(mssg)
 
     def assign_self_free_bed(self, state, action_kwargs):
         """ Fix the assignment of a new hospital bed, fitting for our required medical care """
@@ -238,8 +339,8 @@ class PatientAgent(AgentBrain):
 
         # Find a free bed to go to if the patient has none assigned yet
         if not self.bed_requested:
-            # find a free bed
-            self.target_bed_id, self.target_bed_loc = self.find_free_bed(state)
+            # reserve a free bed
+            self.target_bed_id, self.target_bed_loc = self.reserve_free_bed(state)
             # print(f"{self.agent_id} requesting bed {self.target_bed_id} for medical care "
             #       f"{self.current_medical_care}")
 
@@ -259,19 +360,19 @@ class PatientAgent(AgentBrain):
                 self.agent_properties['medical_care'] = self.current_medical_care
                 self.current_bed_id = self.target_bed_id
 
-                # navigate to it
+                # navigate to it, starting right away
                 # print(f"{self.agent_id} assignment to bed {self.target_bed_id} was approved. Navigating to "
                 #       f"{self.target_bed_loc}")
-                self.navigator.reset_full()
-                self.navigator.add_waypoint(tuple(self.target_bed_loc))
+                self.navigate_to(self.target_bed_loc)
+                action = self.get_navigation_action(state)
 
-            # It might be that another agent tried to go to the same bed in the same tick.
-            # If so, bed assignment failed. Retry another free bed
+            # Beds are reserved so this shouldn't happen, but if the bed assignment failed anyway, retry another
+            # free bed
             else:
                 # print(f"Agent {self.agent_id} requested bed {self.target_bed_id}, but assignment failed with reason "
                 #       f"{self.previous_action_result.result}")
                 # print(f"Trying new bed")
-                self.target_bed_id, self.target_bed_loc = self.find_free_bed(state)
+                self.target_bed_id, self.target_bed_loc = self.reserve_free_bed(state)
 
                 # try to assign ourselves to that bed
                 self.bed_requested = True
@@ -280,6 +381,66 @@ class PatientAgent(AgentBrain):
 
         return action, action_kwargs
 
+    def navigate_to(self, target_location):
+        """ Set the location to navigate to. The route is planned when we start walking """
+        self.navigation_target = tuple(target_location)
+        self.route = deque()
+
+    def get_navigation_action(self, state):
+        """ Returns the action for this tick towards our navigation target: a move, or None if we have to wait """
+        location = tuple(self.agent_properties['location'])
+        tick = state['World']['nr_ticks']
+        path_reservations = get_path_reservations(state, self.route_table)
+
+        # we arrived
+        if location == self.navigation_target:
+            self.navigation_target = None
+            self.route = deque()
+            return None
+
+        # plan (and reserve) a new route if we have none yet, or if we are not where and when our route expected us to
+        # be, e.g. because our move was blocked or we were busy with something else
+        if len(self.route) == 0 or self.route[0][0] != tick or location != self.expected_location:
+            route = path_reservations.plan_route(self.agent_id, location, self.navigation_target, current_tick=tick,
+                                                 move_duration=self.move_speed,
+                                                 blocked=self.get_blocked_locations(state, path_reservations, tick))
+
+            # no route around the other patients was found, so follow the shortest route and hope for the best
+            if route is None:
+                self.route = deque()
+                static_route = self.route_table.get_route(location, self.navigation_target)
+                if static_route is None:
+                    self.navigation_target = None
+                    return None
+                return get_move_action(location, static_route[0])
+
+            self.route = deque(route)
+            self.expected_location = location
+
+        # take the next step of our route
+        _, waypoint = self.route.popleft()
+        self.expected_location = waypoint
+        return get_move_action(location, waypoint)
+
+    def get_blocked_locations(self, state, path_reservations, tick):
+        """ The locations of other patients that are standing still (so not walking a reserved route), which we have to
+        walk around """
+        blocked = {}
+        patients = state[{"is_patient": True}]
+        if patients is None:
+            return blocked
+        if not isinstance(patients, list):
+            patients = [patients]
+
+        # assume they will stay there for a few steps
+        blocked_until = tick + 3 * (self.move_speed + 1)
+        for patient in patients:
+            location = tuple(patient['location'])
+            if patient['obj_id'] != self.agent_id and not patient['is_traversable'] \
+                    and path_reservations.reservations.get(tick, {}).get(location, None) != patient['obj_id']:
+                blocked[location] = blocked_until
+        return blocked
+
     def unassign_self_bed(self, state, action_kwargs):
 
         action = None
@@ -293,31 +454,28 @@ class PatientAgent(AgentBrain):
 
         return action, action_kwargs
 
-    def find_free_bed(self, state):
-        """ Provided a type of medical care, find a free hospital bed intended for that care """
-
-        # find free beds for the correct medical care
-        beds = state[{'name': "Bed_top", 'room': self.current_medical_care, 'assigned_patient': 'free'}]
+    def reserve_free_bed(self, state):
+        """ Provided a type of medical care, reserve a free hospital bed intended for that care """
+        bed_registry = get_bed_registry(state=state)
 
-        bed = None
-        # multiple beds found
-        if isinstance(beds, list) and len(beds) > 0:
-            # randomly choose one of the beds
-            bed = np.random.choice(beds)
-            # print("Chose bed :", bed['obj_id'])
+        # use the bed that was reserved for us when we were spawned, or give it back if we need another type of care
+        if self.reserved_bed_id is not None:
+            bed_id = self.reserved_bed_id
+            self.reserved_bed_id = None
+            if bed_registry.bed_rooms[bed_id] == self.current_medical_care:
+                return bed_id, bed_registry.get_location(bed_id)
+            bed_registry.release(bed_id)
 
-        # only 1 bed found
-        elif beds is not None:
-            bed = beds
+        # reserve a free bed for the correct medical care
+        bed_id = bed_registry.reserve_bed(self.current_medical_care, reserved_by=self.agent_id)
 
         # no beds found
-        else:
+        if bed_id is None:
             raise Exception(f"Couldn't find a free hospital bed for {self.agent_id} for ward "
                             f"{self.current_medical_care}")
 
         # return the ID and location
-
-        return bed['obj_id'], bed['location']
+        return bed_id, bed_registry.get_location(bed_id)
 
 
 
@@ -336,3 +494,7 @@ class PatientAgent(AgentBrain):
         # set the results
         [self.agent_properties['health'], self.agent_properties['symptoms']] = result
 
+        # we passed away or recovered, so we have to act on it
+        if self.agent_properties['health'] <= 0 or self.agent_properties['health'] >= 100:
+            self.wake_up()
+
@@ -1,15 +1,18 @@
 import csv
 import json
-import os
-import pandas as pd
-import numpy as np
+from collections import deque
 
 from matrx.actions import Action, ActionResult
-from matrx.agents import AgentBrain, SenseCapability, np
-from matrx.objects import AgentBody
+from matrx.agents import AgentBrain, SenseCapability
 import matrx.defaults as defaults
 
+from mhc.arrival_processes import create_arrival_process
+from mhc.bed_registry import get_bed_registry
+from mhc.events import EventKind, get_event_bus
+from mhc.navigation import get_route_table
 from mhc.patient_agent import PatientAgent
+from mhc.patient_pool import get_patient_pool, register_teams
+from mhc.patient_sources import create_patient_source
 from mhc import sickness_model as SicknessModel
 
 
@@ -17,31 +20,61 @@ class PatientPlanner(AgentBrain):
     """ Planning and spawning of patient agents """
 
     def __init__(self, config, tdp):
+        """ Create the patient planner
+
+        Parameters
+        ----------
+        config
+            The `CaseConfig` of the case
+        tdp
+            The TDP of the case
+        """
         super().__init__()
         self.config = config
-        self.patients_planning = config['patients']['patient_planning']
+        self.patients_planning = config.patients.patient_planning
 
-        # load the patient data file
-        patients_data_file = os.path.join(os.path.realpath(self.config['patients']['patients_file']))
-        self.patient_data = pd.read_csv(patients_data_file, sep=';')
+        # load the patient data file, by default every row is one patient
+        self.patient_source = create_patient_source(config.patients.patient_source, config.patients.patients_file,
+                                                    random_seed=config.random_seed)
+
+        # patients arrive following the keypoints of the patient planning, or a generated arrival process (if specified)
+        self.arrival_process = None
+        if config.patients.arrival_process is not None:
+            self.arrival_process = create_arrival_process(config.patients.arrival_process,
+                                                          random_seed=config.random_seed)
 
         self.current_keypoint = None
         self.timestamp_next_patient_spawn = None
 
+        # who the first aid beds of the patients we spawned last tick were reserved for
+        self.spawn_reservations = []
+
         # there might be a queue if the test subject is not triaging the patients quickly enough
         self.generated_patients = 0
-        self.patient_spawn_queue = []
+        self.patient_spawn_queue = deque()
         self.spawned_patients = 0
 
-        # new patients need a couple ticks to assign themselves to a free bed, so we have a short cooldown when spawning
-        # patients
+        # optional pause in between spawning patients. Not needed to prevent collisions, as every new patient gets a
+        # reserved first aid bed
         self.spawn_cooldown = 0
+        self.spawn_cooldown_ticks = config.patients.spawn_cooldown_ticks
+
+        # optionally limit how many patients can be spawned in a single tick, None for no limit
+        self.max_spawns_per_tick = config.patients.max_spawns_per_tick
 
         self.tdp = tdp
 
-        # there are two entrances, use them in alternating order (so patients are not put on top of eachother)
-        self.last_entrance_used = None
+        # all entrances of the hospital, use them in alternating order (so patients are not put on top of eachother)
+        self.entrances = [tuple(entrance) for entrance in config.hospital_layout['entrances']]
+        self.last_entrance_used = -1
 
+        # all exits of the hospital, every next patient leaves through the next exit
+        self.exits = [list(hospital_exit) for hospital_exit in config.hospital_layout['exits']]
+
+        # optionally create a number of patient agents before the first patient arrives, which are then recycled for
+        # the arriving patients (see `PatientPool`)
+        self.patient_pool_size = config.patients.patient_pool_size
+        self.patient_pool_filled = False
 
     def initialize(self):
         pass
@@ -56,6 +89,93 @@ class PatientPlanner(AgentBrain):
         # current time since start of experiment in seconds
         second = state['World']['tick_duration'] * state['World']['nr_ticks']
 
+        # give back the beds reserved for patients that failed to spawn. The reservations of the patients that did spawn
+        # were handed over to their agents, see `create_patient_agent`
+        if len(self.spawn_reservations) > 0:
+            bed_registry = get_bed_registry(state=state)
+            for reserved_by in self.spawn_reservations:
+                bed_registry.release_reservations(reserved_by)
+            self.spawn_reservations = []
+
+        # fill the patient pool before the first patient arrives
+        if not self.patient_pool_filled:
+            self.fill_patient_pool(state)
+
+        # add any new arrivals to the queue
+        if self.arrival_process is not None:
+            self.queue_generated_arrivals(second)
+        else:
+            self.queue_planned_arrivals(second)
+
+        # spawn as many patients from the queue as the hospital can take in this tick. A patient can be spawned if there
+        # is a free first aid bed for it, one of the entrances is clear and we are not on cool down
+        # queue: because a person might be slower than the rate at which patients are generated
+        # free first aid bed: a patient first goes to a free first aid bed, so it needs to be available. The bed is
+        #           reserved for the patient when it is spawned
+        # clear entrance: every entrance tile fits one patient, so each free entrance can take in one patient per tick
+        # cooldown: optional pause in between spawning (batches of) patients, see `spawn_cooldown_ticks`
+        if len(self.patient_spawn_queue) > 0 and not self.spawn_cooldown > 0:
+
+            # get all patients, and index their locations so we can check which entrances are clear
+            patients = state[{"is_patient": True}]
+            if patients is None:
+                patients = []
+            elif not isinstance(patients, list):
+                patients = [patients]
+            occupied_locations = {tuple(patient['location']) for patient in patients}
+
+            # check which entrances are free, starting after the entrance we used last so we alternate between them
+            n_entrances = len(self.entrances)
+            entrance_order = [self.entrances[(self.last_entrance_used + 1 + i) % n_entrances] for i in range(n_entrances)]
+            free_entrances = [entrance for entrance in entrance_order if entrance not in occupied_locations]
+
+            # the number of patients we can take in this tick
+            spawn_capacity = min(len(self.patient_spawn_queue), len(free_entrances), self.get_free_firstaid_beds(state))
+            if self.max_spawns_per_tick is not None:
+                spawn_capacity = min(spawn_capacity, self.max_spawns_per_tick)
+
+            if spawn_capacity > 0:
+                bed_registry = get_bed_registry(state=state)
+                new_patients = []
+                for entrance in free_entrances[:spawn_capacity]:
+                    patient = self.patient_spawn_queue.popleft()
+                    patient['body_args']['location'] = list(entrance)
+
+                    # reserve a first aid bed for the new patient, so no other patient can take it
+                    reserved_by = new_patient_reservation(patient['body_args']['number'])
+                    patient['brain_args']['reserved_bed_id'] = bed_registry.reserve_bed("eerste hulp",
+                                                                                        reserved_by=reserved_by)
+                    self.spawn_reservations.append(reserved_by)
+                    new_patients.append(patient)
+                    self.last_entrance_used = self.entrances.index(entrance)
+
+                action = AddPatientAgents.__name__
+                action_kwargs = {"patients": new_patients, "entrances": self.entrances, "exits": self.exits}
+
+                self.spawned_patients += len(new_patients)
+
+                self.spawn_cooldown = self.spawn_cooldown_ticks
+        else:
+            self.spawn_cooldown -= 1
+
+        return action, action_kwargs
+
+    def fill_patient_pool(self, state):
+        """ Create `patient_pool_size` patient agents up front, with the default patient arguments. Their arguments are
+        replaced with those of the actual patient when they are taken from the pool """
+        self.patient_pool_filled = True
+        if self.patient_pool_size <= 0:
+            return
+
+        brain_args = self.get_default_brain_args()
+        body_args = self.get_default_body_args()
+        get_patient_pool(state=state).prefill(PatientAgent, brain_args, body_args,
+                                              sense_capability=get_sense_capability(brain_args['sense_profile']),
+                                              n_patients=self.patient_pool_size)
+        print(f"Filled the patient pool with {self.patient_pool_size} patients")
+
+    def queue_planned_arrivals(self, second):
+        """ Add patients to the spawn queue according to the keypoints of the patient planning """
         # check at what keypoint in the patient planning we are
         current_keypoint = None
         for keypoint in self.patients_planning:
@@ -64,7 +184,7 @@ class PatientPlanner(AgentBrain):
 
         # check if we need to add a patient (to the queue) this tick
         if current_keypoint != None and (self.spawned_patients + len(self.patient_spawn_queue)) < \
-                self.config['patients']['max_patients']:
+                self.config.patients.max_patients:
 
             # replan when we need to spawn the next patient if we have a new patient_spawn_speed
             if current_keypoint != self.current_keypoint or second > self.timestamp_next_patient_spawn:
@@ -72,9 +192,8 @@ class PatientPlanner(AgentBrain):
 
                 # add a patient to the queue
                 brain_args, body_args = self.get_next_patient()
-                action_kwargs = {"brain_args": brain_args, "body_args": body_args}
                 # action = AddPatientAgent.__name__
-                self.patient_spawn_queue.append(action_kwargs)
+                self.patient_spawn_queue.append({"brain_args": brain_args, "body_args": body_args})
                 # print("Patient planner adding a new patient to the spawn queue")
 
                 # plan when we need to spawn the next patient
@@ -83,53 +202,14 @@ class PatientPlanner(AgentBrain):
                 self.timestamp_next_patient_spawn = second + seconds_per_patient
                 # print(f"Planned new patient for t {self.timestamp_next_patient_spawn}")
 
-        # spawn a patient from the queue if there are any and there is a free first aid bed, we are not on cool down
-        # and the entrance is clear
-        # queue: because a person might be slower than the rate at which patients are generated
-        # free first aid bed: a patient first goes to a free first aid bed, so it needs to be available
-        # cooldown: patients assign themselves to (first aid) beds, and need 2 ticks to do so. So we have a short
-        #           cooldown in between patient spawning to give them and not book 2 patients to one bed
-        # clear entrance: There are 2 entrances, one of them needs to be clear so we can spawn a patient there.
-        if len(self.patient_spawn_queue) > 0 and self.get_free_firstaid_beds(state) > 0 and not self.spawn_cooldown > 0:
-
-            # get patients in the first aid
-            patients = state[{"is_patient": True, "medical_care": "eerste hulp"}]
-            if patients is None:
-                patients = []
-            elif not isinstance(patients, list):
-                patients = [patients]
-
-            # check which entrance is free
-            free_entrances = ['entrance', 'entrance2']
-            for patient in patients:
-                for entrance in free_entrances.copy():
-                    if tuple(patient['location']) == tuple(self.config['hospital'][entrance]):
-                        free_entrances.remove(entrance)
-
-            # if there is a free entrance, spawn the patient at one of the free entrances
-            if len(free_entrances) > 0:
-                entrance = np.random.choice(free_entrances)
-                # alternate between the two entrances if possible
-                if len(free_entrances) > 1 and self.last_entrance_used is not None:
-                    entrance = free_entrances[0] if free_entrances[0] is not self.last_entrance_used else free_entrances[1]
-                self.last_entrance_used = entrance
-
-                action_kwargs = self.patient_spawn_queue.pop(0)
-                action_kwargs['body_args']['location'] = self.config['hospital'][entrance]
-
-                action = AddPatientAgent.__name__
-                time = state['World']['nr_ticks'] * state['World']['tick_duration']
+    def queue_generated_arrivals(self, second):
+        """ Add all patients that arrived according to the arrival process to the spawn queue """
+        for _ in range(self.arrival_process.arrivals_until(second)):
+            if (self.spawned_patients + len(self.patient_spawn_queue)) >= self.config.patients.max_patients:
+                break
 
-                self.spawned_patients += 1
-
-                print(f"Spawning patient at tick {state['World']['nr_ticks']}. Patient "
-                      f"{self.spawned_patients} of max {self.config['patients']['max_patients']}")
-
-                self.spawn_cooldown = 3
-        else:
-            self.spawn_cooldown -= 1
-
-        return action, action_kwargs
+            brain_args, body_args = self.get_next_patient()
+            self.patient_spawn_queue.append({"brain_args": brain_args, "body_args": body_args})
 
     def get_next_patient(self):
         """ Generate a new patient """
@@ -137,7 +217,7 @@ class PatientPlanner(AgentBrain):
         # get the data of this patient
         patient_number = self.spawned_patients + len(self.patient_spawn_queue)
 
-        patient_data = self.patient_data.iloc[patient_number]
+        patient_data = self.patient_source.get_patient(patient_number)
 
         # set a default patient image
         img = "patients/patient_unknown.png" if 'image' not in patient_data or patient_data['image'] == '' else \
@@ -147,63 +227,44 @@ class PatientPlanner(AgentBrain):
         patient_medical_offsets = SicknessModel.init_patient_specific_offsets()
 
         # specify the agent brain props
-        brain_args = {"move_speed": self.config['patients']['move_speed'],
-                      "hospital_exit": self.config['hospital']['exit'],
-                      "random_seed": self.config['random_seed'],
-                      "sickness_model_config": self.config['sickness_model'],
-                      "deceased_fade_after_ticks": self.config['patients']['deceased_fade_after_ticks'],
-                      "update_sickness_every_x_seconds": self.config['patients']['update_sickness_every_x_seconds'],
-                      "current_medical_care": "eerste hulp"}
+        brain_args = self.get_default_brain_args()
+        brain_args['hospital_exit'] = self.exits[self.generated_patients % len(self.exits)]
 
         # create the agent body with default properties and some custom patient properties
-        body_args = {"possible_actions": defaults.AGENTBODY_POSSIBLE_ACTIONS,
-                     "callback_create_context_menu_for_self": None,
-                     "visualize_size": defaults.AGENTBODY_VIS_SIZE,
-                     "visualize_shape": defaults.AGENTBODY_VIS_SHAPE,
-                     "visualize_colour": defaults.AGENTBODY_VIS_COLOUR,
-                     "visualize_opacity": defaults.AGENTBODY_VIS_COLOUR,
-                     "visualize_when_busy": defaults.AGENTBODY_VIS_COLOUR,
-                     "visualize_depth": defaults.AGENTBODY_VIS_DEPTH,
-                     "team": None,
-                     "is_movable": False,
-                     "is_human_agent": False,
-
-                     # custom properties for patient agent
-                     "location": self.config['hospital']['entrance'],
-                     "current_bed_id": None,
-                     "name": "patient",
-                     "patient_name": patient_data['name'],
-                     "number": self.generated_patients,
-                     "is_traversable": False,
-                     "img_name": img,
-                     "customizable_properties": ['current_bed_id', 'symptoms', 'medical_care', "health",
-                                                 "is_traversable", "triaged", "img_name", "patient_photo", "countdown",
-                                                 "agent_planned_triage_decision", "triaged_by",
-                                                 "agent_triage_decision_influences", "assigned_to"],
-
-                     # patient data
-                     "is_patient": True,
-                     "gender": patient_data['gender'],
-                     "age": int(patient_data['age']),
-                     "profession": patient_data['profession'],
-                     "symptoms": patient_data['symptoms'],
-                     "symptoms_start": patient_data['symptoms'],
-                     "fitness": patient_data['fitness'],
-                     "home_situation": patient_data['home_situation'],
-                     "medical_care": None,
-                     "patient_photo": img,
-                     "health": None,
-                     "patient_medical_offsets": patient_medical_offsets,
-                     "patient_introduction_text": patient_data['description'],
-                     "triaged": False,
-                     "triaged_by": None,
-                     "assigned_to": None,
-
-                     # triage agent actions on patient
-                     # the care the patient is
-                     "agent_planned_triage_decision": None,
-                     "agent_triage_decision_influences": None
-                     }
+        body_args = self.get_default_body_args()
+        body_args.update({
+                          # custom properties for patient agent
+                          "location": list(self.entrances[0]),
+                          "current_bed_id": None,
+                          "name": "patient",
+                          "patient_name": patient_data['name'],
+                          "number": self.generated_patients,
+                          "is_traversable": False,
+                          "img_name": img,
+
+                          # patient data
+                          "is_patient": True,
+                          "gender": patient_data['gender'],
+                          "age": int(patient_data['age']),
+                          "profession": patient_data['profession'],
+                          "symptoms": patient_data['symptoms'],
+                          "symptoms_start": patient_data['symptoms'],
+                          "fitness": patient_data['fitness'],
+                          "home_situation": patient_data['home_situation'],
+                          "medical_care": None,
+                          "patient_photo": img,
+                          "health": None,
+                          "patient_medical_offsets": patient_medical_offsets,
+                          "patient_introduction_text": patient_data['description'],
+                          "triaged": False,
+                          "triaged_by": None,
+                          "assigned_to": None,
+
+                          # triage agent actions on patient
+                          # the care the patient is
+                          "agent_planned_triage_decision": None,
+                          "agent_triage_decision_influences": None
+                          })
 
         # add decision support info for decision support trials
         if self.tdp == "tdp_decision_support":
@@ -260,32 +321,59 @@ class PatientPlanner(AgentBrain):
         elif self.tdp == "tdp_dynamic_task_allocation":
             body_args['can_be_triaged_by_agent'] = True
             body_args['care_contending_patients'] = []
-            body_args['customizable_properties'] += ['can_be_triaged_by_agent', 'care_contending_patients']
 
 
-        if 'triage_countdown' in self.config:
+        if self.config.triage_countdown is not None:
             # the countdown that displays how long it wil take before the agent makes their triage decision final
-            body_args["countdown"] = self.config['triage_countdown']
+            body_args["countdown"] = self.config.triage_countdown
             # the original countdown, used by the frontend to display a progress bar of the correct size
-            body_args["original_countdown"] = self.config['triage_countdown']
+            body_args["original_countdown"] = self.config.triage_countdown
 
         print("Generating patient with medical offsets:", patient_medical_offsets)
         self.generated_patients += 1
         return brain_args, body_args
 
+    def get_default_brain_args(self):
+        """ The arguments of the agent brain that are the same for every patient """
+        return {"move_speed": self.config.patients.move_speed,
+                "hospital_exit": self.exits[0],
+                "random_seed": self.config.random_seed,
+                "sickness_model_config": self.config.sickness_model,
+                "deceased_fade_after_ticks": self.config.patients.deceased_fade_after_ticks,
+                "update_sickness_every_x_seconds": self.config.patients.update_sickness_every_x_seconds,
+                "current_medical_care": "eerste hulp",
+                "sense_profile": self.config.patients.sense_profile}
+
+    def get_default_body_args(self):
+        """ The arguments of the agent body that are the same for every patient """
+        customizable_properties = ['current_bed_id', 'symptoms', 'medical_care', "health", "is_traversable", "triaged",
+                                   "img_name", "patient_photo", "countdown", "agent_planned_triage_decision",
+                                   "triaged_by", "agent_triage_decision_influences", "assigned_to"]
+        if self.tdp == "tdp_dynamic_task_allocation":
+            customizable_properties += ['can_be_triaged_by_agent', 'care_contending_patients']
+
+        return {"customizable_properties": customizable_properties,
+                "possible_actions": defaults.AGENTBODY_POSSIBLE_ACTIONS,
+                "callback_create_context_menu_for_self": None,
+                "visualize_size": defaults.AGENTBODY_VIS_SIZE,
+                "visualize_shape": defaults.AGENTBODY_VIS_SHAPE,
+                "visualize_colour": defaults.AGENTBODY_VIS_COLOUR,
+                "visualize_opacity": defaults.AGENTBODY_VIS_COLOUR,
+                "visualize_when_busy": defaults.AGENTBODY_VIS_COLOUR,
+                "visualize_depth": defaults.AGENTBODY_VIS_DEPTH,
+                "team": None,
+                "is_movable": False,
+                "is_human_agent": False,
+                "location": list(self.entrances[0]),
+                "name": "patient",
+                "is_traversable": False}
+
     def get_free_firstaid_beds(self, state):
         """ Counts how many first aid beds are free """
-        n_beds = 0
-        beds = state[{'name': "Bed_top", 'room': "eerste hulp", 'assigned_patient': 'free'}]
-
-        if isinstance(beds, list):
-            n_beds = len(beds)
-        elif beds is not None:
-            n_beds = 1
+        n_beds = get_bed_registry(state=state).count_free_beds("eerste hulp")
 
         # if n_beds > 0:
         #     print(f"Beds free ({n_beds}) at tick {state['World']['nr_ticks']}, spawning patients")
-        #     print(beds)
 
         return n_beds
 
@@ -309,45 +397,112 @@ class AddPatientAgent(Action):
         return AddObjectResult(AddObjectResult.ACTION_SUCCEEDED, True)
 
     def mutate(self, grid_world, agent_id, **kwargs):
-        # create the agent brain
-        agentbrain = PatientAgent(**kwargs['brain_args'])
-
-        # these properties can't be sent via the kwargs because the API can't JSON serialize these objects and would
-        # throw an error
-        obj_body_args = {
-            "sense_capability": SenseCapability({"*": np.inf}),
-            "class_callable": PatientAgent,
-            "callback_agent_get_action": agentbrain._get_action,
-            "callback_agent_set_action_result": agentbrain._set_action_result,
-            "callback_agent_observe": agentbrain._fetch_state,
-            "callback_agent_log": agentbrain._get_log_data,
-            "callback_agent_get_messages": agentbrain._get_messages,
-            "callback_agent_set_messages": agentbrain._set_messages,
-            "callback_agent_initialize": agentbrain.initialize,
-            "callback_create_context_menu_for_other": agentbrain.create_context_menu_for_other
-        }
-
-        # merge the two sets of agent body properties
-        body_args = dict(kwargs['body_args'])
-        body_args.update(obj_body_args)
-
-        # create the agent_body
-        agent_body = AgentBody(**body_args)
-
-        # register the new agent
-        grid_world._register_agent(agentbrain, agent_body)
-
-        # register any new teams
-        grid_world._register_teams()
+        agent_body = create_patient_agent(grid_world, kwargs['brain_args'], kwargs['body_args'],
+                                          entrances=kwargs.get('entrances', None), exits=kwargs.get('exits', None))
+
+        # register the team of the new patient
+        register_teams(grid_world, [agent_body])
 
         return AddObjectResult(AddObjectResult.ACTION_SUCCEEDED, True)
 
 
+class AddPatientAgents(Action):
+    """ An action that can add multiple patient agents to the gridworld in one tick """
+
+    def __init__(self, duration_in_ticks=0):
+        super().__init__(duration_in_ticks)
+
+    def is_possible(self, grid_world, agent_id, **kwargs):
+
+        # check that we have all variables
+        if 'patients' not in kwargs:
+            return AddObjectResult(AddObjectResult.NO_PATIENTS, False)
+
+        for patient in kwargs['patients']:
+            if 'brain_args' not in patient:
+                return AddObjectResult(AddObjectResult.NO_AGENTBRAIN, False)
+
+            if 'body_args' not in patient:
+                return AddObjectResult(AddObjectResult.NO_AGENTBODY, False)
+
+        # success
+        return AddObjectResult(AddObjectResult.ACTION_SUCCEEDED, True)
+
+    def mutate(self, grid_world, agent_id, **kwargs):
+        agent_bodies = [create_patient_agent(grid_world, patient['brain_args'], patient['body_args'],
+                                             entrances=kwargs.get('entrances', None), exits=kwargs.get('exits', None))
+                        for patient in kwargs['patients']]
+
+        # register the teams of the new patients
+        register_teams(grid_world, agent_bodies)
+
+        return AddObjectResult(AddObjectResult.ACTION_SUCCEEDED, True)
+
+
+def create_patient_agent(grid_world, brain_args, body_args, entrances=None, exits=None):
+    """ Create a patient agent (or recycle one from the patient pool) and register it in the gridworld. The team of the
+    patient still has to be registered, see `register_teams`
+
+    Parameters
+    ----------
+    grid_world
+        The MATRX gridworld
+    brain_args
+        Keyword arguments for the PatientAgent
+    body_args
+        Keyword arguments for the AgentBody of the patient
+    entrances
+        All entrances of the hospital, from which the routes to the beds are precalculated. Defaults to the location of
+        the patient
+    exits
+        All exits of the hospital, to which the routes from the beds are precalculated. Defaults to the exit of the
+        patient
+    """
+    # get a patient agent from the pool, reset to this patient, and register it
+    sense_capability = get_sense_capability(brain_args.get('sense_profile', "minimal"))
+    agentbrain, agent_body = get_patient_pool(grid_world=grid_world).acquire(grid_world, PatientAgent, brain_args,
+                                                                             body_args, sense_capability)
+
+    # the bed reserved for the new patient is now reserved for its agent
+    get_bed_registry(grid_world=grid_world).transfer_reservations(new_patient_reservation(body_args['number']),
+                                                                  agent_body.obj_id)
+
+    # share the precalculated routes through the hospital with the patient. The route table is created when the first
+    # patient arrives, so it covers the entrances and exits of all patients
+    if entrances is None:
+        entrances = [body_args['location']]
+    if exits is None:
+        exits = [brain_args['hospital_exit']]
+    agentbrain.route_table = get_route_table(grid_world, entrances=entrances, exits=exits)
+
+    get_event_bus(grid_world=grid_world).publish(EventKind.PATIENT_SPAWNED, patient_id=agent_body.obj_id,
+                                                 tick=grid_world.current_nr_ticks)
+
+    return agent_body
+
+
+def new_patient_reservation(patient_number):
+    """ Who the first aid bed of a new patient is reserved for, until its agent is created """
+    return f"new patient {patient_number}"
+
+
+# the sense capability of the patients for every sense profile, shared by all patients
+sense_capabilities = {}
+
+
+def get_sense_capability(sense_profile):
+    """ Returns the (shared) SenseCapability of patients with the sense profile """
+    if sense_profile not in sense_capabilities:
+        sense_capabilities[sense_profile] = SenseCapability(PatientAgent.sense_profiles[sense_profile])
+    return sense_capabilities[sense_profile]
+
+
 class AddObjectResult(ActionResult):
     """ Result when assignment failed """
     # failed
     NO_AGENTBRAIN = "No object passed under the `agentbrain` key in kwargs"
     NO_AGENTBODY = "No object passed under the `agentbody` key in kwargs"
+    NO_PATIENTS = "No list of patients passed under the `patients` key in kwargs"
     # success
     ACTION_SUCCEEDED = "Agent was succesfully added to the gridworld."
 
@@ -0,0 +1,168 @@
+from collections import deque
+
+from matrx.objects import AgentBody
+
+from mhc.world_registry import get_world_service
+
+
+class PatientPool:
+    """ Pool of patient brains and bodies that are recycled for new arrivals.
+
+    Creating a patient agent builds a new brain (with its sickness model etc.) and a new AgentBody. In long runs with
+    many patients, this is done for every arrival while the patients that left the hospital are thrown away. Instead,
+    the patients that are removed from the world are returned to the pool with `release`, and are reset with the data of
+    the next arriving patient in `acquire`. The pool can also be filled beforehand with `prefill`, so no patients have
+    to be created during the run.
+
+    A recycled body gets a new object ID, such that the logs and frontend never mix up two patients.
+
+    The pool saves creating the brains (with their sickness models), but not the bodies: a recycled body is initialized
+    again with `AgentBody.__init__` and registered again in the gridworld. MATRX only gives an object a new ID in its
+    constructor if it has none yet, so the old ID is deleted first. This relies on MATRX internals, which have to be
+    checked when updating MATRX.
+    """
+
+    def __init__(self):
+        # released patients that can be reused, as (tick of release, brain, body) tuples
+        self.free_patients = deque()
+
+        # the brain and body of every patient in the world that was added via the pool
+        self.active_patients = {}
+
+        # statistics
+        self.created = 0
+        self.recycled = 0
+
+    def prefill(self, brain_class, brain_args, body_args, sense_capability, n_patients):
+        """ Create `n_patients` patient brains and bodies up front, so they don't have to be created when the patients
+        arrive
+
+        Parameters
+        ----------
+        brain_class
+            The class of the agent brain, e.g. PatientAgent
+        brain_args
+            Keyword arguments for the agent brain
+        body_args
+            Keyword arguments for the AgentBody, without the callbacks to the brain
+        sense_capability
+            The SenseCapability of the patients
+        n_patients
+            The number of patients to create
+        """
+        for _ in range(n_patients):
+            agent_brain = brain_class(**brain_args)
+            agent_body = AgentBody(**self.get_body_args(agent_brain, brain_class, body_args, sense_capability))
+            self.free_patients.append((-1, agent_brain, agent_body))
+            self.created += 1
+
+    def acquire(self, grid_world, brain_class, brain_args, body_args, sense_capability):
+        """ Get a patient from the pool (or create one if the pool is empty), reset it with the passed arguments and
+        register it in the gridworld. Returns the brain and body of the patient. Teams are not registered, see
+        `register_teams`
+
+        Parameters
+        ----------
+        grid_world
+            The MATRX gridworld
+        brain_class
+            The class of the agent brain, e.g. PatientAgent
+        brain_args
+            Keyword arguments for the agent brain
+        body_args
+            Keyword arguments for the AgentBody, without the callbacks to the brain
+        sense_capability
+            The SenseCapability of the patient
+        """
+        # patients released this tick might still be referenced by MATRX (e.g. via the action buffer), so only reuse
+        # patients released in an earlier tick
+        if len(self.free_patients) > 0 and self.free_patients[0][0] < grid_world.current_nr_ticks:
+            _, agent_brain, agent_body = self.free_patients.popleft()
+            agent_brain.reset(**brain_args)
+
+            # give the body a new unique ID and properties, by initializing it again
+            del agent_body.obj_id
+            AgentBody.__init__(agent_body, **self.get_body_args(agent_brain, brain_class, body_args, sense_capability))
+            self.recycled += 1
+        else:
+            agent_brain = brain_class(**brain_args)
+            agent_body = AgentBody(**self.get_body_args(agent_brain, brain_class, body_args, sense_capability))
+            self.created += 1
+
+        # register the agent
+        grid_world._register_agent(agent_brain, agent_body)
+        self.active_patients[agent_body.obj_id] = (agent_brain, agent_body)
+
+        return agent_brain, agent_body
+
+    def release(self, grid_world, agent_id):
+        """ Return a patient that was removed from the gridworld to the pool. Patients not added via the pool are
+        ignored
+
+        Parameters
+        ----------
+        grid_world
+            The MATRX gridworld
+        agent_id
+            The ID of the removed patient
+        """
+        if agent_id not in self.active_patients:
+            return
+        agent_brain, agent_body = self.active_patients.pop(agent_id)
+        self.free_patients.append((grid_world.current_nr_ticks, agent_brain, agent_body))
+
+    @staticmethod
+    def get_body_args(agent_brain, brain_class, body_args, sense_capability):
+        """ Add the properties that link the body to its brain to the body arguments """
+        # these properties can't be sent via the kwargs because the API can't JSON serialize these objects and would
+        # throw an error
+        obj_body_args = {
+            "sense_capability": sense_capability,
+            "class_callable": brain_class,
+            "callback_agent_get_action": agent_brain._get_action,
+            "callback_agent_set_action_result": agent_brain._set_action_result,
+            "callback_agent_observe": agent_brain._fetch_state,
+            "callback_agent_log": agent_brain._get_log_data,
+            "callback_agent_get_messages": agent_brain._get_messages,
+            "callback_agent_set_messages": agent_brain._set_messages,
+            "callback_agent_initialize": agent_brain.initialize,
+            "callback_create_context_menu_for_other": agent_brain.create_context_menu_for_other
+        }
+
+        # merge the two sets of agent body properties
+        body_args = dict(body_args)
+        body_args.update(obj_body_args)
+        return body_args
+
+
+def register_teams(grid_world, agent_bodies):
+    """ Register the teams of new agents. `grid_world._register_teams()` adds all agents in the world to their team
+    again on every call, which gets slower (and the team lists longer) with every patient that is added
+
+    Parameters
+    ----------
+    grid_world
+        The MATRX gridworld
+    agent_bodies
+        The bodies of the newly added agents
+    """
+    # MATRX has no public access to the teams of the gridworld, but it shares the same dict with its message manager
+    # when the world starts (before any patient is added), and again every tick
+    teams = grid_world.message_manager.teams
+    for agent_body in agent_bodies:
+        teams.setdefault(agent_body.properties['team'], []).append(agent_body.obj_id)
+
+
+def get_patient_pool(grid_world=None, state=None):
+    """ Returns the patient pool of the world, which is created the first time it is requested. Actions pass the
+    gridworld, agents pass their state
+
+    Parameters
+    ----------
+    grid_world
+        The MATRX gridworld
+    state
+        The state of an agent in the world
+    """
+    world_id = grid_world.world_id if grid_world is not None else state['World']['world_ID']
+    return get_world_service(world_id, "patient_pool", PatientPool)
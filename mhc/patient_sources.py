@@ -0,0 +1,75 @@
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+
+class PatientSource(ABC):
+    """ Provides the data (name, age, symptoms, etc.) of every new patient, read from a patients csv file """
+
+    def __init__(self, patients_file, random_seed=0):
+        self.patient_data = pd.read_csv(os.path.realpath(patients_file), sep=';')
+        self.rnd_gen = np.random.RandomState(random_seed)
+
+    @abstractmethod
+    def get_patient(self, patient_number):
+        """ Returns the data of the `patient_number`-th patient as a pandas Series """
+
+
+class CsvPatientSource(PatientSource):
+    """ Every row of the patients file is one patient, in order. The default. """
+
+    def get_patient(self, patient_number):
+        if patient_number >= len(self.patient_data):
+            raise Exception(f"Patient {patient_number} was requested, but the patients file only contains "
+                            f"{len(self.patient_data)} patients. Use the 'cycle' or 'sample' patient source for more "
+                            f"patients.")
+        return self.patient_data.iloc[patient_number]
+
+
+class CyclingPatientSource(PatientSource):
+    """ Loops through the patients file as often as needed. Repeated patients get the round number added to their name,
+    so they can be told apart in the interface and logs """
+
+    def get_patient(self, patient_number):
+        round_nr, row = divmod(patient_number, len(self.patient_data))
+
+        patient = self.patient_data.iloc[row].copy()
+        if round_nr > 0:
+            patient['name'] = f"{patient['name']} {round_nr + 1}"
+        return patient
+
+
+class SampledPatientSource(PatientSource):
+    """ Every new patient is a random patient from the patients file (drawn with replacement) """
+
+    def get_patient(self, patient_number):
+        return self.patient_data.iloc[self.rnd_gen.randint(len(self.patient_data))]
+
+
+# the patient sources that can be chosen with the `type` key of the `patient_source` config
+patient_source_types = {"csv": CsvPatientSource,
+                        "cycle": CyclingPatientSource,
+                        "sample": SampledPatientSource}
+
+
+def create_patient_source(source_config, patients_file, random_seed=0):
+    """ Create a patient source from the `patient_source` part of the case config
+
+    Parameters
+    ----------
+    source_config
+        A dict with the `type` of the patient source ("csv", "cycle" or "sample")
+    patients_file
+        The csv file with the patient data
+    random_seed
+        The random seed used by sources that draw patients randomly
+    """
+    source_type = source_config['type']
+
+    if source_type not in patient_source_types:
+        raise Exception(f"Unknown patient source type `{source_type}`, choose one of "
+                        f"{list(patient_source_types.keys())}")
+
+    return patient_source_types[source_type](patients_file=patients_file, random_seed=random_seed)
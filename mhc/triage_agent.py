@@ -3,7 +3,9 @@ import random
 from matrx.agents import AgentBrain
 from matrx.messages import Message
 
-from mhc.actions import SetAgentPlannedTriageDecisions, AgentTriageTDP2
+from mhc.actions import SetAgentTriageDecisions
+from mhc.bed_registry import get_bed_registry
+from mhc.messages import ResetCounter, TriageDecision, Reassign
 from mhc.triage_model import TriageScoringAlgorithm
 
 
@@ -78,8 +80,9 @@ class TriageAgent(AgentBrain):
                     self.human_assigned_patients.append(patient['obj_id'])
 
         # keep track of all free beds and if the number changed
-        free_IC_beds = self.count_free_beds(state[{'name': "Bed_top", 'room': "IC", 'assigned_patient': 'free'}])
-        free_ziekenboeg_beds = self.count_free_beds(state[{'name': "Bed_top", 'room': "ziekenboeg", 'assigned_patient': 'free'}])
+        bed_registry = get_bed_registry(state=state)
+        free_IC_beds = bed_registry.count_free_beds("IC")
+        free_ziekenboeg_beds = bed_registry.count_free_beds("ziekenboeg")
 
         if free_IC_beds != self.free_IC_beds or free_ziekenboeg_beds != self.free_ziekenboeg_beds:
             self.num_free_beds_changed = True
@@ -88,15 +91,6 @@ class TriageAgent(AgentBrain):
 
         return state
 
-    def count_free_beds(self, free_beds):
-        """ Count how many free beds of a specific type are available right now"""
-        if free_beds is None:
-            return 0
-        elif isinstance(free_beds, list):
-            return len(free_beds)
-        else:
-            return 1
-
     def decide_on_action(self, state):
         action = None
         action_kwargs = {"action_duration": 0}
@@ -117,10 +111,8 @@ class TriageAgent(AgentBrain):
             if patient_ID in self.agent_assigned_patients and patient_ID in self.triage_decisions_prev and \
                     self.triage_decisions_prev[patient_ID] != triage_decision:
                 print(f"Triage decision for {patient_ID} changed, resetting triage timer")
-                mssg = Message(to_id=patient_ID, from_id=self.agent_id, content={
-                    "type": "reset_counter",
-                    "counter_value": self.config['triage_countdown']
-                })
+                mssg = Message(to_id=patient_ID, from_id=self.agent_id,
+                               content=ResetCounter(counter_value=self.config.triage_countdown).to_content())
                 self.send_message(mssg)
                 patients_reset_countdowns.append(patient_ID)
 
@@ -130,11 +122,8 @@ class TriageAgent(AgentBrain):
             if state[patient_ID]['countdown'] <= 0 and patient_ID not in patients_reset_countdowns:
                 decision = self.triage_decisions[patient_ID] if patient_ID in self.triage_decisions else state[patient_ID]['agent_planned_triage_decision']
                 print(f"Counter for {patient_ID} is zero, sending triage decision: {decision}")
-                mssg = Message(to_id=patient_ID, from_id=self.agent_id, content={
-                    "type": "triage_decision",
-                    "decision": decision,
-                    "triaged_by": "agent"
-                })
+                mssg = Message(to_id=patient_ID, from_id=self.agent_id,
+                               content=TriageDecision(decision=decision, triaged_by="agent").to_content())
                 self.send_message(mssg)
                 self.agent_assigned_patients.remove(patient_ID)
 
@@ -190,10 +179,11 @@ class TriageAgent(AgentBrain):
                 self.triage_decisions[patient_ID] = "huis"
 
         # perform an action that set the triage decision and reasoning for each patient
-        action = SetAgentPlannedTriageDecisions.__name__
+        action = SetAgentTriageDecisions.__name__
         action_kwargs["triage_decisions"] = self.triage_decisions
         action_kwargs["triage_decision_influences"] = self.patients_triage_priority_influences
         action_kwargs['patients_info'] = patients_info
+        action_kwargs['triage_policy'] = self.tdp
 
         return action, action_kwargs
 
@@ -290,7 +280,7 @@ class TriageAgent(AgentBrain):
 
                         # if the score is X higher than the next patient, the agent is certain that the current
                         # patient deserves it more than the next one
-                        if patient['triage_score'] - bed_assignments['IC'][i+1]['triage_score'] > self.config['triage_agent_uncertainty_threshold']:
+                        if patient['triage_score'] - bed_assignments['IC'][i+1]['triage_score'] > self.config.triage_agent_uncertainty_threshold:
 
                             # END OF UNCERTAIN PATIENTS CLUSTER
                             # The agent was uncertain of the current patient compared to the previous one, but IS
@@ -382,7 +372,7 @@ class TriageAgent(AgentBrain):
 
                         # if the score is X higher than the next patient, the agent is certain that the current
                         # patient deserves it more than the next one
-                        if patient['triage_score'] - bed_assignments['ziekenboeg'][i + 1]['triage_score'] > self.config['triage_agent_uncertainty_threshold']:
+                        if patient['triage_score'] - bed_assignments['ziekenboeg'][i + 1]['triage_score'] > self.config.triage_agent_uncertainty_threshold:
 
                             # END OF UNCERTAIN PATIENTS CLUSTER
                             # The agent was uncertain of the current patient compared to the previous one, but IS
@@ -450,10 +440,11 @@ class TriageAgent(AgentBrain):
                     self.triage_decisions[patient_ID] = "huis"
 
         # perform an action that set the triage decision and reasoning for each patient
-        action = AgentTriageTDP2.__name__
+        action = SetAgentTriageDecisions.__name__
         action_kwargs["triage_decisions"] = self.triage_decisions
         action_kwargs["triage_decision_influences"] = self.patients_triage_priority_influences
         action_kwargs["patients_info"] = patients_info
+        action_kwargs['triage_policy'] = self.tdp
 
         return action, action_kwargs
 
@@ -466,10 +457,8 @@ class TriageAgent(AgentBrain):
             # assign the patient to the human if not already the case
             if state[patient_ID]['assigned_to'] != 'person':
                 print(f"Assigned {state[patient_ID]['patient_name']} to person")
-                mssg = Message(to_id=patient['patient_ID'], from_id=self.agent_id, content={
-                    "type": "reassign",
-                    "assigned_to": 'person'
-                })
+                mssg = Message(to_id=patient['patient_ID'], from_id=self.agent_id,
+                               content=Reassign(assigned_to='person').to_content())
                 self.send_message(mssg)
 
             # list the names of the other patients that want this type of care
@@ -0,0 +1,27 @@
+# services shared by the agents and actions of a world (such as the bed registry), with (world ID, service name) as key
+world_services = {}
+
+
+def get_world_service(world_id, name, create):
+    """ Returns the service `name` of the world with ID `world_id`. The service is created with `create()` the first
+    time it is requested
+
+    Parameters
+    ----------
+    world_id
+        The ID of the world, as found in `state['World']['world_ID']` or `grid_world.world_id`
+    name
+        The name of the service
+    create
+        A function without arguments that creates the service
+    """
+    key = (world_id, name)
+    if key not in world_services:
+        world_services[key] = create()
+    return world_services[key]
+
+
+def reset_world_services():
+    """ Remove the services of all worlds. MATRX reuses world IDs for every new world, so this has to be called when
+    creating a new world """
+    world_services.clear()
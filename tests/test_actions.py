@@ -0,0 +1,85 @@
+from mhc.actions import SetAgentTriageDecisions, set_patient_properties
+
+
+class CustomProperties(dict):
+    """ The custom properties of a patient, which records what is written to it """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = []
+
+    def __setitem__(self, key, value):
+        self.written.append(key)
+        super().__setitem__(key, value)
+
+
+class Patient:
+    """ The body of a patient, with custom properties and the mandatory property `is_traversable` """
+
+    def __init__(self, **custom_properties):
+        self.is_traversable = False
+        self.custom_properties = CustomProperties(custom_properties)
+        self.changed_properties = []
+
+    def change_property(self, property_name, property_value):
+        self.changed_properties.append(property_name)
+        if property_name == 'is_traversable':
+            self.is_traversable = property_value
+        else:
+            self.custom_properties[property_name] = property_value
+
+
+class GridWorld:
+    """ A gridworld with only patients """
+
+    def __init__(self, patients):
+        self.registered_agents = patients
+
+
+def test_set_patient_properties():
+    patient = Patient(agent_planned_triage_decision="IC", assigned_to=None)
+    grid_world = GridWorld({"patient_1": patient})
+
+    set_patient_properties(grid_world, {"patient_1": {"agent_planned_triage_decision": "IC", "assigned_to": "agent",
+                                                      "is_traversable": True},
+                                        "patient_2": {"assigned_to": "agent"}})
+
+    # the unchanged decision is not written, the assignment is written directly and `is_traversable` is not a custom
+    # property, so it goes via change_property
+    assert patient.custom_properties == {"agent_planned_triage_decision": "IC", "assigned_to": "agent"}
+    assert patient.custom_properties.written == ["assigned_to"]
+    assert patient.changed_properties == ["is_traversable"]
+    assert patient.is_traversable
+    # patients that are no longer in the world are skipped
+    assert list(grid_world.registered_agents) == ["patient_1"]
+
+
+def set_triage_decisions(triage_policy):
+    """ Let the triage agent decide on a patient that is assigned to the human, and try to take the patient over.
+    Returns the patient """
+    patient = Patient(agent_planned_triage_decision=None, agent_triage_decision_influences=None, assigned_to='person')
+    grid_world = GridWorld({"patient_1": patient})
+    kwargs = {"triage_decisions": {"patient_1": "IC"},
+              "triage_decision_influences": {"patient_1": {"age": {"influence": 1, "reason": "old"}}},
+              "patients_info": {"patient_1": {"assigned_to": "agent"}},
+              "triage_policy": triage_policy}
+
+    action = SetAgentTriageDecisions()
+    assert action.is_possible(grid_world, "triage_agent", **kwargs).succeeded
+    assert action.mutate(grid_world, "triage_agent", **kwargs).succeeded
+    return patient
+
+
+def test_dynamic_task_allocation_keeps_human_assignments():
+    patient = set_triage_decisions("tdp_dynamic_task_allocation")
+
+    assert patient.custom_properties['assigned_to'] == 'person'
+    assert patient.custom_properties['agent_planned_triage_decision'] == "IC"
+    assert patient.custom_properties['agent_triage_decision_influences'] == {"age": {"influence": 1, "reason": "old"}}
+
+
+def test_supervised_autonomy_overwrites_assignments():
+    patient = set_triage_decisions("tdp_supervised_autonomy")
+
+    assert patient.custom_properties['assigned_to'] == "agent"
+    assert patient.custom_properties['agent_planned_triage_decision'] == "IC"
@@ -0,0 +1,156 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mhc.analysis import load_patient_status, load_triage_agent, parse_logged_value, summarize_conditions, \
+    summarize_session
+from mhc.loggers import LogPatientStatus, LogTriageAgent
+
+
+class Patient:
+    """ The body of a patient, with only the properties the patient status logger reads """
+
+    def __init__(self, health):
+        self.properties = {"class_inheritance": ["PatientAgent"], "symptoms": "Mild", "health": health,
+                           "medical_care": "eerste hulp"}
+
+
+class GridWorld:
+    """ A gridworld with only the patients and the tick """
+
+    def __init__(self):
+        self.world_id = "world"
+        self.current_nr_ticks = 0
+        self.registered_agents = {}
+
+
+def write_patient_status(session_folder, log_format, delta_logging, n_ticks=60):
+    """ Log the status of some patients with the patient status logger, while they arrive, change and leave. Returns
+    the status of every patient at every logged tick """
+    logger = LogPatientStatus(save_path=str(session_folder), file_name_prefix="patient_status", log_format=log_format,
+                              delta_logging=delta_logging, keyframe_every_ticks=30)
+    logger._set_world_nr(1)
+    grid_world = GridWorld()
+
+    # record what the logger saw every time it logged
+    expected = []
+    log = logger.log
+
+    def log_and_record(grid_world, agent_data):
+        for agent_id, agent in grid_world.registered_agents.items():
+            expected.append({"world_nr": 1, "tick_nr": grid_world.current_nr_ticks, "agent_id": agent_id,
+                             "symptoms": agent.properties['symptoms'], "health": agent.properties['health'],
+                             "medical_care": agent.properties['medical_care']})
+        return log(grid_world, agent_data)
+    logger.log = log_and_record
+
+    for tick in range(n_ticks):
+        grid_world.current_nr_ticks = tick
+        if tick % 15 == 0:
+            # the sickness model calculates the health with numpy
+            grid_world.registered_agents[f"patient_{tick}"] = Patient(health=np.float64(50.0))
+        if tick == 35:
+            del grid_world.registered_agents["patient_0"]
+        # one patient gets better, the others stay the same
+        if "patient_15" in grid_world.registered_agents and tick % 20 == 0:
+            grid_world.registered_agents["patient_15"].properties['health'] += 2.5
+        logger._grid_world_log(grid_world, {}, last_tick=tick == n_ticks - 1)
+
+    return pd.DataFrame(expected)
+
+
+@pytest.mark.parametrize("log_format, delta_logging", [("csv", False), ("csv", True), ("jsonl", False),
+                                                       ("jsonl", True)])
+def test_load_patient_status(tmp_path, log_format, delta_logging):
+    expected = write_patient_status(tmp_path, log_format, delta_logging)
+
+    patient_status = load_patient_status(str(tmp_path))
+    columns = ["world_nr", "tick_nr", "agent_id", "symptoms", "health", "medical_care"]
+    patient_status = patient_status[columns].sort_values(["tick_nr", "agent_id"]).reset_index(drop=True)
+    # ticks without changes are not in a delta log
+    if delta_logging:
+        expected = expected[expected['tick_nr'].isin(patient_status['tick_nr'])]
+    expected = expected[columns].sort_values(["tick_nr", "agent_id"]).reset_index(drop=True)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(patient_status, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("delta_logging, compact", [(False, False), (True, False), (True, True)])
+def test_load_triage_agent(tmp_path, delta_logging, compact):
+    logger = LogTriageAgent(save_path=str(tmp_path), file_name_prefix="triage_agent", delta_logging=delta_logging,
+                            keyframe_every_ticks=10, compact=compact)
+    logger._set_world_nr(1)
+    grid_world = GridWorld()
+
+    expected_scores = []
+    expected_influences = []
+    previous_scores = {}
+    previous_influences = {}
+    for tick in range(25):
+        grid_world.current_nr_ticks = tick
+        # the second patient has no decision yet until tick 12, and the first patient leaves at tick 20
+        patients = ["patient_1", "patient_2"] if tick < 20 else ["patient_2"]
+        scores = {"patient_1": 1 + tick // 8, "patient_2": 3}
+        decisions = {"patient_1": "ziekenboeg", "patient_2": None if tick < 12 else "IC"}
+        influences = {"patient_1": {"age": {"influence": 0.5, "reason": "old" if tick < 5 else "young"}},
+                      "patient_2": {"age": {"influence": -1, "reason": "old"}}}
+        triage_agent = {"triage_scores": {patient: scores[patient] for patient in patients},
+                        "triage_decisions": {patient: decisions[patient] for patient in patients},
+                        "triage_score_influences": {patient: influences[patient] for patient in patients}}
+        logger._grid_world_log(grid_world, {"triage_agent_1": triage_agent}, last_tick=tick == 24)
+
+        # a row when the score, decision or influence of a patient changed
+        for patient in patients:
+            if previous_scores.get(patient, None) != (scores[patient], decisions[patient]):
+                previous_scores[patient] = (scores[patient], decisions[patient])
+                expected_scores.append({"tick_nr": tick, "agent_id": patient, "triage_score": scores[patient],
+                                        "agent_triage_decision": decisions[patient]})
+            if previous_influences.get(patient, None) != influences[patient]['age']:
+                previous_influences[patient] = influences[patient]['age']
+                expected_influences.append({"tick_nr": tick, "agent_id": patient, "rule": "age",
+                                            "influence": influences[patient]['age']['influence'],
+                                            "reason": influences[patient]['age']['reason']})
+
+    scores, influences = load_triage_agent(str(tmp_path))
+    columns = ["tick_nr", "agent_id", "triage_score", "agent_triage_decision"]
+    pd.testing.assert_frame_equal(scores[columns].reset_index(drop=True), pd.DataFrame(expected_scores)[columns],
+                                  check_dtype=False)
+    columns = ["tick_nr", "agent_id", "rule", "influence", "reason"]
+    pd.testing.assert_frame_equal(influences[columns].reset_index(drop=True),
+                                  pd.DataFrame(expected_influences)[columns], check_dtype=False)
+
+
+def test_parse_logged_value():
+    assert parse_logged_value("{'patient_1': {'health': 50.0}}") == {'patient_1': {'health': 50.0}}
+    assert parse_logged_value("['IC', None]") == ['IC', None]
+    assert parse_logged_value("IC") == "IC"
+    assert parse_logged_value(1.5) == 1.5
+    # numpy numbers as logged with numpy 2
+    assert parse_logged_value("{'health': np.float64(47.16), 'n': np.int64(3)}") == {'health': 47.16, 'n': 3}
+
+
+def test_load_patient_status_unparsable(tmp_path):
+    os.makedirs(tmp_path / "world_1")
+    with open(tmp_path / "world_1" / "patient_status_2021-01-01_100000.csv", mode="w") as log_file:
+        log_file.write("status_per_patient;world_nr;tick_nr\n{'patient_1': {'health': Decimal(5)}};1;9\n")
+
+    with pytest.raises(Exception, match="Could not parse the patient status"):
+        load_patient_status(str(tmp_path))
+
+
+def test_summarize_session_without_patient_status(tmp_path):
+    session_folder = tmp_path / "baseline_01-01-2021_10-00"
+    os.makedirs(session_folder / "world_1")
+    with open(session_folder / "world_1" / "new_patients_2021-01-01_100000.csv", mode="w") as log_file:
+        log_file.write("ticks;agent_id;world_nr;tick_nr\n1;patient_1;1;1\n5;patient_2;1;5\n")
+
+    metrics = summarize_session(str(session_folder), use_cache=False)
+    assert metrics['n_patients'] == 2
+    assert metrics['n_deceased'] is None
+    assert metrics['mortality'] is None
+
+    summary = summarize_conditions(pd.DataFrame([metrics, dict(metrics, session="other", n_deceased=1,
+                                                               mortality=0.5)]))
+    assert summary['pooled_mortality'].iloc[0] == 0.5
@@ -0,0 +1,70 @@
+import numpy as np
+
+from mhc.arrival_processes import PoissonArrivals, TraceArrivals, WaveArrivals, create_arrival_process
+
+
+def get_arrivals(arrival_process, max_arrivals=100000):
+    """ Returns all arrival times of the arrival process, until it has no more arrivals """
+    arrivals = []
+    arrival = arrival_process.calc_next_arrival(0)
+    while arrival != np.inf:
+        arrivals.append(arrival)
+        assert len(arrivals) <= max_arrivals, "the arrival process does not stop"
+        arrival = arrival_process.calc_next_arrival(arrival)
+    return np.array(arrivals)
+
+
+def test_poisson_rate_changes_at_keypoints():
+    arrival_process = PoissonArrivals([{"second": 1000, "patients_per_minute": 60},
+                                       {"second": 0, "patients_per_minute": 6},
+                                       {"second": 2000, "patients_per_minute": 0}], random_seed=3)
+
+    arrivals = get_arrivals(arrival_process)
+
+    # on average 100 patients in the first segment, 1000 in the second and none after that
+    assert 70 <= np.sum(arrivals < 1000) <= 130
+    assert 900 <= np.sum((arrivals >= 1000) & (arrivals < 2000)) <= 1100
+    assert np.all(arrivals < 2000)
+    assert np.all(np.diff(arrivals) >= 0)
+
+    # the last segment has no arrivals
+    assert arrival_process.calc_next_arrival(2500) == np.inf
+
+
+def test_poisson_is_seeded():
+    rate_schedule = [{"second": 0, "patients_per_minute": 30}, {"second": 60, "patients_per_minute": 0}]
+    arrival_processes = [create_arrival_process({"type": "poisson", "rate_schedule": rate_schedule}, random_seed=5)
+                         for _ in range(2)]
+    arrivals = [[arrival_process.arrivals_until(second) for second in range(0, 70, 7)]
+                for arrival_process in arrival_processes]
+    assert arrivals[0] == arrivals[1]
+    assert sum(arrivals[0]) > 0
+
+
+def test_wave_arrivals():
+    arrival_process = WaveArrivals(patients_per_wave=5, wave_interval_seconds=100, wave_duration_seconds=20,
+                                   first_wave_second=10, number_of_waves=3, random_seed=1)
+
+    arrivals = get_arrivals(arrival_process)
+
+    assert len(arrivals) == 5 * 3
+    assert np.all(np.diff(arrivals) >= 0)
+    # every wave falls within its own interval
+    for wave in range(3):
+        wave_arrivals = arrivals[wave * 5:(wave + 1) * 5]
+        assert np.all(wave_arrivals >= 10 + wave * 100) and np.all(wave_arrivals <= 30 + wave * 100)
+
+
+def test_trace_arrivals_replay_trace(tmp_path):
+    ticks = [3, 0, 3, 7, 12, 12, 12, 40]
+    trace_file = tmp_path / "new_patients.csv"
+    with open(trace_file, mode="w") as file:
+        file.write("ticks;agent_id\n" + "".join(f"{tick};patient_{i}\n" for i, tick in enumerate(ticks)))
+
+    arrival_process = TraceArrivals(trace_file=str(trace_file), column="ticks", seconds_per_unit=0.5)
+    assert list(get_arrivals(arrival_process)) == [tick * 0.5 for tick in sorted(ticks)]
+
+    # replayed second by second, the same number of patients arrive at the same moments
+    arrival_process = TraceArrivals(arrival_seconds=[tick * 0.5 for tick in ticks])
+    assert [arrival_process.arrivals_until(tick * 0.5) for tick in range(41)] == \
+        [ticks.count(tick) for tick in range(41)]
@@ -0,0 +1,156 @@
+from mhc.actions import AssignBed, RemovePatient, RemovePatients, UnassignBed
+from mhc.bed_registry import BedRegistry, get_bed_registry
+from mhc.patient_planner import new_patient_reservation
+from mhc.world_registry import reset_world_services
+
+
+class Bed:
+    """ The top of a hospital bed, with only the properties the bed registry and bed actions use """
+
+    def __init__(self, room, location):
+        self.obj_name = "Bed_top"
+        self.location = location
+        self.is_traversable = False
+        self.custom_properties = {"room": room, "assigned_patient": 'free'}
+
+    def change_property(self, property_name, property_value):
+        if property_name == 'is_traversable':
+            self.is_traversable = property_value
+        else:
+            self.custom_properties[property_name] = property_value
+
+
+class Patient:
+    """ The body of a patient, with only the properties the bed actions use """
+
+    def __init__(self):
+        self.properties = {"current_bed_id": None, "medical_care": "eerste hulp"}
+
+    def change_property(self, property_name, property_value):
+        self.properties[property_name] = property_value
+
+
+class GridWorld:
+    """ A gridworld with only beds and patients """
+
+    def __init__(self, beds_per_room):
+        self.world_id = "world"
+        self.current_nr_ticks = 0
+        self.environment_objects = {f"bed_{room}_{i}": Bed(room, (i, y)) for y, (room, n_beds)
+                                    in enumerate(beds_per_room.items()) for i in range(n_beds)}
+        self.registered_agents = {}
+
+    def remove_from_grid(self, object_id):
+        return self.registered_agents.pop(object_id, None) is not None
+
+
+def create_grid_world(beds_per_room):
+    """ Create a gridworld with the beds, and forget the services of any previous world """
+    reset_world_services()
+    return GridWorld(beds_per_room)
+
+
+def test_reserve_bed_in_same_tick():
+    bed_registry = BedRegistry.from_grid_world(create_grid_world({"eerste hulp": 3, "IC": 1}))
+
+    # patients that decide in the same tick, before any action is performed, each get their own bed
+    bed_ids = [bed_registry.reserve_bed("eerste hulp", reserved_by=f"patient_{i}") for i in range(3)]
+    assert len(set(bed_ids)) == 3
+    assert bed_registry.count_free_beds("eerste hulp") == 0
+    assert bed_registry.reserve_bed("eerste hulp", reserved_by="patient_3") is None
+
+    # a patient that reserves again gets the same bed
+    assert bed_registry.reserve_bed("eerste hulp", reserved_by="patient_1") == bed_ids[1]
+    assert bed_registry.count_free_beds("IC") == 1
+
+
+def test_reserve_bed_order_is_deterministic():
+    grid_world = create_grid_world({"eerste hulp": 4})
+    bed_ids = [BedRegistry.from_grid_world(grid_world).reserve_bed("eerste hulp", reserved_by="patient")
+               for _ in range(3)]
+    assert bed_ids == ["bed_eerste hulp_0"] * 3
+
+    # a released bed is picked after the beds that were free all along
+    bed_registry = BedRegistry.from_grid_world(grid_world)
+    first = bed_registry.reserve_bed("eerste hulp", reserved_by="patient_1")
+    bed_registry.release(first)
+    assert [bed_registry.reserve_bed("eerste hulp", reserved_by=f"patient_{i}") for i in range(2, 6)] == \
+        ["bed_eerste hulp_1", "bed_eerste hulp_2", "bed_eerste hulp_3", "bed_eerste hulp_0"]
+
+
+def test_transfer_reservations():
+    bed_registry = BedRegistry.from_grid_world(create_grid_world({"eerste hulp": 2}))
+    bed_id = bed_registry.reserve_bed("eerste hulp", reserved_by=new_patient_reservation(1))
+
+    bed_registry.transfer_reservations(new_patient_reservation(1), "patient_1")
+
+    assert bed_registry.reserved_beds["eerste hulp"] == {bed_id: "patient_1"}
+    assert bed_registry.reserve_bed("eerste hulp", reserved_by="patient_1") == bed_id
+    assert bed_registry.release_reservations(new_patient_reservation(1)) == []
+
+
+def test_release_reservations_of_failed_spawn():
+    bed_registry = BedRegistry.from_grid_world(create_grid_world({"eerste hulp": 2}))
+    spawned_bed = bed_registry.reserve_bed("eerste hulp", reserved_by=new_patient_reservation(1))
+    failed_bed = bed_registry.reserve_bed("eerste hulp", reserved_by=new_patient_reservation(2))
+
+    # only the first patient was spawned, the planner gives back the reservations of all new patients
+    bed_registry.transfer_reservations(new_patient_reservation(1), "patient_1")
+    assert bed_registry.release_reservations(new_patient_reservation(1)) == []
+    assert bed_registry.release_reservations(new_patient_reservation(2)) == [failed_bed]
+
+    assert bed_registry.is_free(failed_bed)
+    assert not bed_registry.is_free(spawned_bed)
+    assert bed_registry.count_free_beds("eerste hulp") == 1
+
+
+def test_assign_bed_fails_only_on_occupied_beds():
+    grid_world = create_grid_world({"eerste hulp": 3})
+    bed_registry = get_bed_registry(grid_world=grid_world)
+    reserved_bed = bed_registry.reserve_bed("eerste hulp", reserved_by="patient_2")
+    occupied_bed = bed_registry.reserve_bed("eerste hulp", reserved_by="patient_3")
+    bed_registry.occupy(occupied_bed)
+    free_bed = bed_registry.get_free_bed("eerste hulp")
+
+    assign_bed = AssignBed()
+    assert assign_bed.is_possible(grid_world, "patient_1", object_id=free_bed).succeeded
+    assert assign_bed.is_possible(grid_world, "patient_1", object_id=reserved_bed).succeeded
+    assert not assign_bed.is_possible(grid_world, "patient_1", object_id=occupied_bed).succeeded
+    assert not assign_bed.is_possible(grid_world, "patient_1", object_id="bed_IC_0").succeeded
+
+
+def test_bed_actions_keep_registry_up_to_date():
+    grid_world = create_grid_world({"eerste hulp": 2, "IC": 1})
+    for patient_id in ["patient_1", "patient_2", "patient_3"]:
+        grid_world.registered_agents[patient_id] = Patient()
+    bed_registry = get_bed_registry(grid_world=grid_world)
+
+    def perform(action, agent_id, **kwargs):
+        assert action.is_possible(grid_world, agent_id, **kwargs).succeeded
+        assert action.mutate(grid_world, agent_id, **kwargs).succeeded
+        return {room: bed_registry.count_free_beds(room) for room in ["eerste hulp", "IC"]}
+
+    assert perform(AssignBed(), "patient_1", object_id="bed_eerste hulp_0") == {"eerste hulp": 1, "IC": 1}
+    assert grid_world.environment_objects["bed_eerste hulp_0"].custom_properties['assigned_patient'] == "patient_1"
+    assert bed_registry.is_occupied("bed_eerste hulp_0")
+
+    # moving to another bed frees the old one
+    assert perform(AssignBed(), "patient_1", object_id="bed_IC_0") == {"eerste hulp": 2, "IC": 0}
+    assert grid_world.environment_objects["bed_eerste hulp_0"].custom_properties['assigned_patient'] == 'free'
+
+    assert perform(AssignBed(), "patient_2", object_id="bed_eerste hulp_0") == {"eerste hulp": 1, "IC": 0}
+    assert perform(UnassignBed(), "patient_2") == {"eerste hulp": 2, "IC": 0}
+    assert bed_registry.is_free("bed_eerste hulp_0")
+
+    assert perform(AssignBed(), "patient_2", object_id="bed_eerste hulp_1") == {"eerste hulp": 1, "IC": 0}
+    assert perform(AssignBed(), "patient_3", object_id="bed_eerste hulp_0") == {"eerste hulp": 0, "IC": 0}
+
+    assert perform(RemovePatient(), "planner", object_id="patient_1") == {"eerste hulp": 0, "IC": 1}
+    assert grid_world.environment_objects["bed_IC_0"].custom_properties['assigned_patient'] == 'free'
+
+    # removing patients frees their beds and the beds they reserved, patients that are already gone are skipped
+    bed_registry.reserve_bed("IC", reserved_by="patient_3")
+    assert perform(RemovePatients(), "planner", object_ids=["patient_2", "patient_3", "patient_1"]) == \
+        {"eerste hulp": 2, "IC": 1}
+    assert grid_world.registered_agents == {}
+    assert all(bed.custom_properties['assigned_patient'] == 'free' for bed in grid_world.environment_objects.values())
@@ -0,0 +1,38 @@
+import copy
+import os
+import pickle
+
+import pytest
+
+from mhc.case_config import PatientsConfig, load_config
+
+config_files = sorted(file_name for file_name in os.listdir(os.path.join("mhc", "cases"))
+                      if file_name.endswith(".json"))
+
+
+@pytest.mark.parametrize("config_file", config_files)
+def test_config_is_frozen(config_file):
+    config = load_config(config_file)
+
+    # frozen all the way down, so it can be hashed and shared instead of copied
+    assert hash(config) == hash(load_config(config_file))
+    assert copy.deepcopy(config) is config
+    assert pickle.loads(pickle.dumps(config)) == config
+
+    with pytest.raises(TypeError):
+        config.hospital_layout['beds']["IC"] = []
+    with pytest.raises(TypeError):
+        config.sickness_model.update({"IC": {}})
+    with pytest.raises(AttributeError):
+        config.patients.max_patients = 1
+
+
+def test_max_spawns_per_tick():
+    patients = {"move_speed": 1, "max_patients": 10, "patients_file": "patients.csv", "deceased_fade_after_ticks": 10,
+                "update_sickness_every_x_seconds": 1}
+
+    # unlimited by default
+    assert PatientsConfig.from_dict(patients).max_spawns_per_tick is None
+    assert PatientsConfig.from_dict(dict(patients, max_spawns_per_tick=2)).max_spawns_per_tick == 2
+    with pytest.raises(Exception, match="max_spawns_per_tick"):
+        PatientsConfig.from_dict(dict(patients, max_spawns_per_tick=2.5))
@@ -0,0 +1,64 @@
+import copy
+import json
+
+from mhc.loggers import DeltaEncoder, apply_log_delta, removed_entry
+
+
+def encode_and_apply(records, keyframe_every_ticks=100):
+    """ Delta encode the records, reconstruct them with `apply_log_delta`, and return the logged and reconstructed
+    records """
+    encoder = DeltaEncoder(keyframe_every_ticks)
+    state = {}
+    logged = []
+    reconstructed = []
+    for tick, record in enumerate(records):
+        keyframe, delta = encoder.encode(copy.deepcopy(record), tick)
+        # the logged values are written to and read from a file
+        delta = json.loads(json.dumps(delta))
+        logged.append((keyframe, delta))
+        state = apply_log_delta(state, delta, keyframe)
+        reconstructed.append(copy.deepcopy(state))
+    return logged, reconstructed
+
+
+def test_delta_round_trip():
+    records = [{"scores": {"patient_1": 1, "patient_2": 2}, "decisions": {"patient_1": None}, "n": 1},
+               {"scores": {"patient_1": 1, "patient_2": 3}, "decisions": {"patient_1": None}, "n": 1},
+               {"scores": {"patient_2": 3}, "decisions": {"patient_1": "IC", "patient_2": None}, "n": 2},
+               {"scores": {"patient_2": 3, "patient_1": 4}, "decisions": {}, "n": 2},
+               {"scores": {}, "decisions": {"patient_3": None}, "n": None}]
+
+    _, reconstructed = encode_and_apply(records)
+    assert reconstructed == records
+
+
+def test_delta_keyframes():
+    records = [{"scores": {"patient_1": tick}} for tick in range(7)]
+
+    logged, reconstructed = encode_and_apply(records, keyframe_every_ticks=3)
+    assert [keyframe for keyframe, _ in logged] == [True, False, False, True, False, False, True]
+    assert reconstructed == records
+
+
+def test_delta_only_changes():
+    records = [{"scores": {"patient_1": 1, "patient_2": 2}, "n": 1},
+               {"scores": {"patient_1": 1, "patient_2": 5}, "n": 1},
+               {"scores": {"patient_2": 5}, "n": 1}]
+
+    logged, _ = encode_and_apply(records)
+    assert logged[1] == (False, {"scores": {"patient_2": 5}})
+    assert logged[2] == (False, {"scores": {"patient_1": removed_entry}})
+
+
+def test_delta_none_entry_is_not_a_removal():
+    # an entry that is None is logged once, and kept when the record is reconstructed
+    records = [{"decisions": {"patient_1": "IC"}},
+               {"decisions": {"patient_1": "IC", "patient_2": None}},
+               {"decisions": {"patient_1": "IC", "patient_2": None}},
+               {"decisions": {"patient_1": "IC", "patient_2": None}}]
+
+    logged, reconstructed = encode_and_apply(records)
+    assert logged[1] == (False, {"decisions": {"patient_2": None}})
+    assert logged[2] == (False, {})
+    assert logged[3] == (False, {})
+    assert reconstructed == records
@@ -0,0 +1,133 @@
+from mhc.navigation import PathReservations, RouteTable, get_move_action, get_route_table
+from mhc.patient_agent import PatientAgent
+from mhc.world_registry import get_world_service, reset_world_services
+
+
+def occupied_locations(start, route, move_duration):
+    """ The location(s) an agent following `route` is in at every tick: while moving, an agent is in the location it
+    leaves and the location it moves to """
+    occupied = {}
+    location = start
+    for tick, waypoint in route:
+        for move_tick in range(tick, tick + move_duration + 1):
+            occupied.setdefault(move_tick, set()).update({location, waypoint})
+        location = waypoint
+    return occupied
+
+
+def assert_never_in_same_location(first, second):
+    for tick in set(first) & set(second):
+        assert not first[tick] & second[tick], f"both agents are in {first[tick] & second[tick]} at tick {tick}"
+
+
+def test_swapping_patients_never_share_a_location():
+    path_reservations = PathReservations(RouteTable(grid_shape=(5, 5), obstacles=[]))
+
+    route_a = path_reservations.plan_route("patient_a", (0, 2), (4, 2), current_tick=0, move_duration=1)
+    route_b = path_reservations.plan_route("patient_b", (4, 2), (0, 2), current_tick=0, move_duration=1)
+
+    assert route_a[-1][1] == (4, 2) and route_b[-1][1] == (0, 2)
+    assert_never_in_same_location(occupied_locations((0, 2), route_a, 1), occupied_locations((4, 2), route_b, 1))
+
+
+def test_crossing_patients_never_share_a_location():
+    path_reservations = PathReservations(RouteTable(grid_shape=(5, 5), obstacles=[]))
+
+    route_a = path_reservations.plan_route("patient_a", (0, 2), (4, 2), current_tick=0, move_duration=2)
+    route_b = path_reservations.plan_route("patient_b", (2, 0), (2, 4), current_tick=0, move_duration=2)
+
+    assert route_a[-1][1] == (4, 2) and route_b[-1][1] == (2, 4)
+    assert_never_in_same_location(occupied_locations((0, 2), route_a, 2), occupied_locations((2, 0), route_b, 2))
+
+
+def test_wait_for_reserved_location():
+    # a corridor, of which the middle is reserved by another patient for the first ticks
+    path_reservations = PathReservations(RouteTable(grid_shape=(3, 1), obstacles=[]))
+    path_reservations.reserve("other", (1, 0), 0, 5)
+
+    route = path_reservations.plan_route("patient", (0, 0), (2, 0), current_tick=0, move_duration=1)
+
+    moves = [(tick, waypoint) for tick, waypoint in route if waypoint != (0, 0)]
+    assert route[0] == (0, (0, 0))
+    assert [waypoint for _, waypoint in moves] == [(1, 0), (2, 0)]
+    # we only move into the location once the other patient left it
+    assert moves[0][0] + 1 > 5
+
+
+def test_blocked_location_is_avoided():
+    path_reservations = PathReservations(RouteTable(grid_shape=(3, 3), obstacles=[]))
+
+    route = path_reservations.plan_route("patient", (0, 1), (2, 1), current_tick=0, move_duration=1,
+                                         blocked={(1, 1): 100})
+
+    assert route[-1][1] == (2, 1)
+    assert (1, 1) not in [waypoint for _, waypoint in route]
+
+
+def test_release_frees_reservations():
+    path_reservations = PathReservations(RouteTable(grid_shape=(3, 1), obstacles=[]))
+    path_reservations.plan_route("patient_a", (0, 0), (2, 0), current_tick=0, move_duration=1)
+    assert any("patient_a" in reservations.values() for reservations in path_reservations.reservations.values())
+
+    path_reservations.release("patient_a")
+
+    assert "patient_a" not in path_reservations.agent_reservations
+    assert not any("patient_a" in reservations.values() for reservations in path_reservations.reservations.values())
+    # another patient can now walk the corridor straight away
+    route = path_reservations.plan_route("patient_b", (0, 0), (2, 0), current_tick=0, move_duration=1)
+    assert route == [(0, (1, 0)), (2, (2, 0))]
+
+
+def test_max_expansions_falls_back_to_static_route():
+    route_table = RouteTable(grid_shape=(5, 5), obstacles=[(2, 1), (2, 2), (2, 3)])
+    reset_world_services()
+    path_reservations = get_world_service("world", "path_reservations",
+                                          lambda: PathReservations(route_table, max_expansions=1))
+
+    # the search gives up before it reaches the target
+    assert path_reservations.plan_route("patient", (0, 2), (4, 2), current_tick=0, move_duration=1) is None
+
+    # so the patient takes the first step of its shortest route, ignoring the other patients
+    patient = PatientAgent(hospital_exit=[4, 2])
+    patient.agent_id = "patient"
+    patient.agent_properties = {"location": (0, 2)}
+    patient.route_table = route_table
+    patient.navigate_to((4, 2))
+
+    class State(dict):
+        """ An agent state with only the world and without other patients """
+
+        def __getitem__(self, key):
+            return None if isinstance(key, dict) else super().__getitem__(key)
+
+    state = State({"World": {"world_ID": "world", "nr_ticks": 0}})
+    action = patient.get_navigation_action(state)
+    reset_world_services()
+
+    assert action == get_move_action((0, 2), route_table.get_route((0, 2), (4, 2))[0])
+    assert len(patient.route) == 0
+
+
+def test_route_table_per_world():
+    class Bed:
+        obj_name = "Bed_top"
+        is_traversable = True
+        location = (2, 2)
+
+    class GridWorld:
+        world_id = "world"
+        shape = (5, 5)
+        environment_objects = {"bed": Bed()}
+
+    reset_world_services()
+    route_table = get_route_table(GridWorld(), entrances=[(0, 0), (0, 4)], exits=[(4, 0), (4, 4)])
+
+    # the routes from all entrances and to all exits are precalculated
+    assert {(0, 0), (0, 4)} <= {start for start, target in route_table.routes if target == (2, 2)}
+    assert {(4, 0), (4, 4)} <= {target for start, target in route_table.routes if start == (2, 2)}
+    assert get_route_table(GridWorld()) is route_table
+
+    # a new world gets its own route table
+    reset_world_services()
+    assert get_route_table(GridWorld()) is not route_table
+    reset_world_services()
@@ -0,0 +1,90 @@
+from collections import deque
+
+from matrx import defaults
+
+from mhc.patient_agent import PatientAgent
+from mhc.patient_pool import PatientPool
+from mhc.patient_planner import get_sense_capability
+
+
+class GridWorld:
+    """ A gridworld in which agents can only be registered """
+
+    def __init__(self):
+        self.current_nr_ticks = 0
+        self.registered_agents = {}
+
+    def _register_agent(self, agent, agent_avatar):
+        self.registered_agents[agent_avatar.obj_id] = agent_avatar
+
+
+def get_args(number, reserved_bed_id=None):
+    """ The brain and body arguments of a new patient """
+    brain_args = {"move_speed": 1, "hospital_exit": [4, 2], "reserved_bed_id": reserved_bed_id}
+    body_args = {"customizable_properties": ["current_bed_id", "health"],
+                 "possible_actions": defaults.AGENTBODY_POSSIBLE_ACTIONS,
+                 "callback_create_context_menu_for_self": None,
+                 "visualize_size": defaults.AGENTBODY_VIS_SIZE,
+                 "visualize_shape": defaults.AGENTBODY_VIS_SHAPE,
+                 "visualize_colour": defaults.AGENTBODY_VIS_COLOUR,
+                 "visualize_opacity": defaults.AGENTBODY_VIS_OPACITY,
+                 "visualize_when_busy": False,
+                 "visualize_depth": defaults.AGENTBODY_VIS_DEPTH,
+                 "team": None, "is_movable": False, "is_human_agent": False, "is_traversable": False,
+                 "location": [0, 2], "name": "patient", "number": number, "current_bed_id": None, "health": 100}
+    return brain_args, body_args
+
+
+def acquire(pool, grid_world, number, reserved_bed_id=None):
+    brain_args, body_args = get_args(number, reserved_bed_id)
+    return pool.acquire(grid_world, PatientAgent, brain_args, body_args, get_sense_capability("minimal"))
+
+
+def test_recycled_patient_is_reset():
+    pool = PatientPool()
+    grid_world = GridWorld()
+    agent_brain, agent_body = acquire(pool, grid_world, number=1, reserved_bed_id="bed_1")
+    old_id = agent_body.obj_id
+
+    # the patient walked, got messages, passed away and asked to be removed
+    agent_brain.navigation_target = (3, 3)
+    agent_brain.route = deque([(5, (1, 2))])
+    agent_brain.reserved_bed_id = "bed_2"
+    agent_brain.message_queue.append("message")
+    agent_brain.tick_of_death = 4
+    agent_brain.removal_request_sent = True
+    agent_body.change_property('health', 0)
+    pool.release(grid_world, old_id)
+
+    grid_world.current_nr_ticks = 1
+    recycled_brain, recycled_body = acquire(pool, grid_world, number=2)
+
+    assert recycled_brain is agent_brain and recycled_body is agent_body
+    assert pool.recycled == 1 and pool.created == 1
+    assert recycled_body.obj_id != old_id
+    assert recycled_body.obj_id in grid_world.registered_agents
+    assert recycled_body.properties['number'] == 2
+    assert recycled_body.properties['health'] == 100
+    assert recycled_brain.navigation_target is None
+    assert len(recycled_brain.route) == 0
+    assert recycled_brain.reserved_bed_id is None
+    assert len(recycled_brain.message_queue) == 0
+    assert recycled_brain.tick_of_death is None
+    assert not recycled_brain.removal_request_sent
+
+
+def test_patient_is_not_reused_in_tick_of_release():
+    pool = PatientPool()
+    grid_world = GridWorld()
+    agent_brain, agent_body = acquire(pool, grid_world, number=1)
+
+    grid_world.current_nr_ticks = 3
+    pool.release(grid_world, agent_body.obj_id)
+    new_brain, new_body = acquire(pool, grid_world, number=2)
+    assert new_brain is not agent_brain and new_body is not agent_body
+    assert pool.created == 2 and pool.recycled == 0
+
+    grid_world.current_nr_ticks = 4
+    recycled_brain, _ = acquire(pool, grid_world, number=3)
+    assert recycled_brain is agent_brain
+    assert pool.recycled == 1
@@ -0,0 +1,17 @@
+from mhc.patient_sources import create_patient_source
+
+patients_file = "mhc/cases/data/experiment_2_tdp3_patients.csv"
+
+
+def test_cycling_patient_source_unique_names():
+    patient_source = create_patient_source({"type": "cycle"}, patients_file=patients_file)
+    n_patients = len(patient_source.patient_data)
+
+    patients = [patient_source.get_patient(patient_number) for patient_number in range(3 * n_patients)]
+
+    names = [patient['name'] for patient in patients]
+    assert len(set(names)) == len(names)
+    # the other data of a repeated patient is the same
+    assert patients[n_patients + 1].drop('name').equals(patients[1].drop('name'))
+    # the patients file itself is not changed
+    assert list(patient_source.patient_data['name']) == names[:n_patients]